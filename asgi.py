@@ -0,0 +1,350 @@
+"""ASGI entry point: the generation API on asyncio instead of a thread per request.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 8000
+
+Serves the same pipelines, cache, metrics and web UI as main3.py, but every
+generation is a coroutine (PostPipeline.arun) awaiting async LLM calls, so one
+process can keep hundreds in flight. Each generation gets GENERATION_TIMEOUT
+seconds and is cancelled as soon as its client disconnects. Within that, the
+pipeline's own deadline (main3.GENERATION_DEADLINE) cancels a stage's LLM
+call when its budget runs out. The /jobs API stays on the Flask app.
+"""
+import asyncio
+import json
+import os
+import time
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Match, Route
+
+import main3
+
+GENERATION_TIMEOUT = float(os.getenv("GENERATION_TIMEOUT", "120"))
+# How often a waiting /generate request checks whether its client has gone
+DISCONNECT_POLL_SECONDS = 0.5
+NDJSON_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+async def until_done(request, coro, timeout=GENERATION_TIMEOUT):
+    # Awaits coro, but cancels it on timeout or when the client disconnects
+    task = asyncio.ensure_future(coro)
+    deadline = time.monotonic() + timeout
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise asyncio.TimeoutError
+            done, _ = await asyncio.wait({task}, timeout=min(DISCONNECT_POLL_SECONDS, remaining))
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                raise ClientDisconnected
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+async def read_json(request):
+    try:
+        data = await request.json()
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+async def home(request):
+    found = main3.static_assets.respond(
+        request.url.path,
+        accept_encoding=request.headers.get('accept-encoding', ''),
+        if_none_match=request.headers.get('if-none-match', '')
+    )
+    if found is None:
+        return JSONResponse({'success': False, 'error': 'Not found'}, status_code=404)
+    status, headers, body = found
+    return Response(body, status_code=status, headers=headers)
+
+
+async def generate(request):
+    data = await read_json(request)
+    topic = data.get('topic', '')
+
+    if not topic:
+        return JSONResponse({'success': False, 'error': 'Topic is required'})
+
+    try:
+        options = main3.generation_options(data)
+        variants = main3.variant_count(data)
+    except ValueError as e:
+        return JSONResponse({'success': False, 'error': str(e)})
+
+    try:
+        if variants > 1:
+            print(f"\n🔄 Generating {variants} candidate posts for topic: {topic}")
+            ranked = await until_done(request, main3.alinkedin_post_variants(
+                topic, variants, mode=options['mode'], deadline=options['deadline']))
+            print(f"✅ {variants} candidates generated, best score {ranked[0]['score']:.2f}")
+        else:
+            print(f"\n🔄 Generating post for topic: {topic}")
+            post, cached = await until_done(request, main3.acached_linkedin_post(topic, **options))
+            print("⚡ Served from cache!" if cached else "✅ Post generated successfully!")
+    except ClientDisconnected:
+        print(f"🔌 Client left, cancelled: {topic}")
+        return Response(status_code=499)
+    except asyncio.TimeoutError:
+        print(f"⏱️ Timed out after {GENERATION_TIMEOUT:g}s: {topic}")
+        return JSONResponse({'success': False, 'error': f'Generation timed out after {GENERATION_TIMEOUT:g}s'},
+                            status_code=504)
+    except main3.ProviderBusy as e:
+        print(f"🚦 Provider busy: {str(e)}")
+        return JSONResponse({'success': False, 'error': str(e)}, status_code=503,
+                            headers={'Retry-After': str(max(1, round(e.retry_after)))})
+    except main3.DeadlineExceeded as e:
+        print(f"⏱️ {str(e)}")
+        return JSONResponse({'success': False, 'error': str(e)}, status_code=504)
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        return JSONResponse({'success': False, 'error': str(e)})
+
+    if variants > 1:
+        return JSONResponse({'success': True, 'post': ranked[0]['post'], 'cached': False,
+                             'unedited': ranked[0]['unedited'], 'mode': options['mode'],
+                             'checks': ranked[0]['checks'], 'variants': ranked})
+    return JSONResponse({'success': True, 'post': post, 'cached': cached,
+                         'unedited': isinstance(post, main3.UneditedPost), 'mode': options['mode'],
+                         'checks': main3.check_post(post)})
+
+
+async def generate_stream(request):
+    data = await read_json(request)
+    topic = data.get('topic', '')
+
+    if not topic:
+        return JSONResponse({'success': False, 'error': 'Topic is required'})
+
+    try:
+        options = main3.generation_options(data)
+    except ValueError as e:
+        return JSONResponse({'success': False, 'error': str(e)})
+
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+
+    def on_event(event):
+        # LLM backends may emit chunks from another thread
+        loop.call_soon_threadsafe(events.put_nowait, event)
+
+    async def worker():
+        try:
+            print(f"\n🔄 Streaming post for topic: {topic}")
+            post, cached = await asyncio.wait_for(
+                main3.acached_linkedin_post(topic, on_event=on_event, **options), GENERATION_TIMEOUT
+            )
+            print("⚡ Served from cache!" if cached else "✅ Post streamed successfully!")
+            on_event({'event': 'done', 'success': True, 'post': post, 'cached': cached,
+                      'unedited': isinstance(post, main3.UneditedPost), 'mode': options['mode'],
+                      'checks': main3.check_post(post)})
+        except asyncio.TimeoutError:
+            on_event({'event': 'error', 'success': False,
+                      'error': f'Generation timed out after {GENERATION_TIMEOUT:g}s'})
+        except Exception as e:
+            print(f"❌ Error: {str(e)}")
+            on_event({'event': 'error', 'success': False, 'error': str(e)})
+        finally:
+            on_event(None)
+
+    async def body():
+        # Starlette stops iterating when the client disconnects; the finally
+        # block then cancels the generation
+        task = asyncio.ensure_future(worker())
+        try:
+            while True:
+                event = await events.get()
+                if event is None:
+                    break
+                yield json.dumps(event) + '\n'
+        finally:
+            task.cancel()
+
+    return StreamingResponse(body(), media_type='application/x-ndjson', headers=NDJSON_HEADERS)
+
+
+async def batch_item(index, topic, options, slots):
+    if not topic:
+        return {'index': index, 'topic': topic, 'success': False, 'error': 'Topic is required'}
+    async with slots:
+        try:
+            post, cached = await asyncio.wait_for(
+                main3.acached_linkedin_post(topic, **options), GENERATION_TIMEOUT
+            )
+            return {'index': index, 'topic': topic, 'success': True, 'post': post, 'cached': cached,
+                    'unedited': isinstance(post, main3.UneditedPost), 'checks': main3.check_post(post)}
+        except asyncio.TimeoutError:
+            return {'index': index, 'topic': topic, 'success': False,
+                    'error': f'Generation timed out after {GENERATION_TIMEOUT:g}s'}
+        except Exception as e:
+            return {'index': index, 'topic': topic, 'success': False, 'error': str(e)}
+
+
+async def generate_batch(request):
+    # Same body and NDJSON answer as the Flask route
+    data = await read_json(request)
+    topics = data.get('topics')
+
+    if not isinstance(topics, list) or not topics:
+        return JSONResponse({'success': False, 'error': 'topics must be a non-empty list'}, status_code=400)
+    if len(topics) > main3.BATCH_MAX_TOPICS:
+        return JSONResponse({'success': False, 'error': f'At most {main3.BATCH_MAX_TOPICS} topics per batch'},
+                            status_code=400)
+
+    try:
+        options = main3.generation_options(data)
+    except ValueError as e:
+        return JSONResponse({'success': False, 'error': str(e)}, status_code=400)
+
+    try:
+        parallelism = int(data.get('parallelism', main3.BATCH_MAX_PARALLELISM))
+    except (TypeError, ValueError):
+        return JSONResponse({'success': False, 'error': 'parallelism must be an integer'}, status_code=400)
+    parallelism = max(1, min(parallelism, main3.BATCH_MAX_PARALLELISM))
+
+    print(f"\n📚 Generating batch of {len(topics)} posts ({parallelism} at a time)")
+
+    async def body():
+        slots = asyncio.Semaphore(parallelism)
+        tasks = [asyncio.ensure_future(batch_item(index, topic, options, slots))
+                 for index, topic in enumerate(topics)]
+        succeeded = failed = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                item = await next_done
+                if item['success']:
+                    succeeded += 1
+                else:
+                    failed += 1
+                yield json.dumps({'event': 'result', **item}) + '\n'
+        finally:
+            for task in tasks:
+                task.cancel()
+        print(f"✅ Batch finished: {succeeded} succeeded, {failed} failed")
+        yield json.dumps({'event': 'done', 'total': len(topics),
+                          'succeeded': succeeded, 'failed': failed}) + '\n'
+
+    return StreamingResponse(body(), media_type='application/x-ndjson', headers=NDJSON_HEADERS)
+
+
+async def metrics_endpoint(request):
+    return Response(main3.metrics.render(), media_type='text/plain; version=0.0.4')
+
+
+async def cache_stats(request):
+    stats = dict(main3.post_cache.stats(), coalescing=main3.post_flights.stats())
+    if main3.semantic_cache is not None:
+        stats['semantic'] = main3.semantic_cache.stats()
+    return JSONResponse(stats)
+
+
+async def history(request):
+    if main3.post_store is None:
+        return JSONResponse({'success': False, 'error': main3.HISTORY_OFF}, status_code=404)
+    try:
+        options = main3.page_options(request.query_params)
+    except ValueError as e:
+        return JSONResponse({'success': False, 'error': str(e)}, status_code=400)
+    return JSONResponse(main3.history_page(main3.post_store.history(**options), options['limit']))
+
+
+async def history_post(request):
+    if main3.post_store is None:
+        return JSONResponse({'success': False, 'error': main3.HISTORY_OFF}, status_code=404)
+    found = main3.post_store.get(request.path_params['post_id'])
+    if found is None:
+        return JSONResponse({'success': False, 'error': 'Post not found'}, status_code=404)
+    return JSONResponse({'success': True, 'post': found})
+
+
+async def search(request):
+    if main3.post_store is None:
+        return JSONResponse({'success': False, 'error': main3.HISTORY_OFF}, status_code=404)
+    query = request.query_params.get('q', '')
+    try:
+        options = main3.page_options(request.query_params)
+    except ValueError as e:
+        return JSONResponse({'success': False, 'error': str(e)}, status_code=400)
+    if not query.strip():
+        return JSONResponse({'success': False, 'error': 'q is required'}, status_code=400)
+    return JSONResponse(main3.history_page(main3.post_store.search(query, **options), options['limit']))
+
+
+async def llm_stats(request):
+    return JSONResponse(main3.llm_stats_snapshot())
+
+
+async def pipeline_stats(request):
+    return JSONResponse(main3.pipeline_stats_snapshot())
+
+
+async def healthz(request):
+    status = main3.health()
+    return JSONResponse(status, status_code=503 if status['status'] == 'draining' else 200)
+
+
+routes = [
+    Route('/', home),
+    Route('/static/{filename:path}', home),
+    Route('/generate', generate, methods=['POST']),
+    Route('/generate/stream', generate_stream, methods=['POST']),
+    Route('/generate/batch', generate_batch, methods=['POST']),
+    Route('/metrics', metrics_endpoint),
+    Route('/cache/stats', cache_stats),
+    Route('/history', history),
+    Route('/history/{post_id:int}', history_post),
+    Route('/search', search),
+    Route('/llm/stats', llm_stats),
+    Route('/pipeline/stats', pipeline_stats),
+    Route('/healthz', healthz),
+]
+
+
+def route_label(scope):
+    # The matched route's pattern (/history/{post_id:int}), not the raw path.
+    # Starlette 1.x records the route in the scope; older versions only the
+    # endpoint, which home shares between two routes, so match again there
+    route = scope.get('route')
+    if route is None:
+        route = next((each for each in routes if each.matches(scope)[0] == Match.FULL), None)
+    return getattr(route, 'path', 'unmatched')
+
+
+class RequestMetrics:
+    # Pure ASGI middleware feeding the same http_* metrics as the Flask hooks
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+
+        async def send_and_observe(message):
+            if message['type'] == 'http.response.start':
+                route = route_label(scope)
+                main3.http_requests.inc(route=route, status=message['status'])
+                main3.http_latency.observe(time.perf_counter() - start, route=route)
+            await send(message)
+
+        await self.app(scope, receive, send_and_observe)
+
+
+app = RequestMetrics(Starlette(routes=routes))
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run(app, host='0.0.0.0', port=int(os.getenv("PORT", "8000")))
@@ -0,0 +1,230 @@
+"""Generate posts for a file of topics from the command line, no server needed.
+
+    python batch_cli.py topics.csv --output posts.jsonl --workers 8
+    cat topics.txt | python batch_cli.py - --output posts.jsonl
+
+Input is CSV (a `topic` column, optional `id`), JSONL (objects with `topic`
+and optional `id`, or plain strings) or text (one topic per line), picked
+from the file extension or --format. It is read lazily, and at most
+--workers topics are generated at once (main3.generate_batch), so memory
+stays flat however long the file is. Each result is appended to the output
+as one JSON line as soon as it's ready: id, topic, success, and post,
+cached, unedited and checks, or error.
+
+Rerunning the same command resumes. Topics are skipped if their id or
+topic is in the checkpoint (default: the output path plus `.checkpoint`, a
+SQLite file updated after each post is written), or if the output already
+holds a successful post for the same id or topic. The checkpoint lives on
+disk rather than in memory, so it doesn't grow the process either. Failed
+topics, and input lines that can't be read, are written with their error
+and tried again on the next run. Without an `id`, a row's id is its line
+number in the input.
+"""
+import argparse
+import contextlib
+import csv
+import hashlib
+import itertools
+import json
+import os
+import signal
+import sqlite3
+import sys
+import time
+
+import main3
+from post_cache import normalize_topic
+
+FORMATS = ('csv', 'jsonl', 'text')
+
+
+def input_format(path, requested=None):
+    if requested:
+        return requested
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return 'csv'
+    if extension in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    return 'text'
+
+
+def read_topics(lines, format):
+    # Yields (id, topic, error) one row at a time; id is the row's own or its
+    # line number, error says why a row couldn't be read (topic is then '')
+    if format == 'csv':
+        for number, row in enumerate(csv.DictReader(lines), start=2):
+            yield str(row.get('id') or number), (row.get('topic') or '').strip(), None
+    elif format == 'jsonl':
+        for number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield str(number), '', f"Line {number} is not valid JSON: {e}"
+                continue
+            if isinstance(row, str):
+                row = {'topic': row}
+            if not isinstance(row, dict):
+                yield str(number), '', f"Line {number} is not an object or a string"
+                continue
+            yield str(row.get('id') or number), str(row.get('topic') or '').strip(), None
+    else:
+        for number, line in enumerate(lines, start=1):
+            if line.strip():
+                yield str(number), line.strip(), None
+
+
+class Checkpoint:
+    # Ids and topics already done, in SQLite: lookups read from disk, so
+    # memory stays flat however long the input. Topics are kept as hashes of
+    # their normalized text. path None: a temporary database for this run only
+
+    def __init__(self, path=None):
+        self._db = sqlite3.connect(path or '')
+        try:
+            self._db.execute('CREATE TABLE IF NOT EXISTS done (key TEXT PRIMARY KEY) WITHOUT ROWID')
+        except sqlite3.DatabaseError:
+            raise SystemExit(f"{path} is not a checkpoint file; pass another --checkpoint")
+
+    @staticmethod
+    def _keys(row_id, topic):
+        keys = ['id:' + row_id]
+        if topic:
+            keys.append('topic:' + hashlib.sha1(normalize_topic(topic).encode('utf-8')).hexdigest())
+        return keys
+
+    def __contains__(self, row):
+        keys = self._keys(*row)
+        found = self._db.execute(f"SELECT 1 FROM done WHERE key IN ({', '.join('?' * len(keys))}) LIMIT 1", keys)
+        return found.fetchone() is not None
+
+    def add(self, row_id, topic, commit=True):
+        self._db.executemany('INSERT OR IGNORE INTO done (key) VALUES (?)',
+                             [(key,) for key in self._keys(row_id, topic)])
+        if commit:
+            self._db.commit()
+
+    def ids(self):
+        return self._db.execute("SELECT COUNT(*) FROM done WHERE key LIKE 'id:%'").fetchone()[0]
+
+    def add_output(self, path):
+        # Successful lines of an earlier output, read one at a time, in case
+        # the run that wrote them had no checkpoint or died before updating it
+        if not path or not os.path.exists(path):
+            return
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    result = json.loads(line)
+                except ValueError:
+                    # A line cut short by a crash; that topic runs again
+                    continue
+                if isinstance(result, dict) and result.get('success'):
+                    self.add(str(result['id']), result['topic'], commit=False)
+        self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+
+def open_for_append(path):
+    # Terminates a line left half-written by an interrupted run, so the
+    # next result starts on a line of its own
+    if os.path.exists(path) and os.path.getsize(path):
+        with open(path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            ends_with_newline = f.read(1) == b'\n'
+        if not ends_with_newline:
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write('\n')
+    return open(path, 'a', encoding='utf-8')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('input', help="topics file, or - for stdin")
+    parser.add_argument('--output', '-o', default='-', help='JSONL file to append results to (default: stdout)')
+    parser.add_argument('--checkpoint', help='SQLite file of completed ids and topics (default: OUTPUT.checkpoint)')
+    parser.add_argument('--format', choices=FORMATS, help='input format (default: from the extension, else text)')
+    parser.add_argument('--workers', type=int, default=4, help='topics generated at once')
+    parser.add_argument('--mode', choices=main3.MODES, default=main3.DEFAULT_MODE)
+    parser.add_argument('--cache', choices=main3.CACHE_MODES, help='cache mode for every topic')
+    parser.add_argument('--deadline', type=float, help='seconds per topic (default: GENERATION_DEADLINE)')
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
+    if args.deadline is not None and args.deadline <= 0:
+        parser.error('--deadline must be more than 0')
+    if args.checkpoint is None and args.output != '-':
+        args.checkpoint = args.output + '.checkpoint'
+    return args
+
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # SIGTERM stops the run like Ctrl+C, so it can be resumed
+    signal.signal(signal.SIGTERM, _interrupt)
+    counts = {'generated': 0, 'failed': 0, 'skipped': 0}
+    # generate_batch numbers the topics it's given from 0; ids of the ones in flight
+    in_flight = {}
+    numbers = itertools.count()
+
+    with contextlib.ExitStack() as stack:
+        done = Checkpoint(args.checkpoint)
+        stack.callback(done.close)
+        done.add_output(args.output if args.output != '-' else None)
+        results = sys.stdout if args.output == '-' else stack.enter_context(open_for_append(args.output))
+        lines = sys.stdin if args.input == '-' else stack.enter_context(
+            open(args.input, encoding='utf-8', newline=''))
+        # The app logs to stdout; keep that free for results
+        stack.enter_context(contextlib.redirect_stdout(sys.stderr))
+
+        def write(row_id, item):
+            results.write(json.dumps({'id': row_id, **item}) + '\n')
+            results.flush()
+            if item['success']:
+                counts['generated'] += 1
+                done.add(row_id, item['topic'])
+            else:
+                counts['failed'] += 1
+                print(f"❌ {row_id} ({item['topic']}): {item['error']}")
+
+        def pending(rows):
+            for row_id, topic, error in rows:
+                if error:
+                    # Reported like a failed topic; the rest of the file goes on
+                    write(row_id, {'topic': topic, 'success': False, 'error': error})
+                elif (row_id, topic) in done:
+                    counts['skipped'] += 1
+                else:
+                    in_flight[next(numbers)] = row_id
+                    yield topic
+
+        rows = read_topics(lines, input_format(args.input, args.format))
+        print(f"📚 Generating posts from {args.input} ({args.workers} at a time), "
+              f"{done.ids()} already done")
+        start = time.perf_counter()
+        try:
+            for item in main3.generate_batch(pending(rows), args.workers, cache_mode=args.cache,
+                                               mode=args.mode, deadline=args.deadline):
+                write(in_flight.pop(item.pop('index')), item)
+        except KeyboardInterrupt:
+            # Posts in flight are finished but not written; they run again on resume
+            print("\n⏹️ Interrupted; rerun the same command to resume")
+            return 130
+        finally:
+            seconds = time.perf_counter() - start
+            print(f"✅ {counts['generated']} generated, {counts['failed']} failed, "
+                  f"{counts['skipped']} skipped in {seconds:.1f}s "
+                  f"({counts['generated'] / seconds if seconds else 0:.2f} posts/s)")
+    return 1 if counts['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1 @@
+"""Benchmarks for the LinkedIn post pipeline. Run with `python -m benchmarks.<name>`."""
@@ -0,0 +1,123 @@
+"""Many generations in flight: thread per request (Flask) vs asyncio (asgi.py).
+
+Fires --inflight POST /generate requests at once, first at the ASGI app
+(one event loop, httpx's in-process ASGI transport), then at the Flask app
+with one thread per request, and reports wall time, OS threads at the peak
+and memory. Runs on the stub backend with a provider-like latency by default.
+
+    python -m benchmarks.bench_async --inflight 200
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("LLM_BACKEND", "stub")
+os.environ.setdefault("STUB_LATENCY_MS", "fixed:500")
+# Measure the server, not the LLM scheduler's concurrency cap
+os.environ.setdefault("LLM_MAX_CONCURRENCY", "1000")
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+import httpx
+
+import asgi
+import main3
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def peak_rss_kib():
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class ThreadPeak:
+    # Samples the OS thread count in the background while a run is going
+
+    def __init__(self):
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._stop.wait(0.01):
+            self.peak = max(self.peak, threading.active_count())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_asyncio(topics):
+    async def fire():
+        transport = httpx.ASGITransport(app=asgi.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench', timeout=600) as client:
+            responses = await asyncio.gather(*[
+                client.post('/generate', json={'topic': topic, 'cache': 'bypass'}) for topic in topics
+            ])
+        return [response.json() for response in responses]
+
+    return asyncio.run(fire())
+
+
+def run_threads(topics):
+    client = main3.app.test_client()
+
+    def one(topic):
+        return client.post('/generate', json={'topic': topic, 'cache': 'bypass'}).get_json()
+
+    with ThreadPoolExecutor(max_workers=len(topics)) as pool:
+        return list(pool.map(one, topics))
+
+
+def measure(name, run, topics):
+    rss_before = peak_rss_kib()
+    tracemalloc.start()
+    start = time.perf_counter()
+    with ThreadPeak() as threads:
+        results = run(topics)
+    elapsed = time.perf_counter() - start
+    python_peak = tracemalloc.get_traced_memory()[1] / 1024
+    tracemalloc.stop()
+    rss_growth = peak_rss_kib() - rss_before if rss_before is not None else None
+    ok = sum(1 for result in results if result.get('success'))
+    return name, elapsed, ok, threads.peak, python_peak / len(topics), rss_growth
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--inflight', type=int, default=200)
+    args = parser.parse_args()
+
+    topics = [f"Benchmark topic {i}" for i in range(args.inflight)]
+    rows = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        # Warm both paths so crews and imports aren't part of the numbers
+        run_asyncio(topics)
+        run_threads(topics[:8])
+        # asyncio first: peak RSS only grows, so the thread run shows its extra
+        rows.append(measure('asyncio (asgi)', run_asyncio, topics))
+        rows.append(measure('threads (flask)', run_threads, topics))
+
+    print(f"{args.inflight} generations in flight, stub latency {os.environ['STUB_LATENCY_MS']}")
+    print(f"{'path':<18}{'wall s':>8}{'ok':>6}{'threads':>9}{'py KiB/req':>12}{'RSS +KiB':>10}")
+    for name, elapsed, ok, threads, per_request, rss_growth in rows:
+        print(f"{name:<18}{elapsed:>8.2f}{ok:>6}{threads:>9}{per_request:>12.1f}{rss_growth if rss_growth is not None else '-':>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""Two-agent vs fused generation: latency, tokens and rule compliance.
+
+Runs every topic through both modes against the configured LLM backend and
+checks each post with post_rules.check_post. With the default groq backend
+this makes real provider calls; LLM_BACKEND=stub runs it offline.
+
+    python -m benchmarks.bench_modes --runs 3 --json modes.json
+    LLM_BACKEND=stub python -m benchmarks.bench_modes
+"""
+import argparse
+import json
+import statistics
+import time
+from typing import Any
+
+from crewai.llms.base_llm import BaseLLM
+
+import main3
+from metrics import estimate_tokens
+from post_rules import check_post
+
+TOPICS = [
+    "AI in healthcare",
+    "Remote work productivity",
+    "Leadership lessons",
+    "Career growth tips",
+    "Digital transformation",
+]
+
+usage = {'calls': 0, 'prompt_tokens': 0, 'completion_tokens': 0}
+
+
+def message_text(messages):
+    if isinstance(messages, str):
+        return messages
+    return "\n".join(str(message.get("content", "")) for message in messages)
+
+
+class CountingLLM(BaseLLM):
+    # Forwards to the real LLM and tallies calls and estimated tokens
+    inner: Any = None
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None, **kwargs):
+        response = self.inner.call(
+            messages, tools=tools, callbacks=callbacks,
+            available_functions=available_functions,
+            from_task=from_task, from_agent=from_agent
+        )
+        usage['calls'] += 1
+        usage['prompt_tokens'] += estimate_tokens(message_text(messages))
+        usage['completion_tokens'] += estimate_tokens(str(response))
+        return response
+
+
+def build_pipelines(source=None):
+    # Copies of source (default: the app's pipelines) with counting LLMs
+    pipelines = {}
+    for mode, pipeline in (source or main3.pipelines).items():
+        stages = []
+        for stage in pipeline.stages:
+            agent = stage.agent.copy()
+            agent.llm = CountingLLM(model=stage.agent.llm.model, inner=stage.agent.llm)
+            stages.append(stage._replace(agent=agent))
+        pipelines[mode] = main3.PostPipeline(stages, postprocess=pipeline.postprocess)
+    return pipelines
+
+
+def run(pipelines, topics, runs):
+    results = {mode: [] for mode in pipelines}
+    for _ in range(runs):
+        for topic in topics:
+            for mode, pipeline in pipelines.items():
+                for key in usage:
+                    usage[key] = 0
+                start = time.perf_counter()
+                post = pipeline.run(topic)
+                elapsed = time.perf_counter() - start
+                results[mode].append({
+                    'topic': topic,
+                    'seconds': elapsed,
+                    **usage,
+                    'checks': check_post(post),
+                })
+    return results
+
+
+def summarize(samples):
+    seconds = sorted(sample['seconds'] for sample in samples)
+    failures = {}
+    for sample in samples:
+        for rule in sample['checks']['failed']:
+            failures[rule] = failures.get(rule, 0) + 1
+    return {
+        'runs': len(samples),
+        'mean_s': statistics.fmean(seconds),
+        'p50_s': seconds[len(seconds) // 2],
+        'llm_calls': statistics.fmean(sample['calls'] for sample in samples),
+        'prompt_tokens': statistics.fmean(sample['prompt_tokens'] for sample in samples),
+        'completion_tokens': statistics.fmean(sample['completion_tokens'] for sample in samples),
+        'compliance': sum(sample['checks']['passed'] for sample in samples) / len(samples),
+        'rule_failures': failures,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=1, help='passes over the topic list')
+    parser.add_argument('--topics', nargs='*', default=TOPICS)
+    parser.add_argument('--json', help='also write the summary to this file')
+    args = parser.parse_args()
+
+    results = run(build_pipelines(), args.topics, args.runs)
+    summary = {mode: summarize(samples) for mode, samples in results.items()}
+
+    print(f"{'mode':<12}{'mean s':>9}{'p50 s':>9}{'calls':>7}{'prompt tok':>12}"
+          f"{'compl tok':>11}{'rules ok':>10}")
+    for mode, row in summary.items():
+        print(f"{mode:<12}{row['mean_s']:>9.2f}{row['p50_s']:>9.2f}{row['llm_calls']:>7.1f}"
+              f"{row['prompt_tokens']:>12.0f}{row['completion_tokens']:>11.0f}"
+              f"{row['compliance']:>10.0%}")
+        if row['rule_failures']:
+            print(f"{'':<12}failed rules: {row['rule_failures']}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'summary': summary, 'runs': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""Per-request overhead of the prepared PostPipeline vs building a Crew per call.
+
+The LLM is the stub backend with zero latency, so the numbers are
+pure CrewAI/pipeline overhead: object construction, pydantic validation,
+task interpolation and crew execution.
+
+    python -m benchmarks.bench_pipeline --requests 200
+"""
+import argparse
+import os
+import statistics
+import time
+import tracemalloc
+
+# No provider is called
+os.environ.setdefault("LLM_BACKEND", "stub")
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+from crewai import Crew, Task
+
+import main3
+from llm_backends import StubLLM
+
+
+def build_legacy_crew(writer, editor, topic):
+    # What create_linkedin_post did before PostPipeline: new agents, tasks
+    # and crew on every call
+    writer, editor = writer.copy(), editor.copy()
+    writing_task = Task(
+        description=main3.WRITING_TASK_DESCRIPTION.format(topic=topic),
+        agent=writer,
+        expected_output=main3.WRITING_TASK_OUTPUT
+    )
+    editing_task = Task(
+        description=main3.EDITING_TASK_DESCRIPTION,
+        agent=editor,
+        expected_output=main3.EDITING_TASK_OUTPUT
+    )
+    return Crew(agents=[writer, editor], tasks=[writing_task, editing_task], verbose=False)
+
+
+def legacy_post(writer, editor, topic):
+    return str(build_legacy_crew(writer, editor, topic).kickoff())
+
+
+def time_calls(fn, n):
+    samples = []
+    for i in range(n):
+        start = time.perf_counter()
+        fn(f"Benchmark topic {i}")
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def peak_kib(fn, n):
+    peaks = []
+    tracemalloc.start()
+    for i in range(n):
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        fn(f"Benchmark topic {i}")
+        peaks.append((tracemalloc.get_traced_memory()[1] - base) / 1024)
+    tracemalloc.stop()
+    return peaks
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        'mean': statistics.fmean(samples),
+        'p50': samples[len(samples) // 2],
+        'p95': samples[int(len(samples) * 0.95) - 1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=10)
+    args = parser.parse_args()
+
+    # Answers immediately so only our own overhead is measured
+    llm = StubLLM(model="stub/instant", latency_ms="fixed:0", tokens_per_second="fixed:0", stream=False)
+    writer = main3.linkedin_writer.copy()
+    writer.llm = llm
+    editor = main3.editor.copy()
+    editor.llm = llm
+    pipeline = main3.PostPipeline([
+        main3.Stage('writing', writer, main3.WRITING_TASK_DESCRIPTION, main3.WRITING_TASK_OUTPUT),
+        main3.Stage('editing', editor, main3.EDITING_TASK_DESCRIPTION, main3.EDITING_TASK_OUTPUT),
+    ])
+
+    paths = {
+        'per-request crew': lambda topic: legacy_post(writer, editor, topic),
+        'prepared pipeline': pipeline.run,
+    }
+    construction = {
+        'per-request crew': lambda topic: build_legacy_crew(writer, editor, topic),
+        'prepared pipeline': lambda topic: pipeline._idle.put(pipeline._idle.get()),
+    }
+
+    print(f"{'path':<20}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'build ms':>10}{'peak KiB':>10}")
+    for name, fn in paths.items():
+        time_calls(fn, args.warmup)
+        total = summarize(time_calls(fn, args.requests))
+        build = summarize(time_calls(construction[name], args.requests))
+        memory = summarize(peak_kib(fn, min(args.requests, 50)))
+        print(f"{name:<20}{total['mean']:>10.2f}{total['p50']:>10.2f}{total['p95']:>10.2f}"
+              f"{build['mean']:>10.3f}{memory['mean']:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
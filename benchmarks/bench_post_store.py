@@ -0,0 +1,102 @@
+"""Write throughput and /history, /search latency of the post store at 1M posts.
+
+Records --posts synthetic posts (about 180 words each, from a
+Zipf-distributed vocabulary) through PostStore.record(), so the batched
+writer thread does the inserts, then times history pages (the first, and
+deep ones via `before`) and searches for common, rare, several and stemmed
+words.
+
+    python -m benchmarks.bench_post_store --posts 1000000 --path /tmp/posts.db
+"""
+import argparse
+import itertools
+import os
+import random
+import statistics
+import time
+
+from post_store import PostStore
+
+SUBJECTS = ('AI', 'remote work', 'cloud cost', 'data privacy', 'leadership', 'hiring', 'burnout',
+            'climate tech', 'open source', 'cybersecurity', 'product management', 'sales')
+COMMON = ('team', 'customers', 'growth', 'habit', 'metric', 'feedback', 'roadmap', 'budget', 'mentor',
+          'experiment', 'launch', 'process', 'quality', 'strategy', 'culture', 'story', 'mistake', 'lesson',
+          'decision', 'priority', 'tool', 'workflow', 'meeting', 'goal', 'trust', 'career', 'risk', 'market')
+SYLLABLES = ('ba', 'ko', 'ri', 'mu', 'te', 'sa', 'lo', 'vi', 'ne', 'da', 'pu', 'ge', 'fo', 'zi')
+
+
+def vocabulary(rng, size):
+    # The common words first, then made-up ones; word frequency follows
+    # Zipf's law, like real text
+    words = list(COMMON)
+    while len(words) < size:
+        words.append(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return words, list(itertools.accumulate(1 / rank for rank in range(1, len(words) + 1)))
+
+
+def synthetic_post(rng, vocab, index):
+    subject = rng.choice(SUBJECTS)
+    # A per-post rare word, so some searches match a handful of posts
+    words = rng.choices(vocab[0], cum_weights=vocab[1], k=170) + [f"project{index % 5000}x"]
+    rng.shuffle(words)
+    post = (f"{subject} is changing faster than most of us expected. {' '.join(words)}. "
+            f"What do you think? #{subject.replace(' ', '')}")
+    return post, subject
+
+
+def timed(call, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return statistics.median(timings) * 1e3, timings[min(len(timings) - 1, int(len(timings) * 0.99))] * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--posts', type=int, default=1000000)
+    parser.add_argument('--path', default='/tmp/bench_posts.db')
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(args.path + suffix):
+            os.remove(args.path + suffix)
+    store = PostStore(args.path, max_queued=20000)
+    rng = random.Random(7)
+    vocab = vocabulary(rng, 20000)
+    start = time.perf_counter()
+    for index in range(args.posts):
+        post, subject = synthetic_post(rng, vocab, index)
+        while not store.record(f"{subject} lessons {index}", post, mode='two-agent', model='stub/linkedin-post',
+                               seconds=1.0, prompt_tokens=480, completion_tokens=320):
+            # Queue full: let the writer catch up (a real server would drop the row)
+            store.flush()
+    store.flush()
+    fill = time.perf_counter() - start
+    stats = store.stats()
+    print(f"{args.posts} posts written in {fill:.0f}s ({args.posts / fill:.0f}/s, "
+          f"{stats['batches']} batches, {os.path.getsize(args.path) / 2 ** 20:.0f} MiB)")
+
+    newest = store.history(limit=1)[0]['id']
+    second_page = store.search('culture')[-1]['id']
+    queries = {
+        'history, first page': lambda: store.history(limit=20),
+        'history, deep page': lambda: store.history(limit=20, before=rng.randint(1, newest)),
+        'search, common word': lambda: store.search('leadership', limit=20),
+        'search, two words': lambda: store.search('hiring mentor', limit=20),
+        'search, stemmed': lambda: store.search('mistakes', limit=20),
+        'search, rare word': lambda: store.search(f"project{rng.randrange(5000)}x", limit=20),
+        'search, no match': lambda: store.search('blockchain', limit=20),
+        'search, page 2': lambda: store.search('culture', limit=20, before=second_page),
+    }
+    print(f"{'query':<22}{'p50 ms':>9}{'p99 ms':>9}")
+    for name, call in queries.items():
+        p50, p99 = timed(call, args.repeat)
+        print(f"{name:<22}{p50:>9.2f}{p99:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
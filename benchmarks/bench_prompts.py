@@ -0,0 +1,55 @@
+"""Full vs compact prompt profile: tokens per request, latency and rule compliance.
+
+Builds the generation modes once per prompt profile (prompts.py) and runs
+every topic through each, counting LLM calls and estimated tokens like
+bench_modes. Also prints the static prefix of each prompt, the part a
+provider's prompt cache can reuse between requests. With the default groq
+backend this makes real provider calls; LLM_BACKEND=stub runs it offline,
+but the stub's latency doesn't depend on prompt length.
+
+    python -m benchmarks.bench_prompts --runs 3 --json prompts.json
+    LLM_BACKEND=stub python -m benchmarks.bench_prompts
+"""
+import argparse
+import json
+
+import main3
+from benchmarks.bench_modes import TOPICS, build_pipelines, run, summarize
+from prompts import PROFILE_NAMES, PROFILES, token_report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=1, help='passes over the topic list')
+    parser.add_argument('--topics', nargs='*', default=TOPICS)
+    parser.add_argument('--profiles', nargs='*', default=PROFILE_NAMES, choices=PROFILE_NAMES)
+    parser.add_argument('--json', help='also write the summary to this file')
+    args = parser.parse_args()
+
+    summary = {}
+    for profile in args.profiles:
+        results = run(build_pipelines(main3.build_pipelines(PROFILES[profile])), args.topics, args.runs)
+        summary[profile] = {mode: summarize(samples) for mode, samples in results.items()}
+
+    print(f"{'profile':<9}{'mode':<11}{'mean s':>8}{'p50 s':>8}{'calls':>7}{'prompt tok':>12}"
+          f"{'compl tok':>11}{'rules ok':>10}")
+    for profile, modes in summary.items():
+        for mode, row in modes.items():
+            print(f"{profile:<9}{mode:<11}{row['mean_s']:>8.2f}{row['p50_s']:>8.2f}{row['llm_calls']:>7.1f}"
+                  f"{row['prompt_tokens']:>12.0f}{row['completion_tokens']:>11.0f}{row['compliance']:>10.0%}")
+            if row['rule_failures']:
+                print(f"{'':<20}failed rules: {row['rule_failures']}")
+
+    print(f"\n{'profile':<9}{'stage':<9}{'prompt tok':>12}{'static prefix':>15}")
+    for profile in args.profiles:
+        for stage, tokens in token_report(profile).items():
+            print(f"{profile:<9}{stage:<9}{tokens['total']:>12}{tokens['static_prefix']:>15}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'summary': summary, 'tokens': {profile: token_report(profile) for profile in args.profiles}},
+                      f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
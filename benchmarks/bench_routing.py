@@ -0,0 +1,77 @@
+"""Tail latency of one agent's LLM calls: single model, hedged, and with a fallback.
+
+The primary is a stub with a heavy-tailed latency (lognormal, median
+--median-ms, sigma --sigma), called --calls times, --concurrency at a time,
+through llm_router:
+
+- primary only: what every call used to do
+- hedged: a second copy of the call after the route's p95
+- fallback: a steady, slower second model takes over after --deadline-ms
+
+    python -m benchmarks.bench_routing --calls 2000
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+from llm_backends import StubLLM
+from llm_router import HEDGE_MIN_SAMPLES, build_routed_llm
+
+MESSAGES = [{'role': 'user', 'content': 'Create an engaging LinkedIn post about: tail latency'}]
+
+
+def stub(model, latency_ms):
+    return StubLLM(model=model, latency_ms=latency_ms, tokens_per_second="fixed:0", stream=False, seed=3)
+
+
+async def measure(llm, calls, concurrency):
+    async def one():
+        start = time.perf_counter()
+        await llm.acall(MESSAGES)
+        return time.perf_counter() - start
+
+    # Enough history for the p95 the hedge waits for
+    for _ in range(HEDGE_MIN_SAMPLES):
+        await one()
+    latencies = []
+    for _ in range(calls // concurrency):
+        latencies += await asyncio.gather(*[one() for _ in range(concurrency)])
+    return sorted(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--median-ms', type=float, default=50)
+    parser.add_argument('--sigma', type=float, default=1.0)
+    parser.add_argument('--deadline-ms', type=float, default=250)
+    args = parser.parse_args()
+
+    tail = f"lognormal:{args.median_ms:g}:{args.sigma:g}"
+    steady = f"fixed:{args.median_ms * 2:g}"
+    setups = {
+        'primary only': lambda: build_routed_llm([stub('primary', tail)], hedge=False),
+        'hedged': lambda: build_routed_llm([stub('primary', tail)], hedge=True),
+        'fallback': lambda: build_routed_llm([stub('primary', tail), stub('backup', steady)],
+                                             deadline=args.deadline_ms / 1000, hedge=False),
+    }
+
+    print(f"{args.calls} calls, {args.concurrency} at a time, primary latency {tail} ms")
+    print(f"{'setup':<14}{'p50 ms':>8}{'p95 ms':>8}{'p99 ms':>8}{'max ms':>8}{'extra calls':>13}")
+    for name, build in setups.items():
+        llm = build()
+        latencies = asyncio.run(measure(llm, args.calls, args.concurrency))
+        made = sum(route['calls'] for route in llm.stats().values())
+        extra = made - len(latencies) - HEDGE_MIN_SAMPLES
+        p50, p95, p99 = (latencies[int(len(latencies) * q)] * 1000 for q in (0.5, 0.95, 0.99))
+        print(f"{name:<14}{p50:>8.0f}{p95:>8.0f}{p99:>8.0f}{latencies[-1] * 1000:>8.0f}"
+              f"{extra / len(latencies):>13.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Goodput under a burst against a rate-limited provider, with and without the scheduler.
+
+The stub LLM allows --provider-rpm calls a minute (a token bucket with a full
+minute of burst, like most providers) and answers 429 past that. --burst
+fused-mode generations are started at once, through asyncio, on:
+
+- direct: the agents call the stub themselves, so every 429 is a failed post
+- scheduled: through LLMScheduler with no budget configured; it only has the
+  429s (and their Retry-After) to go on
+- scheduled + rpm: the same, told the provider's RPM, so it shapes calls up front
+
+    python -m benchmarks.bench_scheduler --burst 400 --provider-rpm 300
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import statistics
+import time
+
+os.environ.setdefault("LLM_BACKEND", "stub")
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+import main3
+from llm_backends import StubLLM
+from llm_scheduler import LLMScheduler, schedule
+
+
+def fused_pipeline(llm):
+    writer = main3.linkedin_writer.copy()
+    writer.llm = llm
+    return main3.PostPipeline([
+        main3.Stage('writing', writer, main3.FUSED_TASK_DESCRIPTION, main3.FUSED_TASK_OUTPUT),
+    ])
+
+
+async def burst(pipeline, topics):
+    async def one(topic):
+        start = time.perf_counter()
+        try:
+            await pipeline.arun(topic)
+            return time.perf_counter() - start
+        except Exception:
+            return None
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*[one(topic) for topic in topics])
+    return time.perf_counter() - start, [latency for latency in latencies if latency is not None]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--burst', type=int, default=400)
+    parser.add_argument('--provider-rpm', type=float, default=300)
+    args = parser.parse_args()
+
+    def stub():
+        # A fresh provider quota for every run
+        return StubLLM(model="stub/linkedin-post", latency_ms="lognormal:300:0.4",
+                       tokens_per_second="normal:250:40", rate_limit_rpm=args.provider_rpm, stream=False)
+
+    runs = {
+        'direct': lambda: stub(),
+        'scheduled': lambda: schedule(stub(), LLMScheduler()),
+        'scheduled + rpm': lambda: schedule(stub(), LLMScheduler(rpm=args.provider_rpm)),
+    }
+    topics = [f"Burst topic {i}" for i in range(args.burst)]
+
+    print(f"{args.burst} generations at once, provider limit {args.provider_rpm:g} RPM")
+    print(f"{'path':<17}{'ok':>6}{'failed':>8}{'wall s':>8}{'posts/s':>9}{'p50 s':>8}{'p95 s':>8}{'429s':>7}")
+    for name, build in runs.items():
+        llm = build()
+        with contextlib.redirect_stdout(io.StringIO()):
+            wall, latencies = asyncio.run(burst(fused_pipeline(llm), topics))
+        latencies.sort()
+        throttled = llm.scheduler.stats()['throttled'] if hasattr(llm, 'scheduler') else args.burst - len(latencies)
+        p50 = statistics.median(latencies) if latencies else 0.0
+        p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0.0
+        print(f"{name:<17}{len(latencies):>6}{args.burst - len(latencies):>8}{wall:>8.1f}"
+              f"{len(latencies) / wall:>9.1f}{p50:>8.2f}{p95:>8.2f}{throttled:>7}")
+
+
+if __name__ == '__main__':
+    main()
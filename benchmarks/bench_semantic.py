@@ -0,0 +1,87 @@
+"""Lookup latency of the semantic topic cache at 10k and 100k cached topics.
+
+Fills a SemanticCache with synthetic topics, then times get() for reworded
+versions of cached topics (hits) and unseen topics (misses), embedding
+included. Runs the brute-force NumPy index and, if hnswlib is installed, the
+HNSW index, and reports p50/p99 latency, the hit rate and the index size.
+
+    python -m benchmarks.bench_semantic --sizes 10000 100000
+"""
+import argparse
+import random
+import statistics
+import time
+
+import semantic_cache
+from semantic_cache import SemanticCache
+
+SUBJECTS = ('AI', 'remote work', 'cloud cost', 'data privacy', 'leadership', 'hiring', 'burnout',
+            'climate tech', 'open source', 'cybersecurity', 'product management', 'sales', 'design systems',
+            'mentoring', 'career growth', 'developer experience', 'supply chains', 'fintech', 'edge computing',
+            'customer success')
+ANGLES = ('productivity', 'ethics', 'trends', 'mistakes', 'lessons', 'myths', 'metrics', 'playbooks',
+          'budgets', 'culture', 'tools', 'automation', 'regulation', 'onboarding', 'strategy')
+AUDIENCES = ('startups', 'healthcare', 'banks', 'retail', 'schools', 'agencies', 'nonprofits',
+             'manufacturing', 'government', 'SaaS', 'freelancers', 'enterprises', 'media', 'logistics')
+SCOPE = ('stub/linkedin-post', 0.7, 'bench')
+
+
+def synthetic_topics(n, rng):
+    # Distinct topics: subject/angle/audience combinations plus a numbered tag
+    topics = []
+    while len(topics) < n:
+        subject, angle, audience = rng.choice(SUBJECTS), rng.choice(ANGLES), rng.choice(AUDIENCES)
+        topics.append(f"{subject} {angle} for {audience} {len(topics)}")
+    return topics
+
+
+def reworded(topic):
+    # Same words, different order and filler: "... for X N" -> "N X: ... in practice"
+    head, _, tail = topic.partition(' for ')
+    audience, number = tail.rsplit(' ', 1)
+    return f"{number} {audience}: {head} in practice"
+
+
+def time_lookups(cache, queries):
+    timings, hits = [], 0
+    for query in queries:
+        start = time.perf_counter()
+        found = cache.get(query, SCOPE)
+        timings.append(time.perf_counter() - start)
+        hits += found is not None
+    timings.sort()
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    return statistics.median(timings) * 1e3, p99 * 1e3, hits / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    indexes = ['brute'] + (['hnsw'] if semantic_cache.hnswlib is not None else [])
+    if len(indexes) == 1:
+        print("hnswlib not installed; brute-force index only")
+    print(f"{'index':<7}{'topics':>8}{'fill s':>8}{'MiB':>7}"
+          f"{'hit p50 ms':>12}{'hit p99 ms':>12}{'hit rate':>10}{'miss p50 ms':>13}{'miss p99 ms':>13}")
+    for size in args.sizes:
+        rng = random.Random(args.seed)
+        topics = synthetic_topics(size, rng)
+        hits = [reworded(topic) for topic in rng.sample(topics, args.queries)]
+        misses = [f"{rng.choice(ANGLES)} {rng.choice(SUBJECTS)} quarterly {i} review" for i in range(args.queries)]
+        for index in indexes:
+            cache = SemanticCache(max_entries=size, index=index)
+            start = time.perf_counter()
+            for topic in topics:
+                cache.set(topic, SCOPE, topic)
+            fill = time.perf_counter() - start
+            hit_p50, hit_p99, hit_rate = time_lookups(cache, hits)
+            miss_p50, miss_p99, _ = time_lookups(cache, misses)
+            print(f"{index:<7}{size:>8}{fill:>8.1f}{cache.index.nbytes() / 2 ** 20:>7.0f}"
+                  f"{hit_p50:>12.3f}{hit_p99:>12.3f}{hit_rate:>10.1%}{miss_p50:>13.3f}{miss_p99:>13.3f}")
+
+
+if __name__ == '__main__':
+    main()
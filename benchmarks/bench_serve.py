@@ -0,0 +1,173 @@
+"""Throughput, latency and memory of the production server against the dev server.
+
+Starts each server in a subprocess on the stub backend and drives it over
+HTTP with --concurrency keep-alive clients:
+
+- dev: `python main3.py`, Flask's development server (debugger, reloader)
+- waitress: `serve.py --server waitress`, one process with --threads
+- gunicorn: `serve.py`, --workers processes with --threads each, preloaded
+- gunicorn, no preload: every worker imports the app and loads crewai itself
+
+Two workloads: POST /generate for unique topics (cache bypassed, the stub
+answers after STUB_LATENCY_MS, 300 ms by default) and GET /healthz, which is
+all server overhead. Memory is the proportional set size (PSS) of the whole
+process tree after the run, so pages shared copy-on-write count once (Linux
+only).
+
+    python -m benchmarks.bench_serve --requests 400 --concurrency 32 --workers 4
+"""
+import argparse
+import http.client
+import json
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENV = dict(os.environ, LLM_BACKEND='stub', CREWAI_DISABLE_TELEMETRY='true', OTEL_SDK_DISABLED='true')
+ENV.setdefault('STUB_LATENCY_MS', 'fixed:300')
+ENV.setdefault('STUB_TOKENS_PER_SECOND', 'fixed:0')
+
+
+def server_commands(args):
+    serve = [sys.executable, 'serve.py', '--host', '127.0.0.1', '--port', str(args.port),
+             '--workers', str(args.workers), '--threads', str(args.threads)]
+    return {
+        'dev': [sys.executable, 'main3.py'],
+        'waitress': serve + ['--server', 'waitress'],
+        'gunicorn': serve + ['--server', 'gunicorn'],
+        'gunicorn, no preload': serve + ['--server', 'gunicorn', '--no-preload'],
+    }
+
+
+def wait_until_ready(port, process, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with {process.returncode}")
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', '/healthz')
+            if json.loads(conn.getresponse().read()).get('ready'):
+                return
+        except (OSError, ValueError):
+            pass
+        time.sleep(0.2)
+    raise RuntimeError('server not ready in time')
+
+
+def tree_pids(pid):
+    pids = [pid]
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            children = [int(child) for child in f.read().split()]
+    except OSError:
+        return pids
+    for child in children:
+        pids += tree_pids(child)
+    return pids
+
+
+def pss_mib(pid):
+    # None where /proc/<pid>/smaps_rollup doesn't exist (not Linux)
+    total = 0
+    for each in tree_pids(pid):
+        try:
+            with open(f'/proc/{each}/smaps_rollup') as f:
+                total += sum(int(line.split()[1]) for line in f if line.startswith('Pss:'))
+        except OSError:
+            return None
+    return total / 1024
+
+
+def run_load(port, requests, concurrency, generate):
+    local = threading.local()
+
+    def one(index):
+        conn = getattr(local, 'conn', None)
+        if conn is None:
+            conn = local.conn = http.client.HTTPConnection('127.0.0.1', port, timeout=300)
+        start = time.perf_counter()
+        try:
+            if generate:
+                body = json.dumps({'topic': f"Scaling web servers {index}", 'cache': 'bypass'})
+                conn.request('POST', '/generate', body=body, headers={'Content-Type': 'application/json'})
+            else:
+                conn.request('GET', '/healthz')
+            response = conn.getresponse()
+            response.read()
+            ok = response.status == 200
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            local.conn = None
+            ok = False
+        return time.perf_counter() - start, ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - start
+    latencies = sorted(seconds for seconds, ok in results if ok)
+    return {
+        'rps': len(latencies) / elapsed,
+        'p50_ms': statistics.median(latencies) * 1e3 if latencies else None,
+        'p99_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1e3 if latencies else None,
+        'errors': sum(1 for _, ok in results if not ok),
+    }
+
+
+def bench(name, command, args):
+    # serve.py loads the LLM stack before serving; have the dev server do it too
+    env = dict(ENV, PORT=str(args.port), WARM_UP='eager')
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL, start_new_session=True)
+    try:
+        started = time.perf_counter()
+        wait_until_ready(port=args.port, process=process)
+        ready = time.perf_counter() - started
+        run_load(args.port, args.concurrency, args.concurrency, generate=True)
+        rows = {
+            '/generate': run_load(args.port, args.requests, args.concurrency, generate=True),
+            '/healthz': run_load(args.port, args.requests * 10, args.concurrency, generate=False),
+        }
+        memory = pss_mib(process.pid)
+    finally:
+        os.killpg(process.pid, signal.SIGTERM)
+        try:
+            process.wait(timeout=args.graceful_timeout)
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
+            process.wait()
+    for workload, row in rows.items():
+        p50 = f"{row['p50_ms']:>9.0f}" if row['p50_ms'] is not None else f"{'-':>9}"
+        p99 = f"{row['p99_ms']:>9.0f}" if row['p99_ms'] is not None else f"{'-':>9}"
+        pss = f"{memory:>9.0f}" if memory is not None else f"{'-':>9}"
+        print(f"{name:<22}{workload:<11}{ready:>8.1f}{row['rps']:>9.1f}{p50}{p99}{row['errors']:>8}{pss}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--port', type=int, default=5099)
+    parser.add_argument('--graceful-timeout', type=int, default=30)
+    parser.add_argument('--servers', default=None, help='comma-separated subset of the servers')
+    args = parser.parse_args()
+
+    commands = server_commands(args)
+    names = args.servers.split(',') if args.servers else list(commands)
+    print(f"{'server':<22}{'workload':<11}{'ready s':>8}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}"
+          f"{'errors':>8}{'PSS MiB':>9}")
+    for name in names:
+        bench(name, commands[name], args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Cold start of the app: import time, time to a health check and to the first post.
+
+Each measurement runs in a fresh interpreter. `python -X importtime` shows
+where the import time of main3 goes (the slowest top-level imports, by
+cumulative time), then separate runs time:
+
+- import main3, and a GET /healthz right after it
+- warm_up(): loading crewai, the LLMs and the pipelines
+- a first POST /generate on the stub backend, without a warm-up
+
+    python -m benchmarks.bench_startup --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ENV = dict(os.environ, LLM_BACKEND='stub', CREWAI_DISABLE_TELEMETRY='true', OTEL_SDK_DISABLED='true',
+           STUB_LATENCY_MS='fixed:0', STUB_TOKENS_PER_SECOND='fixed:0')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Each prints one JSON object of seconds on its last line
+SCRIPTS = {
+    'import + /healthz': """
+import time; start = time.perf_counter()
+import main3
+imported = time.perf_counter()
+main3.app.test_client().get('/healthz')
+print(json.dumps({'import': imported - start, 'healthz': time.perf_counter() - start}))
+""",
+    'warm_up()': """
+import time; start = time.perf_counter()
+import main3
+main3.warm_up()
+print(json.dumps({'warm_up': time.perf_counter() - start}))
+""",
+    'first /generate': """
+import time; start = time.perf_counter()
+import main3
+main3.app.test_client().post('/generate', json={'topic': 'Cold starts'})
+print(json.dumps({'first_generate': time.perf_counter() - start}))
+""",
+}
+
+
+def run_script(script, *flags):
+    return subprocess.run([sys.executable, *flags, '-c', 'import json\n' + script], cwd=ROOT, env=ENV,
+                          capture_output=True, text=True, check=True)
+
+
+def slowest_imports(stderr, count):
+    # -X importtime lines are "import time: self [us] | cumulative | package",
+    # a module's imports listed (indented one level deeper) before it.
+    # Returns (seconds, name) for main3 and its direct imports, slowest first
+    children = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entry = (int(cumulative) / 1e6, name.strip())
+        if depth == 1:
+            children.append(entry)
+        elif depth == 0:
+            if entry[1] == 'main3':
+                return sorted(children + [entry], reverse=True)[:count]
+            children = []
+    return []
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10, help='slowest imports to list')
+    args = parser.parse_args()
+
+    traced = run_script('import main3', '-X', 'importtime')
+    print("Slowest imports of main3 (cumulative, -X importtime):")
+    for seconds, name in slowest_imports(traced.stderr, args.top):
+        print(f"  {seconds * 1000:>8.1f} ms  {name}")
+    print("crewai imported:", ' crewai' in traced.stderr)
+
+    print(f"\n{'step':<20}{'median s':>10}{'min s':>8}{'max s':>8}")
+    for name, script in SCRIPTS.items():
+        samples = {}
+        for _ in range(args.runs):
+            for key, seconds in json.loads(run_script(script).stdout.strip().splitlines()[-1]).items():
+                samples.setdefault(key, []).append(seconds)
+        for key, values in samples.items():
+            print(f"{key:<20}{statistics.median(values):>10.2f}{min(values):>8.2f}{max(values):>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Requests/sec for the web UI at GET /, before and after precompiling it.
+
+"render per hit" is what home() used to do: render_template_string() on the
+whole page, CSS and JS inlined, on every request. The other rows are the
+current static_assets path: a plain first visit, a gzip-capable browser, and
+a repeat visit that revalidates with If-None-Match and gets a 304.
+
+    python -m benchmarks.bench_static --requests 2000
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("LLM_BACKEND", "stub")
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+from flask import render_template_string
+
+import main3
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static')
+
+
+def inline_page():
+    # index.html with app.css / app.js pasted back in, like the old HTML_TEMPLATE
+    def read(name):
+        with open(os.path.join(STATIC_DIR, name), encoding='utf-8') as f:
+            return f.read()
+
+    return (read('index.html')
+            .replace('<link rel="stylesheet" href="/static/app.css">', f"<style>\n{read('app.css')}</style>")
+            .replace('<script src="/static/app.js"></script>', f"<script>\n{read('app.js')}</script>"))
+
+
+def requests_per_second(client, path, n, headers=None):
+    response = client.get(path, headers=headers)
+    start = time.perf_counter()
+    for _ in range(n):
+        client.get(path, headers=headers)
+    return n / (time.perf_counter() - start), response
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    page = inline_page()
+    main3.app.add_url_rule('/__bench_render_per_hit', 'bench_render_per_hit',
+                           lambda: render_template_string(page))
+    client = main3.app.test_client()
+    etag = client.get('/', headers={'Accept-Encoding': 'gzip'}).headers['ETag']
+
+    cases = [
+        ('render per hit', '/__bench_render_per_hit', None),
+        ('precompiled', '/', None),
+        ('precompiled gzip', '/', {'Accept-Encoding': 'gzip'}),
+        ('conditional 304', '/', {'Accept-Encoding': 'gzip', 'If-None-Match': etag}),
+    ]
+    print(f"{'path':<20}{'req/s':>10}{'status':>8}{'bytes':>8}")
+    for name, path, headers in cases:
+        rps, response = requests_per_second(client, path, args.requests, headers)
+        print(f"{name:<20}{rps:>10.0f}{response.status_code:>8}{len(response.data):>8}")
+
+
+if __name__ == '__main__':
+    main()
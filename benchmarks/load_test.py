@@ -0,0 +1,314 @@
+"""Load test for POST /generate: latency percentiles, throughput, memory, stages.
+
+Drives the Flask app either in-process through the test client or over HTTP
+against a real threaded WSGI server, with N concurrent clients and a chosen
+topic mix. Runs on the stub LLM backend unless LLM_BACKEND says otherwise, so
+STUB_LATENCY_MS / STUB_TOKENS_PER_SECOND shape the simulated provider.
+
+    python -m benchmarks.load_test --requests 200 --concurrency 16
+    python -m benchmarks.load_test --target server --mix zipf --json after.json --baseline before.json
+
+Topic mixes: unique (every request misses the cache), repeat (cycles through
+the example topics) and zipf (skewed popularity over --topic-pool topics).
+"""
+import argparse
+import contextlib
+import http.client
+import io
+import json
+import os
+import random
+import statistics
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+os.environ.setdefault("LLM_BACKEND", "stub")
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+from crewai.llms.base_llm import BaseLLM
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+import main3
+from llm_scheduler import owns_retries
+
+try:
+    import resource
+except ImportError:
+    # Windows has no getrusage; memory is reported as null there
+    resource = None
+
+TOPICS = [
+    "AI in healthcare",
+    "Remote work productivity",
+    "Leadership lessons",
+    "Career growth tips",
+    "Digital transformation",
+]
+MIXES = ('unique', 'repeat', 'zipf')
+KEY_METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'rps', 'peak_rss_kib')
+
+
+def topic_stream(mix, n, pool=50, seed=0):
+    rng = random.Random(seed)
+    if mix == 'unique':
+        return [f"{TOPICS[i % len(TOPICS)]} {i}" for i in range(n)]
+    if mix == 'repeat':
+        return [TOPICS[i % len(TOPICS)] for i in range(n)]
+    # Topic k is picked with weight 1/k, like real traffic with a few hot topics
+    topics = [f"{TOPICS[k % len(TOPICS)]} {k}" for k in range(pool)]
+    return rng.choices(topics, weights=[1 / (k + 1) for k in range(pool)], k=n)
+
+
+class StageTimer:
+    # Per-stage samples in ms: LLM time per pipeline phase, and how long Flask
+    # spent serializing JSON responses
+
+    def __init__(self):
+        self.samples = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage, ms):
+        with self._lock:
+            self.samples.setdefault(stage, []).append(ms)
+
+    def reset(self):
+        with self._lock:
+            self.samples = {}
+
+
+class TimedLLM(BaseLLM):
+    # Forwards to the configured LLM and times each call by its stage. Like
+    # RoutedLLM it leaves 429s to the scheduler underneath (owns_retries)
+    inner: Any = None
+    timer: Any = None
+    phase: str = ''
+
+    @owns_retries
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self.inner.call(
+                messages, tools=tools, callbacks=callbacks,
+                available_functions=available_functions,
+                from_task=from_task, from_agent=from_agent,
+                response_model=response_model, **kwargs
+            )
+        finally:
+            self.timer.add(self.phase, (time.perf_counter() - start) * 1000)
+
+    @owns_retries
+    async def acall(self, messages, tools=None, callbacks=None, available_functions=None,
+                    from_task=None, from_agent=None, response_model=None, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await self.inner.acall(
+                messages, tools=tools, callbacks=callbacks,
+                available_functions=available_functions,
+                from_task=from_task, from_agent=from_agent,
+                response_model=response_model, **kwargs
+            )
+        finally:
+            self.timer.add(self.phase, (time.perf_counter() - start) * 1000)
+
+
+def instrument_pipelines(timer):
+    # Swap in pipelines whose agents call through TimedLLM; prompts (and so
+    # cache keys) and the deadline split between stages stay the same
+    for mode, pipeline in list(main3.pipelines.items()):
+        stages = []
+        for stage in pipeline.stages:
+            agent = stage.agent.copy()
+            agent.llm = TimedLLM(model=stage.agent.llm.model, inner=stage.agent.llm, timer=timer, phase=stage.phase)
+            stages.append(stage._replace(agent=agent))
+        main3.pipelines[mode] = main3.PostPipeline(
+            stages, size=main3.PIPELINE_POOL_SIZE, postprocess=pipeline.postprocess,
+            first_stage_share=pipeline.first_stage_share
+        )
+
+
+def timed_json_provider(timer):
+
+    class TimedJSONProvider(DefaultJSONProvider):
+
+        def dumps(self, obj, **kwargs):
+            start = time.perf_counter()
+            try:
+                return super().dumps(obj, **kwargs)
+            finally:
+                timer.add('serialization', (time.perf_counter() - start) * 1000)
+
+    return TimedJSONProvider(main3.app)
+
+
+class QuietHandler(WSGIRequestHandler):
+
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def client_sender(options):
+    client = main3.app.test_client()
+
+    def send(topic):
+        # Encoded here so only the app's own serialization is timed
+        response = client.post('/generate', data=json.dumps({'topic': topic, **options}),
+                               content_type='application/json')
+        return response.get_json()
+
+    return send
+
+
+@contextlib.contextmanager
+def server_sender(options):
+    server = make_server('127.0.0.1', 0, main3.app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    local = threading.local()
+
+    def send(topic):
+        # One keep-alive connection per client thread
+        if not hasattr(local, 'conn'):
+            local.conn = http.client.HTTPConnection('127.0.0.1', server.server_port, timeout=300)
+        body = json.dumps({'topic': topic, **options})
+        local.conn.request('POST', '/generate', body, {'Content-Type': 'application/json'})
+        return json.loads(local.conn.getresponse().read())
+
+    try:
+        yield send
+    finally:
+        server.shutdown()
+
+
+def run_load(send, topics, concurrency):
+    def one(topic):
+        start = time.perf_counter()
+        try:
+            data = send(topic)
+            ok, cached = bool(data.get('success')), bool(data.get('cached'))
+        except Exception:
+            ok, cached = False, False
+        return (time.perf_counter() - start) * 1000, ok, cached
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, topics))
+    return results, time.perf_counter() - start
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    if not samples:
+        return None
+    return samples[min(len(samples) - 1, max(0, round(q * len(samples)) - 1))]
+
+
+def describe(samples):
+    return {
+        'count': len(samples),
+        'mean_ms': statistics.fmean(samples) if samples else None,
+        'p50_ms': percentile(samples, 0.50),
+        'p95_ms': percentile(samples, 0.95),
+        'p99_ms': percentile(samples, 0.99),
+    }
+
+
+def peak_rss_kib():
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def compare(summary, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)['summary']
+    print(f"\nvs {baseline_path} ({baseline.get('commit') or 'unknown commit'})")
+    for metric in KEY_METRICS:
+        before, after = baseline.get(metric), summary.get(metric)
+        if before and after is not None:
+            print(f"  {metric:<14}{before:>12.1f} -> {after:>10.1f}  ({(after - before) / before:+.1%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--target', choices=('client', 'server'), default='client',
+                        help='in-process test client or a real threaded WSGI server')
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--mix', choices=MIXES, default='unique')
+    parser.add_argument('--topic-pool', type=int, default=50, help='distinct topics for --mix zipf')
+    parser.add_argument('--mode', choices=main3.MODES, default=main3.DEFAULT_MODE)
+    parser.add_argument('--cache', choices=main3.CACHE_MODES, help='cache mode sent with every request')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='write config, summary and raw latencies to this file')
+    parser.add_argument('--baseline', help='earlier --json output to compare against')
+    args = parser.parse_args()
+
+    options = {'mode': args.mode}
+    if args.cache:
+        options['cache'] = args.cache
+    timer = StageTimer()
+    main3.app.json = timed_json_provider(timer)
+    instrument_pipelines(timer)
+    topics = topic_stream(args.mix, args.requests, args.topic_pool, args.seed)
+
+    with contextlib.ExitStack() as stack:
+        send = (stack.enter_context(server_sender(options)) if args.target == 'server'
+                else client_sender(options))
+        # The app prints a few lines per request; keep the report readable
+        stack.enter_context(contextlib.redirect_stdout(io.StringIO()))
+
+        run_load(send, [f"warmup {i}" for i in range(args.warmup)], args.concurrency)
+        main3.post_cache.clear()
+        timer.reset()
+        rss_before = peak_rss_kib()
+        results, elapsed = run_load(send, topics, args.concurrency)
+
+    latencies = [ms for ms, _, _ in results]
+    summary = {
+        'commit': git_commit(),
+        'requests': len(results),
+        'errors': sum(1 for _, ok, _ in results if not ok),
+        'cache_hits': sum(1 for _, _, cached in results if cached),
+        'seconds': elapsed,
+        'rps': len(results) / elapsed,
+        **describe(latencies),
+        'peak_rss_kib': peak_rss_kib(),
+        'rss_growth_kib': (peak_rss_kib() - rss_before) if rss_before is not None else None,
+        'stages': {stage: describe(samples) for stage, samples in sorted(timer.samples.items())},
+    }
+
+    print(f"{args.target} | {args.requests} requests | concurrency {args.concurrency} | "
+          f"mix {args.mix} | mode {args.mode} | backend {os.environ['LLM_BACKEND']}")
+    print(f"{'':<16}{'count':>7}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, row in [('request', summary), *summary['stages'].items()]:
+        print(f"{name:<16}{row['count'] if 'count' in row else row['requests']:>7}"
+              f"{row['mean_ms']:>10.1f}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}")
+    print(f"{summary['rps']:.1f} req/s, {summary['errors']} errors, {summary['cache_hits']} cache hits, "
+          f"peak RSS {summary['peak_rss_kib']} KiB")
+
+    if args.json:
+        config = {key: value for key, value in vars(args).items() if key not in ('json', 'baseline')}
+        config['llm_backend'] = os.environ['LLM_BACKEND']
+        config.update({key: value for key, value in os.environ.items() if key.startswith('STUB_')})
+        with open(args.json, 'w') as f:
+            json.dump({'config': config, 'summary': summary, 'latencies_ms': latencies}, f, indent=2)
+    if args.baseline:
+        compare(summary, args.baseline)
+
+
+if __name__ == '__main__':
+    main()
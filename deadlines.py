@@ -0,0 +1,68 @@
+"""Per-request deadlines, split into a time budget for each pipeline stage.
+
+A PostPipeline run opens a Deadline for the whole generation, and each stage
+gets a budget out of it (the writer a share, the editor what's left). The
+deadline is made current with deadline_scope(). RoutedLLM (llm_router.py)
+reads current_deadline() and stops waiting for a call once the running
+stage's budget is spent, raising DeadlineExceeded. Async calls are
+cancelled. A sync call can't be interrupted: one racing others on the
+router's threads finishes in the background and its answer is ignored, like
+a hedge that lost; one made on the caller's thread raises once it returns.
+
+Kept apart from llm_router (which needs crewai) so the web layer can handle
+DeadlineExceeded without loading the LLM stack.
+"""
+import contextlib
+import contextvars
+import time
+
+
+class DeadlineExceeded(Exception):
+
+    def __init__(self, phase, seconds):
+        super().__init__(f"The {phase or 'generation'} stage ran out of time after {seconds:.1f}s")
+        self.phase = phase
+        self.seconds = seconds
+
+
+class Deadline:
+    # seconds for the whole run. begin() opens a stage's budget: share of
+    # the whole deadline, or everything that's left when share is None
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.started = time.monotonic()
+        self.expires = self.started + seconds
+        self.phase = None
+        self.stage_started = self.started
+        self.stage_expires = self.expires
+
+    def begin(self, phase, share=None):
+        now = time.monotonic()
+        self.phase = phase
+        self.stage_started = now
+        self.stage_expires = self.expires if share is None else min(self.expires, now + share * self.seconds)
+
+    def remaining(self):
+        # Seconds left in the running stage's budget
+        return max(0.0, self.stage_expires - time.monotonic())
+
+    def exceeded(self):
+        return DeadlineExceeded(self.phase, time.monotonic() - self.stage_started)
+
+
+_current = contextvars.ContextVar('deadline', default=None)
+
+
+def current_deadline():
+    return _current.get()
+
+
+@contextlib.contextmanager
+def deadline_scope(deadline):
+    # Makes deadline (or None: no deadline) current for the calls inside
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
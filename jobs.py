@@ -0,0 +1,271 @@
+"""Background job queue for post generation.
+
+Jobs are handed to a fixed pool of worker threads through a bounded queue.
+When the queue is full, submit() raises QueueFull so the web layer can answer
+429 instead of piling up blocked requests. Finished jobs are kept for
+result_ttl seconds so clients can poll them, and can optionally be pushed to
+a webhook. close() stops taking jobs and waits for the queued and running
+ones to finish, for a graceful shutdown.
+
+Webhooks only go to public addresses, or to the hosts of an allowlist, so a
+job can't be used to make the server call its own internal services. The
+request connects to the very address that was checked, so a host whose DNS
+answer changes in between (DNS rebinding) can't redirect it.
+"""
+import http.client
+import ipaddress
+import json
+import queue
+import socket
+import ssl
+import threading
+import time
+import urllib.parse
+import uuid
+
+
+class QueueFull(Exception):
+    pass
+
+
+def check_webhook(url, allowed_hosts=()):
+    # Raises ValueError unless url is http(s) on a host the server may call:
+    # one of allowed_hosts if there are any, else one that resolves only to
+    # public addresses (no private, loopback, link-local or reserved ones).
+    # Returns the checked address to connect to, or None for allowed_hosts
+    if not isinstance(url, str):
+        raise ValueError('webhook must be an http(s) URL')
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise ValueError('webhook must be an http(s) URL')
+    host = parts.hostname.lower()
+    if allowed_hosts:
+        if host not in allowed_hosts:
+            raise ValueError(f'webhook host {host} is not allowed')
+        return None
+    try:
+        infos = socket.getaddrinfo(host, parts.port or 80, proto=socket.IPPROTO_TCP)
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+    except (OSError, UnicodeError):
+        raise ValueError(f"webhook host {host} can't be resolved")
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split('%')[0])
+        if ip.version == 6 and ip.ipv4_mapped:
+            ip = ip.ipv4_mapped
+        if not ip.is_global or ip.is_multicast:
+            raise ValueError('webhook must not point at a private, loopback or link-local address')
+    return addresses[0]
+
+
+class _PinnedHTTPConnection(http.client.HTTPConnection):
+    # Connects to address instead of resolving host again; the Host header
+    # still names host
+
+    def __init__(self, host, port=None, address=None, **kwargs):
+        super().__init__(host, port, **kwargs)
+        self.address = address
+
+    def connect(self):
+        self.sock = socket.create_connection((self.address or self.host, self.port),
+                                             self.timeout, self.source_address)
+
+
+class _PinnedHTTPSConnection(_PinnedHTTPConnection):
+    # The same over TLS; the certificate is checked against host (SNI too)
+    default_port = http.client.HTTPS_PORT
+
+    def connect(self):
+        super().connect()
+        self.sock = ssl.create_default_context().wrap_socket(self.sock, server_hostname=self.host)
+
+
+def post_webhook(url, address, body, timeout=10):
+    # POSTs JSON to url over a connection to address (see check_webhook).
+    # Redirects aren't followed: they could lead anywhere
+    parts = urllib.parse.urlsplit(url)
+    connection_class = _PinnedHTTPSConnection if parts.scheme == 'https' else _PinnedHTTPConnection
+    connection = connection_class(parts.hostname, parts.port, address=address, timeout=timeout)
+    path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+    try:
+        connection.request('POST', path, body=body, headers={'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        response.read()
+        if response.status >= 300:
+            raise OSError(f'HTTP {response.status} {response.reason}')
+    finally:
+        connection.close()
+
+
+class Job:
+
+    def __init__(self, payload, webhook=None):
+        self.id = uuid.uuid4().hex
+        self.payload = payload
+        self.webhook = webhook
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed', 'cancelled')
+
+    def to_dict(self):
+        data = {
+            'job_id': self.id,
+            'status': self.status,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+        if self.status == 'done':
+            data['result'] = self.result
+        if self.error is not None:
+            data['error'] = self.error
+        return data
+
+
+class JobQueue:
+
+    def __init__(self, run, max_workers=4, max_queued=32, result_ttl=3600, webhook_hosts=()):
+        # run(payload) does the actual work and returns a JSON-serializable result.
+        # webhook_hosts, if any, are the only hosts webhooks may go to
+        self.run = run
+        self.webhook_hosts = frozenset(host.lower() for host in webhook_hosts)
+        self.max_workers = max_workers
+        self.result_ttl = result_ttl
+        self.max_queued = max_queued
+        self._jobs = {}
+        self._counters = {'submitted': 0, 'rejected': 0, 'done': 0, 'failed': 0, 'cancelled': 0}
+        self._closed = False
+        self.start()
+
+    def start(self):
+        # Threads don't survive fork(): a worker process forked from a
+        # preloaded server calls this again to get its own. The queue and
+        # lock are new too, as the old ones may still list the parent's
+        # threads as waiters
+        self._queue = queue.Queue(maxsize=self.max_queued)
+        self._lock = threading.Lock()
+        # Jobs submitted whose worker hasn't finished with them yet
+        self._pending = 0
+        for i in range(self.max_workers):
+            threading.Thread(target=self._work, name=f'job-worker-{i}', daemon=True).start()
+
+    def submit(self, payload, webhook=None):
+        # Raises ValueError for a webhook check_webhook refuses
+        if webhook:
+            check_webhook(webhook, self.webhook_hosts)
+        if self._closed:
+            self._count('rejected')
+            raise QueueFull('Server is shutting down')
+        job = Job(payload, webhook)
+        self._prune()
+        # Known (and waited for by close()) before a worker can pick it up
+        with self._lock:
+            self._jobs[job.id] = job
+            self._pending += 1
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                del self._jobs[job.id]
+                self._pending -= 1
+            self._count('rejected')
+            raise QueueFull(f'Job queue is full ({self._queue.maxsize} waiting)')
+        self._count('submitted')
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        # Queued jobs never start. A running LLM call can't be interrupted, but
+        # its result is discarded and the job reports 'cancelled' right away;
+        # close() still waits for it, as its worker is busy until it returns.
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return job
+            job.status = 'cancelled'
+            job.finished_at = time.time()
+        self._count('cancelled')
+        return job
+
+    def close(self, timeout=None):
+        # Stop taking jobs and wait until none are queued or running. True if
+        # they all finished within timeout seconds
+        self._closed = True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                if not self._pending:
+                    return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            queued = self._queue.qsize()
+            stats['running'] = self._pending - queued
+        stats['queued'] = queued
+        stats['max_workers'] = self.max_workers
+        stats['max_queued'] = self._queue.maxsize
+        return stats
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            try:
+                self._process(job)
+            finally:
+                with self._lock:
+                    self._pending -= 1
+
+    def _process(self, job):
+        with self._lock:
+            if job.status == 'cancelled':
+                return
+            job.status = 'running'
+            job.started_at = time.time()
+        try:
+            result, error = self.run(job.payload), None
+        except Exception as e:
+            result, error = None, str(e)
+            print(f"❌ Job {job.id} failed: {error}")
+        with self._lock:
+            if job.status == 'cancelled':
+                return
+            job.status = 'failed' if error is not None else 'done'
+            job.result, job.error = result, error
+            job.finished_at = time.time()
+        self._count(job.status)
+        if job.webhook:
+            self._notify(job)
+
+    def _notify(self, job):
+        try:
+            # Checked again: the host's DNS may have changed since submit().
+            # The request then goes to the address that passed
+            address = check_webhook(job.webhook, self.webhook_hosts)
+            post_webhook(job.webhook, address, json.dumps(job.to_dict()).encode('utf-8'))
+        except Exception as e:
+            print(f"⚠️ Webhook for job {job.id} failed: {e}")
+
+    def _prune(self):
+        cutoff = time.time() - self.result_ttl
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.finished and job.finished_at < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
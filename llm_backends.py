@@ -0,0 +1,224 @@
+"""LLM backends the agents can run on, selected with LLM_BACKEND.
+
+- groq (default): Groq through CrewAI, needs GROQ_API_KEY
+- crewai: any model string CrewAI's LLM class understands (LLM_MODEL)
+- stub: a local, deterministic fake for offline load tests and benchmarks.
+  It writes a plausible post about the requested topic and simulates the
+  provider's time-to-first-token and token rate, including streaming.
+  STUB_RATE_LIMIT_RPM makes it answer 429 past that many calls a minute.
+  It reports token usage like a provider: one token per streamed chunk.
+
+Stub timings are distributions written as "kind:params" (milliseconds for
+latency, tokens per second for rate): "fixed:300", "uniform:200:600",
+"normal:300:50" (mean, stddev) or "lognormal:300:0.5" (median, sigma).
+"""
+import asyncio
+import hashlib
+import math
+import os
+import random
+import re
+import threading
+import time
+
+from crewai import LLM
+from crewai.events.types.llm_events import LLMCallType
+from crewai.llms.base_llm import BaseLLM, llm_call_context
+from pydantic import PrivateAttr
+
+from llm_scheduler import TokenBucket
+from metrics import estimate_tokens, prompt_text
+
+
+BACKENDS = ('groq', 'crewai', 'stub')
+DEFAULT_MODELS = {
+    'groq': "groq/llama-3.3-70b-versatile",
+    'crewai': "groq/llama-3.3-70b-versatile",
+    'stub': "stub/linkedin-post",
+}
+
+STUB_POST = """{Topic} is changing faster than most of us expected.
+
+A year ago I thought I understood it. Then I spent three months working on it every day, and most of my assumptions fell apart.
+
+Here is what I learned along the way:
+
+1. Start small. One focused experiment beats a big plan that never ships.
+
+2. Measure what matters. Pick one number that shows real progress and review it with your team every week.
+
+3. Bring people along. The best ideas fail when the people doing the work don't understand why they matter.
+
+4. Learn in public. Sharing our mistakes early saved us months of rework and built a lot of trust.
+
+None of this is complicated. The hard part is doing it consistently when things get busy and the old habits look easier. Progress rarely feels dramatic while you are in the middle of it.
+
+What is the biggest lesson {topic} has taught you so far?
+
+{hashtag} #Learning #Leadership #Growth"""
+
+# A weaker first draft: no takeaway list and no hashtags, so it needs the editor
+STUB_ROUGH_DRAFT = """{Topic} is changing faster than most of us expected.
+
+A year ago I thought I understood it. Then I spent three months working on it every day, and most of my assumptions fell apart. Starting small helped, measuring what matters helped, and bringing people along helped most of all.
+
+What is the biggest lesson {topic} has taught you so far?"""
+
+# The writer prompt names the topic; the editor only sees the draft's hook
+TOPIC_RE = re.compile(r'^\s*Topic: (.+)|^(.+?) is changing faster than most', re.MULTILINE)
+# Several drafts edited in one call (see PostPipeline.run_variants)
+VARIANT_RE = re.compile(r'^=== VARIANT (\d+) ===$', re.MULTILINE)
+
+
+def parse_distribution(spec):
+    kind, *params = spec.split(':')
+    params = [float(param) for param in params]
+    if kind == 'fixed' and len(params) == 1:
+        return lambda rng: params[0]
+    if kind == 'uniform' and len(params) == 2:
+        return lambda rng: rng.uniform(*params)
+    if kind == 'normal' and len(params) == 2:
+        return lambda rng: max(0.0, rng.gauss(*params))
+    if kind == 'lognormal' and len(params) == 2:
+        return lambda rng: params[0] * math.exp(rng.gauss(0.0, params[1]))
+    raise ValueError(f"Bad distribution {spec!r}; use fixed:x, uniform:a:b, normal:mu:sd or lognormal:median:sigma")
+
+
+class StubRateLimitError(Exception):
+    # Shaped like litellm's RateLimitError as far as the scheduler cares
+    status_code = 429
+
+    def __init__(self, retry_after):
+        super().__init__(f"Rate limit reached, retry after {retry_after:.1f}s (429)")
+        self.retry_after = retry_after
+
+
+class StubLLM(BaseLLM):
+    latency_ms: str = "lognormal:300:0.4"
+    tokens_per_second: str = "normal:250:40"
+    # Share of first drafts (writer or fused calls) that miss the rules
+    rough_draft_rate: float = 0.2
+    seed: int = 0
+    # Calls per minute before it starts answering 429 (0: unlimited)
+    rate_limit_rpm: float = 0
+
+    _rng: random.Random = PrivateAttr()
+    _rng_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _latency = PrivateAttr()
+    _rate = PrivateAttr()
+    _quota = PrivateAttr(default=None)
+
+    def model_post_init(self, __context):
+        super().model_post_init(__context)
+        self._rng = random.Random(self.seed)
+        self._latency = parse_distribution(self.latency_ms)
+        self._rate = parse_distribution(self.tokens_per_second)
+        if self.rate_limit_rpm:
+            self._quota = TokenBucket(self.rate_limit_rpm)
+
+    def respond(self, messages):
+        # Same prompt, same answer
+        prompt = prompt_text(messages)
+        match = TOPIC_RE.search(prompt)
+        topic = (match.group(1) or match.group(2)).strip() if match else "this topic"
+        digest = hashlib.sha256(f"{self.seed}:{prompt}".encode('utf-8')).digest()
+        rough = 'Review and optimize' not in prompt and digest[0] / 255 < self.rough_draft_rate
+        template = STUB_ROUGH_DRAFT if rough else STUB_POST
+        post = template.format(
+            topic=topic,
+            Topic=topic[:1].upper() + topic[1:],
+            hashtag='#' + ''.join(word[:1].upper() + word[1:] for word in re.findall(r'\w+', topic)),
+        )
+        numbers = VARIANT_RE.findall(prompt)
+        if numbers:
+            return '\n\n'.join(f"=== VARIANT {number} ===\n{post}" for number in numbers)
+        return post
+
+    def timings(self, text):
+        # (seconds before the first token, seconds per token) for one call
+        with self._rng_lock:
+            latency = self._latency(self._rng) / 1000
+            rate = self._rate(self._rng)
+        return latency, (1 / rate if rate > 0 else 0.0)
+
+    def check_quota(self):
+        if self._quota is not None:
+            wait = self._quota.try_take(1)
+            if wait:
+                raise StubRateLimitError(wait)
+
+    def chunks(self, text):
+        # Roughly one token per word, whitespace kept so chunks join back up
+        return re.findall(r'\S+\s*', text)
+
+    def usage(self, messages, text):
+        # What a provider reports with its answer
+        return {
+            'prompt_tokens': estimate_tokens(prompt_text(messages)),
+            'completion_tokens': len(self.chunks(text)),
+        }
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None, **kwargs):
+        # Emits the same started / chunk / completed events as a real provider
+        self.check_quota()
+        with llm_call_context():
+            self._emit_call_started_event(messages=messages, from_task=from_task, from_agent=from_agent)
+            text = self.respond(messages)
+            latency, per_token = self.timings(text)
+            time.sleep(latency)
+            if not self.stream:
+                time.sleep(per_token * len(self.chunks(text)))
+            else:
+                for chunk in self.chunks(text):
+                    time.sleep(per_token)
+                    self._emit_stream_chunk_event(chunk, from_task=from_task, from_agent=from_agent)
+            self._emit_call_completed_event(text, LLMCallType.LLM_CALL, from_task=from_task,
+                                            from_agent=from_agent, messages=messages,
+                                            usage=self.usage(messages, text))
+            return text
+
+    async def acall(self, messages, tools=None, callbacks=None, available_functions=None,
+                    from_task=None, from_agent=None, response_model=None, **kwargs):
+        self.check_quota()
+        with llm_call_context():
+            self._emit_call_started_event(messages=messages, from_task=from_task, from_agent=from_agent)
+            text = self.respond(messages)
+            latency, per_token = self.timings(text)
+            await asyncio.sleep(latency)
+            if not self.stream:
+                await asyncio.sleep(per_token * len(self.chunks(text)))
+            else:
+                for chunk in self.chunks(text):
+                    await asyncio.sleep(per_token)
+                    self._emit_stream_chunk_event(chunk, from_task=from_task, from_agent=from_agent)
+            self._emit_call_completed_event(text, LLMCallType.LLM_CALL, from_task=from_task,
+                                            from_agent=from_agent, messages=messages,
+                                            usage=self.usage(messages, text))
+            return text
+
+
+def build_llm(backend=None, model=None, temperature=None):
+    backend = backend or os.getenv("LLM_BACKEND", "groq")
+    if backend not in BACKENDS:
+        raise ValueError(f"LLM_BACKEND must be one of: {', '.join(BACKENDS)}")
+    model = model or os.getenv("LLM_MODEL") or DEFAULT_MODELS[backend]
+    if temperature is None:
+        temperature = float(os.getenv("LLM_TEMPERATURE", "0.7"))
+
+    if backend == 'stub':
+        return StubLLM(
+            model=model,
+            temperature=temperature,
+            stream=True,
+            latency_ms=os.getenv("STUB_LATENCY_MS", "lognormal:300:0.4"),
+            tokens_per_second=os.getenv("STUB_TOKENS_PER_SECOND", "normal:250:40"),
+            rough_draft_rate=float(os.getenv("STUB_ROUGH_DRAFT_RATE", "0.2")),
+            seed=int(os.getenv("STUB_SEED", "0")),
+            rate_limit_rpm=float(os.getenv("STUB_RATE_LIMIT_RPM", "0")),
+        )
+
+    if backend == 'groq' and not os.getenv("GROQ_API_KEY"):
+        raise ValueError("⚠️ GROQ_API_KEY not found! Please set it in your .env file")
+
+    return LLM(model=model, temperature=temperature, stream=True)
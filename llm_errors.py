@@ -0,0 +1,36 @@
+"""Errors from LLM providers, and how to tell a rate limit from the rest.
+
+Kept apart from llm_scheduler (which needs crewai) so the web layer can
+handle ProviderBusy without loading the LLM stack.
+"""
+
+
+class ProviderBusy(Exception):
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def is_rate_limited(error):
+    # litellm's RateLimitError, anything carrying a 429, or a wrapped one
+    while error is not None:
+        if getattr(error, 'status_code', None) == 429 or 'RateLimit' in type(error).__name__:
+            return True
+        text = str(error).lower()
+        if '429' in text or 'rate limit' in text:
+            return True
+        error = error.__cause__
+    return False
+
+
+def retry_after(error):
+    # Seconds the provider asked us to wait, if it said
+    seconds = getattr(error, 'retry_after', None)
+    if seconds is None:
+        headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+        seconds = headers.get('retry-after')
+    try:
+        return max(0.0, float(seconds))
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,381 @@
+"""Per-agent model routing with fallbacks and hedged requests.
+
+A RoutedLLM stands in for one agent's LLM and sends each call to a chain of
+routes (models), primary first:
+
+- fallback: if the route answering errors, or is still silent after
+  `deadline` seconds, the next route in the chain gets the call too; the
+  first answer wins
+- hedging: once a route has enough history, a call still running at that
+  route's p95 latency is sent to it a second time; whichever copy answers
+  first wins (tail latency is usually one slow replica, not the model).
+  At most one call in ten is hedged
+
+Both only apply to non-streaming calls, so two answers never interleave on
+a stream; streaming calls fall back on errors. Async losers are cancelled,
+sync ones finish in the background and are ignored.
+
+Every call, streaming or not, also stops at the request's deadline
+(deadlines.py): once the running stage's budget is spent, the call raises
+DeadlineExceeded and its attempts are dropped the same way. A sync call that
+nothing could race (one route, or streaming, and no hedge delay yet) runs on
+the caller's own thread instead; it can't be interrupted, so its deadline is
+checked when it returns.
+
+Every route keeps call, error, deadline, hedge and win counts, recent
+latency percentiles and a cost from its token counts: the usage the model
+reports with its LLMCallCompletedEvent, or an estimate for calls that report
+none. Reported usage is also passed on to metrics.capture_usage().
+"""
+import asyncio
+import collections
+import contextlib
+import contextvars
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any
+
+from crewai.events import LLMCallCompletedEvent, crewai_event_bus
+from crewai.llms.base_llm import BaseLLM
+from crewai.types.usage_metrics import UsageMetrics
+
+from deadlines import current_deadline
+from llm_scheduler import owns_retries
+from metrics import prompt_text, report_usage, token_counts
+
+
+# USD per million (prompt, completion) tokens; override with LLM_PRICES
+DEFAULT_PRICES = {
+    'groq/llama-3.3-70b-versatile': (0.59, 0.79),
+    'groq/llama-3.1-8b-instant': (0.05, 0.08),
+}
+# Latencies kept per route for the percentiles
+LATENCY_WINDOW = 500
+# Calls a route needs to have answered before its p95 is trusted for hedging
+HEDGE_MIN_SAMPLES = 20
+# Hedges allowed per call made, and how many can be saved up. Without a cap,
+# a provider that slows down for everyone gets twice the traffic
+HEDGE_BUDGET = 0.1
+HEDGE_BURST = 10
+
+# Sync calls that may be raced (a fallback or hedge can come) run on these
+# threads while the agent's own thread waits for the first answer. Threads
+# are only started when needed
+_race_pool = ThreadPoolExecutor(max_workers=256, thread_name_prefix='llm-route')
+
+# Seconds an answered call waits for its completion event to be handled;
+# CrewAI runs event handlers on a thread pool, usually within a millisecond
+USAGE_WAIT = 0.5
+# Where the completion events of the attempt running in this context go
+_attempt_usage = contextvars.ContextVar('attempt_usage', default=None)
+
+
+@crewai_event_bus.on(LLMCallCompletedEvent)
+def _record_usage(source, event):
+    # Handlers run in a copy of the emitting call's context, so this finds
+    # the queue of the attempt that made the call
+    pending = _attempt_usage.get()
+    if pending is not None:
+        pending.put(UsageMetrics.from_provider_dict(event.usage))
+
+
+@contextlib.contextmanager
+def _collecting_usage():
+    pending = queue.SimpleQueue()
+    token = _attempt_usage.set(pending)
+    try:
+        yield pending
+    finally:
+        _attempt_usage.reset(token)
+
+
+def _reported_usage(pending, wait=USAGE_WAIT):
+    # (prompt, completion) tokens per completion event of a finished attempt;
+    # empty when the model reported no usage
+    reports = []
+    try:
+        reports.append(pending.get(timeout=wait))
+        while True:
+            reports.append(pending.get_nowait())
+    except queue.Empty:
+        pass
+    usage = [(report.prompt_tokens, report.completion_tokens) for report in reports if report is not None]
+    for prompt_tokens, completion_tokens in usage:
+        report_usage(prompt_tokens, completion_tokens)
+    return usage
+
+
+def parse_prices(spec):
+    # "model=prompt:completion,..." in USD per million tokens
+    prices = {}
+    for item in filter(None, (part.strip() for part in (spec or '').split(','))):
+        model, _, price = item.rpartition('=')
+        prompt, _, completion = price.partition(':')
+        prices[model] = (float(prompt), float(completion or prompt))
+    return prices
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+class Route:
+
+    def __init__(self, llm, price=(0.0, 0.0)):
+        self.llm = llm
+        self.model = llm.model
+        self.price = price
+        self._quiet = None
+        self._hedge_credit = 0.0
+        self._latencies = collections.deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+        self._counters = {'calls': 0, 'errors': 0, 'deadline_exceeded': 0, 'hedges': 0, 'wins': 0,
+                          'cut_off': 0, 'prompt_tokens': 0, 'completion_tokens': 0}
+
+    def for_streaming(self, stream):
+        if stream or not getattr(self.llm, 'stream', False):
+            return self.llm
+        if self._quiet is None:
+            self._quiet = self.llm.model_copy(update={'stream': False})
+        return self._quiet
+
+    def hedge_delay(self):
+        # Seconds before a call is worth duplicating, or None until we know
+        with self._lock:
+            if len(self._latencies) < HEDGE_MIN_SAMPLES:
+                return None
+            return _percentile(self._latencies, 0.95)
+
+    def take_hedge(self):
+        # Spends one hedge from the budget, if there is one
+        with self._lock:
+            if self._hedge_credit < 1:
+                return False
+            self._hedge_credit -= 1
+            self._counters['hedges'] += 1
+            return True
+
+    def observe(self, prompt, answer, seconds, usage=()):
+        prompt_tokens, completion_tokens, _ = token_counts(usage, prompt, answer)
+        with self._lock:
+            self._latencies.append(seconds)
+            self._counters['prompt_tokens'] += prompt_tokens
+            self._counters['completion_tokens'] += completion_tokens
+
+    def count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+            if name == 'calls':
+                self._hedge_credit = min(HEDGE_BURST, self._hedge_credit + HEDGE_BUDGET)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            latencies = list(self._latencies)
+        stats['cost_usd'] = round(
+            (stats['prompt_tokens'] * self.price[0] + stats['completion_tokens'] * self.price[1]) / 1e6, 6
+        )
+        stats['p50_seconds'] = round(_percentile(latencies, 0.5), 4) if latencies else None
+        stats['p95_seconds'] = round(_percentile(latencies, 0.95), 4) if latencies else None
+        return stats
+
+
+class _Race:
+    # Bookkeeping shared by RoutedLLM.call and acall: which route to start
+    # next, and when to stop waiting and start it
+
+    def __init__(self, routes, deadline, hedge, stream):
+        self.routes = routes
+        self.deadline = deadline
+        self.hedge = hedge and not stream
+        self.stream = stream
+        self.current = routes[0]
+        self.route_started = time.monotonic()
+        self.hedged = False
+        self.next_fallback = 1
+        self.errors = []
+        # The request's deadline, if it has one
+        self.budget = current_deadline()
+
+    def _race_waits(self):
+        # Seconds until a hedge or fallback is due, for each that can come
+        waits = []
+        if self.hedge and not self.hedged:
+            delay = self.current.hedge_delay()
+            if delay is not None:
+                waits.append(self.route_started + delay - time.monotonic())
+        if not self.stream and self.next_fallback < len(self.routes):
+            waits.append(self.route_started + self.deadline - time.monotonic())
+        return waits
+
+    def can_race(self):
+        # False when only the deadline could interrupt the running call
+        return bool(self._race_waits())
+
+    def timeout(self):
+        # Seconds until on_timeout() has something to start (or the deadline
+        # passes), None if never
+        waits = self._race_waits()
+        if self.budget is not None:
+            waits.append(self.budget.remaining())
+        return max(0.0, min(waits)) if waits else None
+
+    def out_of_time(self, running):
+        # The error to raise once the stage's budget is spent, else None
+        if self.budget is None or self.budget.remaining() > 0:
+            return None
+        for route in running:
+            route.count('cut_off')
+        return self.budget.exceeded()
+
+    def on_timeout(self):
+        # Returns a route to start alongside the running calls, or None
+        now = time.monotonic()
+        if not self.stream and self.next_fallback < len(self.routes) \
+                and now - self.route_started >= self.deadline:
+            self.current.count('deadline_exceeded')
+            return self._fallback(now)
+        if self.hedge and not self.hedged:
+            delay = self.current.hedge_delay()
+            if delay is not None and now - self.route_started >= delay:
+                self.hedged = True
+                if self.current.take_hedge():
+                    return self.current
+        return None
+
+    def on_error(self, route, error, others_running):
+        # Returns the route to try next, if it's time for one
+        route.count('errors')
+        self.errors.append(error)
+        if not others_running and self.next_fallback < len(self.routes):
+            return self._fallback(time.monotonic())
+        return None
+
+    def _fallback(self, now):
+        self.current = self.routes[self.next_fallback]
+        self.next_fallback += 1
+        self.route_started = now
+        self.hedged = False
+        return self.current
+
+
+class RoutedLLM(BaseLLM):
+    # Forwards every call along its routes (see the module docstring)
+    routes: Any = None
+    deadline: float = 20.0
+    hedge: bool = True
+
+    # Routes are scheduled LLMs, which retry 429s themselves
+    @owns_retries
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None, **kwargs):
+        kwargs.update(tools=tools, callbacks=callbacks, available_functions=available_functions,
+                      from_task=from_task, from_agent=from_agent, response_model=response_model)
+        race = _Race(self.routes, self.deadline, self.hedge, self.stream)
+        running = {}
+        route = race.current
+        while True:
+            error = race.out_of_time(running.values())
+            if error is not None:
+                raise error
+            if route is not None and not running and not race.can_race():
+                # Nothing could race this call, so make it on this thread and
+                # check the deadline once it returns
+                try:
+                    answer = self._attempt(route, messages, kwargs)
+                except Exception as e:
+                    route = race.on_error(route, e, others_running=False)
+                    if route is None:
+                        raise
+                    continue
+                error = race.out_of_time([route])
+                if error is not None:
+                    raise error
+                route.count('wins')
+                return answer
+            if route is not None:
+                # In a copy of this context, so usage reaches the caller's capture_usage()
+                attempt = contextvars.copy_context().run
+                running[_race_pool.submit(attempt, self._attempt, route, messages, kwargs)] = route
+                route = None
+            if not running:
+                raise race.errors[-1]
+            done, _ = wait(running, timeout=race.timeout(), return_when=FIRST_COMPLETED)
+            if not done:
+                route = race.on_timeout()
+            for future in done:
+                finished = running.pop(future)
+                if future.exception() is None:
+                    finished.count('wins')
+                    return future.result()
+                route = race.on_error(finished, future.exception(), others_running=bool(running)) or route
+
+    @owns_retries
+    async def acall(self, messages, tools=None, callbacks=None, available_functions=None,
+                    from_task=None, from_agent=None, response_model=None, **kwargs):
+        kwargs.update(tools=tools, callbacks=callbacks, available_functions=available_functions,
+                      from_task=from_task, from_agent=from_agent, response_model=response_model)
+        race = _Race(self.routes, self.deadline, self.hedge, self.stream)
+        running = {}
+        route = race.current
+        try:
+            while True:
+                error = race.out_of_time(running.values())
+                if error is not None:
+                    raise error
+                if route is not None:
+                    running[asyncio.ensure_future(self._aattempt(route, messages, kwargs))] = route
+                    route = None
+                if not running:
+                    raise race.errors[-1]
+                done, _ = await asyncio.wait(running, timeout=race.timeout(),
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    route = race.on_timeout()
+                for task in done:
+                    finished = running.pop(task)
+                    if task.exception() is None:
+                        finished.count('wins')
+                        return task.result()
+                    route = race.on_error(finished, task.exception(), others_running=bool(running)) or route
+        finally:
+            # Losers (and everything, if we were cancelled) stop here
+            for task in running:
+                task.cancel()
+
+    def _attempt(self, route, messages, kwargs):
+        route.count('calls')
+        start = time.monotonic()
+        with _collecting_usage() as pending:
+            answer = route.for_streaming(self.stream).call(messages, **kwargs)
+        usage = _reported_usage(pending)
+        route.observe(prompt_text(messages), str(answer), time.monotonic() - start, usage)
+        return answer
+
+    async def _aattempt(self, route, messages, kwargs):
+        route.count('calls')
+        start = time.monotonic()
+        with _collecting_usage() as pending:
+            answer = await route.for_streaming(self.stream).acall(messages, **kwargs)
+        # Waits off the event loop if the event hasn't been handled yet
+        if pending.empty():
+            usage = await asyncio.to_thread(_reported_usage, pending)
+        else:
+            usage = _reported_usage(pending, 0)
+        route.observe(prompt_text(messages), str(answer), time.monotonic() - start, usage)
+        return answer
+
+    def stats(self):
+        return {route.model: route.stats() for route in self.routes}
+
+
+def build_routed_llm(llms, deadline=20.0, hedge=True, prices=None):
+    # llms: primary first, then fallbacks. Returns the RoutedLLM an agent uses
+    prices = {**DEFAULT_PRICES, **(prices or {})}
+    routes = [Route(llm, prices.get(llm.model, (0.0, 0.0))) for llm in llms]
+    primary = llms[0]
+    return RoutedLLM(model=primary.model, temperature=primary.temperature, stream=primary.stream,
+                     routes=routes, deadline=deadline, hedge=hedge)
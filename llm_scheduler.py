@@ -0,0 +1,373 @@
+"""Rate-limit-aware scheduling for every LLM call the agents make.
+
+Providers cap requests and tokens per minute and answer 429 past that. Under a
+burst, sending everything at once turns most requests into errors. Instead,
+each call through a ScheduledLLM:
+
+- reserves one request and its estimated tokens from the RPM / TPM token
+  buckets and sleeps until they are available (and any pause is over)
+- then waits for a slot from an adaptive concurrency limit (AIMD: +1 per
+  window of successful calls, halved on a 429, trimmed when recent latency
+  climbs well above the long-run average, a sign the provider is queueing
+  us), so a call waiting for budget doesn't hold a slot others could use
+- on a 429 waits Retry-After, or a jittered exponential backoff, and tries
+  again, up to max_retries times. Every other call is paused for Retry-After,
+  or for the un-jittered backoff when the provider doesn't send one
+
+Calls that still get throttled fail with ProviderBusy, which the API turns
+into a 503 instead of the provider's raw error. That is final: CrewAI's own
+rate-limit retry around LLM calls is switched off below the scheduler (see
+owns_retries), so LLM_MAX_RETRIES is the only retry budget.
+"""
+import asyncio
+import collections
+import functools
+import random
+import threading
+import time
+from typing import Any
+
+from crewai.llms.base_llm import BaseLLM
+
+try:
+    # Set while CrewAI's rate-limit retry runs; nested LLM calls then skip theirs
+    from crewai.llms.retry import _active_llm_rate_limit_retry
+except ImportError:
+    # A CrewAI without a retry of its own
+    _active_llm_rate_limit_retry = None
+
+from llm_errors import ProviderBusy, is_rate_limited, retry_after
+from metrics import estimate_tokens, prompt_text
+
+
+class TokenBucket:
+    # Refills per_minute / 60 per second up to burst. reserve() may take the
+    # level negative and returns how long the caller must wait for its turn,
+    # so concurrent callers queue up in order instead of polling
+
+    def __init__(self, per_minute, burst=None):
+        self.rate = per_minute / 60
+        self.capacity = burst or per_minute
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount):
+        with self._lock:
+            self._refill()
+            self.level -= amount
+            return max(0.0, -self.level / self.rate)
+
+    def try_take(self, amount):
+        # Takes amount only if it's there; returns 0, or the seconds until it would be
+        with self._lock:
+            self._refill()
+            if self.level >= amount:
+                self.level -= amount
+                return 0.0
+            return (amount - self.level) / self.rate
+
+    def adjust(self, amount):
+        # Charge (or refund, if negative) the difference once the real size is known
+        with self._lock:
+            self._refill()
+            self.level = min(self.capacity, self.level - amount)
+
+
+class AdaptiveLimiter:
+    # Concurrency limit shared by threads and coroutines. A release hands the
+    # slot straight to the longest waiter
+    decrease_cooldown = 1.0
+
+    def __init__(self, initial=4, minimum=1, maximum=32, latency_tolerance=2.0):
+        self.limit = float(initial)
+        # Like TCP slow start: +1 per success (doubling every round) until the
+        # first sign of trouble, then +1 per round
+        self.slow_start = True
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_tolerance = latency_tolerance
+        # Moving averages of call latency: recent calls vs the long run
+        self.recent_latency = None
+        self.baseline_latency = None
+        self.in_use = 0
+        self._waiters = collections.deque()
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            if self.in_use < int(self.limit) and not self._waiters:
+                self.in_use += 1
+                return
+            granted = threading.Event()
+            self._waiters.append(granted)
+        granted.wait()
+
+    async def aacquire(self):
+        with self._lock:
+            if self.in_use < int(self.limit) and not self._waiters:
+                self.in_use += 1
+                return
+            waiter = (asyncio.get_running_loop(), asyncio.get_running_loop().create_future())
+            self._waiters.append(waiter)
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._lock:
+                queued = waiter in self._waiters
+                if queued:
+                    self._waiters.remove(waiter)
+            # Granted just before the cancel landed: give the slot back.
+            # (Granted after it, _grant() gives it back.)
+            if not queued and waiter[1].done() and not waiter[1].cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        with self._lock:
+            self.in_use -= 1
+            woken = self._wake()
+        self._notify(woken)
+
+    def on_success(self, latency):
+        with self._lock:
+            if self.baseline_latency is None:
+                self.recent_latency = self.baseline_latency = latency
+            self.recent_latency += (latency - self.recent_latency) * 0.2
+            self.baseline_latency += (latency - self.baseline_latency) * 0.02
+            if self.recent_latency > self.baseline_latency * self.latency_tolerance:
+                self.limit = max(self.minimum, self.limit * 0.9)
+                self.slow_start = False
+            else:
+                self.limit = min(self.maximum, self.limit + (1 if self.slow_start else 1 / self.limit))
+            woken = self._wake()
+        self._notify(woken)
+
+    def on_throttle(self):
+        with self._lock:
+            now = time.monotonic()
+            # One burst of 429s is one signal, not one per failed call
+            if now - self._last_decrease >= self.decrease_cooldown:
+                self.limit = max(self.minimum, self.limit / 2)
+                self._last_decrease = now
+            self.slow_start = False
+
+    def queued(self):
+        return len(self._waiters)
+
+    def _wake(self):
+        woken = []
+        while self._waiters and self.in_use < int(self.limit):
+            self.in_use += 1
+            woken.append(self._waiters.popleft())
+        return woken
+
+    def _notify(self, woken):
+        for waiter in woken:
+            if isinstance(waiter, threading.Event):
+                waiter.set()
+            else:
+                loop, future = waiter
+                loop.call_soon_threadsafe(self._grant, future)
+
+    def _grant(self, future):
+        if future.cancelled():
+            self.release()
+        else:
+            future.set_result(None)
+
+
+class LLMScheduler:
+
+    def __init__(self, rpm=None, tpm=None, max_concurrency=64, initial_concurrency=8,
+                 max_retries=4, backoff_base=0.5, backoff_cap=30.0, expected_completion_tokens=300,
+                 latency_tolerance=2.0):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.limiter = AdaptiveLimiter(
+            initial=min(initial_concurrency, max_concurrency), maximum=max_concurrency,
+            latency_tolerance=latency_tolerance
+        )
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.expected_completion_tokens = expected_completion_tokens
+        self._paused_until = 0.0
+        self._rng = random.Random()
+        self._lock = threading.Lock()
+        self._counters = {'calls': 0, 'succeeded': 0, 'throttled': 0, 'retries': 0,
+                          'gave_up': 0, 'failed': 0, 'budget_wait_seconds': 0.0}
+
+    def run(self, call, prompt):
+        # call() makes one LLM request; prompt is its text, for the TPM estimate
+        self._count('calls')
+        for attempt in range(self.max_retries + 1):
+            time.sleep(self._budget_wait(prompt))
+            self.limiter.acquire()
+            try:
+                start = time.monotonic()
+                try:
+                    result = call()
+                except Exception as e:
+                    delay = self._failed(e, attempt)
+                else:
+                    self._succeeded(prompt, result, time.monotonic() - start)
+                    return result
+            finally:
+                self.limiter.release()
+            time.sleep(delay)
+
+    async def arun(self, call, prompt):
+        # run() for coroutines: call() returns an awaitable
+        self._count('calls')
+        for attempt in range(self.max_retries + 1):
+            await asyncio.sleep(self._budget_wait(prompt))
+            await self.limiter.aacquire()
+            try:
+                start = time.monotonic()
+                try:
+                    result = await call()
+                except Exception as e:
+                    delay = self._failed(e, attempt)
+                else:
+                    self._succeeded(prompt, result, time.monotonic() - start)
+                    return result
+            finally:
+                self.limiter.release()
+            await asyncio.sleep(delay)
+
+    def _budget_wait(self, prompt):
+        # Seconds until this call fits the RPM / TPM budgets and any pause
+        waits = [self._paused_until - time.monotonic()]
+        if self.requests is not None:
+            waits.append(self.requests.reserve(1))
+        if self.tokens is not None:
+            waits.append(self.tokens.reserve(estimate_tokens(prompt_text(prompt)) + self.expected_completion_tokens))
+        wait = max(0.0, *waits)
+        if wait:
+            with self._lock:
+                self._counters['budget_wait_seconds'] += wait
+        return wait
+
+    def _succeeded(self, prompt, result, latency):
+        self.limiter.on_success(latency)
+        if self.tokens is not None:
+            self.tokens.adjust(estimate_tokens(str(result)) - self.expected_completion_tokens)
+        self._count('succeeded')
+
+    def _failed(self, error, attempt):
+        # Returns the backoff before the next attempt, or raises
+        if not is_rate_limited(error):
+            self._count('failed')
+            raise error
+        self._count('throttled')
+        self.limiter.on_throttle()
+        asked = retry_after(error)
+        backoff = min(self.backoff_cap, self.backoff_base * 2 ** attempt)
+        # Full jitter, so throttled callers don't all come back together
+        delay = max(self._rng.uniform(0, backoff), asked or 0.0)
+        if attempt >= self.max_retries:
+            self._count('gave_up')
+            raise ProviderBusy(
+                f"The LLM provider is rate limiting requests; try again in {max(1, round(delay))}s",
+                retry_after=delay
+            ) from error
+        with self._lock:
+            self._counters['retries'] += 1
+            # Hold the other calls too, until the provider said it takes calls
+            # again or, if it didn't, for the backoff
+            self._paused_until = max(self._paused_until, time.monotonic() + (asked or backoff))
+        return delay
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        stats['budget_wait_seconds'] = round(stats['budget_wait_seconds'], 3)
+        stats.update(
+            concurrency_limit=round(self.limiter.limit, 2),
+            in_flight=self.limiter.in_use,
+            queued=self.limiter.queued(),
+            rpm=self.requests.rate * 60 if self.requests else None,
+            tpm=self.tokens.rate * 60 if self.tokens else None,
+        )
+        return stats
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+
+def owns_retries(method):
+    # For call / acall of a BaseLLM that handles 429s itself. CrewAI wraps
+    # every subclass's call in a retry of up to 3 attempts and would retry
+    # ProviderBusy too, once per wrapped layer (and the router's layer runs
+    # on threads that don't see the outer one's flag). This skips that
+    # wrapper, and turns it off for the LLM calls made inside
+    if _active_llm_rate_limit_retry is None:
+        return method
+    if asyncio.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def wrapper(*args, **kwargs):
+            token = _active_llm_rate_limit_retry.set(True)
+            try:
+                return await method(*args, **kwargs)
+            finally:
+                _active_llm_rate_limit_retry.reset(token)
+    else:
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            token = _active_llm_rate_limit_retry.set(True)
+            try:
+                return method(*args, **kwargs)
+            finally:
+                _active_llm_rate_limit_retry.reset(token)
+    # BaseLLM.__init_subclass__ leaves methods carrying this mark alone
+    wrapper._crewai_rate_limit_wrapped = True
+    return wrapper
+
+
+class ScheduledLLM(BaseLLM):
+    # Forwards every call to inner through the scheduler
+    inner: Any = None
+    scheduler: Any = None
+
+    @owns_retries
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None, **kwargs):
+        return self.scheduler.run(
+            lambda: self.inner.call(
+                messages, tools=tools, callbacks=callbacks, available_functions=available_functions,
+                from_task=from_task, from_agent=from_agent, response_model=response_model, **kwargs
+            ),
+            messages
+        )
+
+    @owns_retries
+    async def acall(self, messages, tools=None, callbacks=None, available_functions=None,
+                    from_task=None, from_agent=None, response_model=None, **kwargs):
+        return await self.scheduler.arun(
+            lambda: self.inner.acall(
+                messages, tools=tools, callbacks=callbacks, available_functions=available_functions,
+                from_task=from_task, from_agent=from_agent, response_model=response_model, **kwargs
+            ),
+            messages
+        )
+
+    def model_copy(self, *, update=None, deep=False):
+        # A non-streaming copy (see PostPipeline._without_streaming) needs a
+        # non-streaming inner LLM too
+        copy = super().model_copy(update=update, deep=deep)
+        if update and 'stream' in update:
+            copy.inner = self.inner.model_copy(update={'stream': update['stream']})
+        return copy
+
+
+def schedule(llm, scheduler):
+    return ScheduledLLM(model=llm.model, temperature=llm.temperature, stream=llm.stream,
+                        inner=llm, scheduler=scheduler)
@@ -1,615 +1,1467 @@
-from flask import Flask, render_template_string, request, jsonify
-from crewai import Agent, Task, Crew, LLM
+import time
+
+# Startup is timed from here; see /healthz
+_import_started = time.perf_counter()
+
+from flask import Flask, Response, g, request, jsonify
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import asyncio
+import json
 import os
+import queue
+import re
+import threading
 from dotenv import load_dotenv
+from collections import namedtuple
+from functools import partial
+from deadlines import Deadline, DeadlineExceeded, deadline_scope
+from jobs import JobQueue, QueueFull
+from llm_errors import ProviderBusy
+from metrics import MetricsRegistry, capture_usage, log_json, prompt_text, token_counts
+from post_cache import CACHE_MODES, build_post_cache, cache_key, template_hash
+from prompts import PROFILES, persona_prompt, task_prompt
+from post_store import MAX_PAGE_SIZE, build_post_store
+from post_rules import check_post, format_post, needs_editing, score_post
+from single_flight import SingleFlight
+from static_assets import StaticAssets
 
 # Load environment variables from .env file
 load_dotenv()
 
-app = Flask(__name__)
+# static/ is served by static_assets below, not Flask's default handler
+app = Flask(__name__, static_folder=None)
+
+# LLM_BACKEND picks groq (default, needs GROQ_API_KEY), crewai or stub.
+# Every call is scheduled to stay within the provider's rate limits, with one
+# scheduler per model: LLM_RPM / LLM_TPM (unset: no budget, only backoff and
+# adaptive concurrency)
+
+
+def _scheduled_llm(model, schedulers):
+    from llm_backends import build_llm
+    from llm_scheduler import LLMScheduler, schedule
+    inner = build_llm(model=model)
+    if inner.model not in schedulers:
+        schedulers[inner.model] = LLMScheduler(
+            rpm=float(os.getenv("LLM_RPM", "0")) or None,
+            tpm=float(os.getenv("LLM_TPM", "0")) or None,
+            max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "64")),
+            max_retries=int(os.getenv("LLM_MAX_RETRIES", "4"))
+        )
+    return schedule(inner, schedulers[inner.model])
+
+
+def _agent_llm(agent, schedulers):
+    # WRITER_MODEL / EDITOR_MODEL override LLM_MODEL per agent, and
+    # WRITER_FALLBACK_MODELS / EDITOR_FALLBACK_MODELS (default
+    # LLM_FALLBACK_MODELS) list the models to fall back to, in order
+    from llm_router import build_routed_llm, parse_prices
+    primary = os.getenv(f"{agent}_MODEL") or None
+    fallbacks = os.getenv(f"{agent}_FALLBACK_MODELS", os.getenv("LLM_FALLBACK_MODELS", ""))
+    models = [primary] + [model.strip() for model in fallbacks.split(',') if model.strip()]
+    return build_routed_llm(
+        [_scheduled_llm(model, schedulers) for model in models],
+        deadline=float(os.getenv("LLM_DEADLINE", "20")),
+        hedge=os.getenv("LLM_HEDGE", "1").lower() in ('1', 'true', 'yes'),
+        prices=parse_prices(os.getenv("LLM_PRICES"))
+    )
 
-# Get API key from environment variable
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+# Personas and task prompts (see prompts.py): PROMPT_PROFILE=compact sends the
+# same rules in about half the prompt tokens
+PROMPT_PROFILE = os.getenv("PROMPT_PROFILE", "full")
+if PROMPT_PROFILE not in PROFILES:
+    raise ValueError(f"PROMPT_PROFILE must be one of: {', '.join(PROFILES)}")
+prompts = PROFILES[PROMPT_PROFILE]
+
+WRITING_TASK_DESCRIPTION = prompts['writing_description']
+WRITING_TASK_OUTPUT = prompts['writing_output']
+EDITING_TASK_DESCRIPTION = prompts['editing_description']
+EDITING_TASK_OUTPUT = prompts['editing_output']
+# mode=fused: the writer drafts and edits in one call, half the round trips
+FUSED_TASK_DESCRIPTION = prompts['fused_description']
+FUSED_TASK_OUTPUT = prompts['fused_output']
+
+# variants=N: the first draft is the plain prompt, the others get an angle
+# each so the candidates actually differ
+VARIANT_ANGLES = (
+    "a short personal story",
+    "a contrarian take that challenges the usual advice",
+    "concrete numbers or a surprising fact",
+    "a practical step-by-step playbook",
+)
+MAX_VARIANTS = len(VARIANT_ANGLES) + 1
+
+# Drafts that need the editor share one call; each is sent and answered
+# under its own marker line
+VARIANT_MARKER = "=== VARIANT {} ==="
+VARIANT_MARKER_RE = re.compile(r'^=+\s*VARIANT\s+(\d+)\s*=+\s*$', re.MULTILINE | re.IGNORECASE)
+BATCH_EDITING_NOTE = """There are {count} posts in the context, each under its own "=== VARIANT k ===" line.
+Edit each one separately, and answer with all {count}, each under its original marker line, in the same order."""
+
+
+# Streaming requests currently running on a task: task id -> (on_event, phase)
+_stream_listeners = {}
+
+
+def _forward_stream_chunk(source, event):
+    # Subscribed to CrewAI's LLMStreamChunkEvent when the LLM stack loads
+    listener = _stream_listeners.get(getattr(event, 'task_id', None))
+    if listener:
+        on_event, phase = listener
+        on_event({'event': 'token', 'phase': phase, 'text': event.chunk})
+
+
+def _forward_handover(task_id, next_stage, text):
+    # Fires when a stage finishes and passes its text on, e.g. writer -> editor
+    listener = _stream_listeners.get(task_id)
+    if listener and (next_stage.run_if is None or next_stage.run_if(text)):
+        on_event, _ = listener
+        on_event({'event': 'phase', 'phase': next_stage.phase, 'draft': text})
+
+
+def _stage_entry(phase, seconds, prompt, completion, usage=()):
+    # One stage_log record. Token counts are the usage the stage's LLM calls
+    # reported (see metrics.capture_usage), or estimates from prompt and
+    # completion when they reported none; token_source says which. output
+    # is the stage's text, kept for the post history only
+    prompt_count, completion_count, source = token_counts(usage, prompt, completion)
+    return {
+        'phase': phase,
+        'seconds': seconds,
+        'prompt_tokens': prompt_count,
+        'completion_tokens': completion_count,
+        'token_source': source,
+        'output': completion,
+    }
+
+
+def _stage_summary(stage):
+    # A stage_log record for logs and the history: timings and tokens only
+    return {name: round(value, 4) if name == 'seconds' else value
+            for name, value in stage.items() if name != 'output'}
+
+
+def _stage_messages(stage, topic, context):
+    # The persona and task prompt CrewAI sends for a stage, for direct LLM calls
+    agent = stage.agent
+    return [
+        {'role': 'system', 'content': persona_prompt(agent.role, agent.backstory, agent.goal)},
+        {'role': 'user', 'content': task_prompt(stage.description, stage.expected_output, topic, context)},
+    ]
+
+
+# One agent + task of a pipeline; phase names the stage in streamed events.
+# A stage with run_if(previous_text) only runs when that returns True
+Stage = namedtuple('Stage', ['phase', 'agent', 'description', 'expected_output', 'run_if'],
+                   defaults=(None,))
+
+
+class UneditedPost(str):
+    # The writer's draft, served because a later stage ran out of time or
+    # failed (reason: 'deadline' or 'error'). Never cached; responses flag
+    # it as unedited
+
+    def __new__(cls, text, phase, reason):
+        post = super().__new__(cls, text)
+        post.phase, post.reason = phase, reason
+        return post
+
+
+class PostPipeline:
+    # A crew of stages, prepared once instead of per request. Only the topic
+    # changes between runs and is passed as a kickoff input. A crew keeps
+    # per-run state (agent executors, task outputs), so every run checks one
+    # out of a pool; when all are busy another is built and joins the pool.
+
+    def __init__(self, stages, size=1, postprocess=None, first_stage_share=None):
+        self.stages = stages
+        # postprocess(post, topic) runs locally on the crew's final text
+        self.postprocess = postprocess
+        # Share of a run's deadline the first stage may use when later stages
+        # follow; None lets it use all of it
+        self.first_stage_share = first_stage_share
+        self._lock = threading.Lock()
+        self._counters = {'runs': 0, 'skipped': {stage.phase: 0 for stage in stages if stage.run_if},
+                          'deadlines': {}, 'fallbacks': {}}
+        # Changes whenever a prompt or an agent's model is changed, so stale
+        # cached posts aren't served
+        self.prompt_hash = template_hash(*(
+            part for stage in stages for part in (
+                stage.agent.role, stage.agent.goal, stage.agent.backstory,
+                stage.description, stage.expected_output, stage.agent.llm.model
+            )
+        ))
+        # Runs in progress: task id -> (stage_log, clock)
+        self._active = {}
+        # id(llm) -> a non-streaming copy, for runs nobody streams
+        self._quiet_llms = {}
+        self._idle = queue.LifoQueue()
+        for _ in range(size):
+            self._idle.put(self._build_crew())
+
+    def _build_task(self, stage):
+        from crewai import Task
+        from crewai.tasks.conditional_task import ConditionalTask
+        options = dict(
+            description=stage.description,
+            agent=stage.agent.copy(),
+            expected_output=stage.expected_output
+        )
+        if stage.run_if is None:
+            return Task(**options)
+        return ConditionalTask(condition=partial(self._should_run, stage), **options)
+
+    def _should_run(self, stage, output):
+        return self._wants(stage, output.raw)
+
+    def _wants(self, stage, text):
+        if stage.run_if(text):
+            return True
+        with self._lock:
+            self._counters['skipped'][stage.phase] += 1
+        return False
+
+    def _build_crew(self):
+        from crewai import Crew
+        tasks = [self._build_task(stage) for stage in self.stages]
+        for task, stage, next_stage in zip(tasks, self.stages, self.stages[1:] + [None]):
+            task.callback = partial(self._stage_done, str(task.id), stage, next_stage)
+
+        return Crew(
+            agents=[task.agent for task in tasks],
+            tasks=tasks,
+            verbose=False
+        )
+
+    def _stage_done(self, task_id, stage, next_stage, output):
+        # Task callback: times the stage that just finished (skipped stages
+        # never get here), starts the next one's time budget and hands it
+        # the text
+        run = self._active.get(task_id)
+        if run is not None:
+            stage_log, clock = run
+            now = time.perf_counter()
+            # The usage reported since the previous stage finished is this one's
+            usage = clock['usage'][clock['counted']:]
+            clock['counted'] += len(usage)
+            if stage_log is not None:
+                prompt = ' '.join([stage.agent.role, stage.agent.goal, stage.agent.backstory,
+                                   output.description, stage.expected_output, clock['context']])
+                stage_log.append(_stage_entry(stage.phase, now - clock['mark'], prompt, output.raw, usage))
+            clock['mark'], clock['context'] = now, output.raw
+            if next_stage is not None:
+                clock['phase'] = next_stage.phase
+                if clock['deadline'] is not None:
+                    clock['deadline'].begin(next_stage.phase, self._stage_share(next_stage))
+        if next_stage is not None:
+            _forward_handover(task_id, next_stage, output.raw)
+
+    def _stage_share(self, stage):
+        # The part of the deadline a stage may use; None: whatever is left
+        if stage is self.stages[0] and len(self.stages) > 1:
+            return self.first_stage_share
+        return None
+
+    def _start_deadline(self, seconds):
+        if not seconds:
+            return None
+        deadline = Deadline(seconds)
+        deadline.begin(self.stages[0].phase, self._stage_share(self.stages[0]))
+        return deadline
+
+    def _fall_back(self, error, phase, draft):
+        # A later stage ran out of time or failed: returns the reason the
+        # draft is served instead, or re-raises if there's no draft yet
+        out_of_time = isinstance(error, DeadlineExceeded)
+        fallback = bool(draft) and phase != self.stages[0].phase
+        reason = 'deadline' if out_of_time else 'error'
+        with self._lock:
+            if out_of_time:
+                self._counters['deadlines'][phase] = self._counters['deadlines'].get(phase, 0) + 1
+            if fallback:
+                reasons = self._counters['fallbacks'].setdefault(phase, {})
+                reasons[reason] = reasons.get(reason, 0) + 1
+        if not fallback:
+            raise error
+        print(f"⏱️ The {phase} stage {'ran out of time' if out_of_time else f'failed ({error})'}; "
+              f"serving the unedited draft")
+        return reason
+
+    def _finish(self, text, topic, unedited=None):
+        # unedited: (phase, reason) when the draft stands in for that stage
+        with self._lock:
+            self._counters['runs'] += 1
+        post = self.postprocess(text, topic) if self.postprocess else text
+        return UneditedPost(post, *unedited) if unedited else post
+
+    def run(self, topic, on_event=None, stage_log=None, deadline=None):
+        # on_event, if given, receives phase changes and tokens as they are
+        # produced; stage_log, if given, gets a timing/token dict per stage run.
+        # deadline: seconds the whole run may take. When a later stage runs
+        # out of time (or fails) the first stage's draft is returned, as an
+        # UneditedPost
+        try:
+            crew = self._idle.get_nowait()
+        except queue.Empty:
+            crew = self._build_crew()
+
+        task_ids = [str(task.id) for task in crew.tasks]
+        budget = self._start_deadline(deadline)
+        clock = {'mark': time.perf_counter(), 'context': '', 'phase': self.stages[0].phase, 'deadline': budget,
+                 'usage': [], 'counted': 0}
+        for task_id in task_ids:
+            self._active[task_id] = (stage_log, clock)
+        if on_event:
+            for task_id, stage in zip(task_ids, self.stages):
+                _stream_listeners[task_id] = (on_event, stage.phase)
+            on_event({'event': 'phase', 'phase': self.stages[0].phase})
+        # The crew is ours until it goes back in the pool, so its agents can be
+        # switched to non-streaming LLMs when nobody listens; those skip the
+        # per-token events and can be hedged (see llm_router.py)
+        for task, stage in zip(crew.tasks, self.stages):
+            task.agent.llm = stage.agent.llm if on_event else self._without_streaming(stage.agent.llm)
+
+        unedited = None
+        finished = False
+        try:
+            with deadline_scope(budget), capture_usage() as clock['usage']:
+                text = str(crew.kickoff(inputs={'topic': topic}))
+            finished = True
+        except Exception as e:
+            unedited = (clock['phase'], self._fall_back(e, clock['phase'], clock['context']))
+            text = clock['context']
+        finally:
+            for task_id in task_ids:
+                _stream_listeners.pop(task_id, None)
+                self._active.pop(task_id, None)
+            # A call cut off by the deadline keeps running in the background
+            # and emitting chunks under this crew's task ids; a crew that
+            # didn't finish is dropped so no later run listens on them. The
+            # next run that finds the pool empty builds a replacement
+            if finished:
+                self._idle.put(crew)
+        return self._finish(text, topic, unedited)
+
+    def _without_streaming(self, llm):
+        # Streamed tokens cost an event apiece; skip them when nobody listens
+        if not getattr(llm, 'stream', False):
+            return llm
+        with self._lock:
+            quiet = self._quiet_llms.get(id(llm))
+            if quiet is None:
+                quiet = self._quiet_llms[id(llm)] = llm.model_copy(update={'stream': False})
+        return quiet
+
+    async def arun(self, topic, on_event=None, stage_log=None, deadline=None):
+        # run() for asyncio: each stage is one awaited llm.acall() with the
+        # agent's persona and task prompt. CrewAI's agent loop would make a
+        # blocking LLM call on a small thread pool instead, capping how many
+        # runs can be in flight. The checked-out crew only lends its task ids,
+        # so streamed tokens are routed exactly as in run(), and a cancelled
+        # run leaves nothing half-executed behind.
+        try:
+            crew = self._idle.get_nowait()
+        except queue.Empty:
+            crew = self._build_crew()
+
+        task_ids = [str(task.id) for task in crew.tasks]
+        if on_event:
+            for task_id, stage in zip(task_ids, self.stages):
+                _stream_listeners[task_id] = (on_event, stage.phase)
+            on_event({'event': 'phase', 'phase': self.stages[0].phase})
+
+        text = ''
+        phase = self.stages[0].phase
+        budget = self._start_deadline(deadline)
+        unedited = None
+        try:
+            with deadline_scope(budget):
+                for index, (task, stage) in enumerate(zip(crew.tasks, self.stages)):
+                    if stage.run_if is not None and index and not self._wants(stage, text):
+                        continue
+                    phase = stage.phase
+                    if budget is not None and index:
+                        budget.begin(phase, self._stage_share(stage))
+                    messages = _stage_messages(stage, topic, text)
+                    start = time.perf_counter()
+                    llm = task.agent.llm if on_event else self._without_streaming(task.agent.llm)
+                    with capture_usage() as usage:
+                        output = str(await llm.acall(messages, from_task=task, from_agent=task.agent))
+                    if stage_log is not None:
+                        prompt = '\n'.join(message['content'] for message in messages)
+                        stage_log.append(_stage_entry(stage.phase, time.perf_counter() - start, prompt, output,
+                                                      usage))
+                    if index + 1 < len(self.stages):
+                        _forward_handover(task_ids[index], self.stages[index + 1], output)
+                    text = output
+        except Exception as e:
+            # text is still the last finished stage's output
+            unedited = (phase, self._fall_back(e, phase, text))
+        finally:
+            for task_id in task_ids:
+                _stream_listeners.pop(task_id, None)
+            self._idle.put(crew)
+        return self._finish(text, topic, unedited)
+
+    def _variant_messages(self, topic, count):
+        # The first stage's prompt, once per variant
+        messages = []
+        for angle in (None,) + VARIANT_ANGLES[:count - 1]:
+            variant = _stage_messages(self.stages[0], topic, '')
+            if angle:
+                variant[1]['content'] += f"\n\nAngle for this version: {angle}"
+            messages.append(variant)
+        return messages
+
+    def _editing_batch(self, stage, topic, drafts):
+        # Indexes of the drafts the stage wants, and the one call for all of them
+        wanted = [index for index, draft in enumerate(drafts) if self._wants(stage, draft)]
+        if not wanted:
+            return wanted, None
+        context = '\n\n'.join(f"{VARIANT_MARKER.format(number)}\n{drafts[index]}"
+                               for number, index in enumerate(wanted, 1))
+        messages = _stage_messages(stage, topic, context)
+        messages[1]['content'] += '\n\n' + BATCH_EDITING_NOTE.format(count=len(wanted))
+        return wanted, messages
+
+    def _apply_batch(self, drafts, wanted, output):
+        # Swaps in the edited posts; a draft whose edit can't be found in the
+        # answer keeps its own text (postprocess still formats it)
+        parts = VARIANT_MARKER_RE.split(output)
+        edited = {int(number): text.strip() for number, text in zip(parts[1::2], parts[2::2]) if text.strip()}
+        if len(wanted) == 1 and not edited and output.strip():
+            edited = {1: output.strip()}
+        texts = list(drafts)
+        for number, index in enumerate(wanted, 1):
+            if number in edited:
+                texts[index] = edited[number]
+        return texts, {index for number, index in enumerate(wanted, 1) if number in edited}
+
+    def _finish_variants(self, topic, texts, edited, unedited=()):
+        # Postprocessed and ranked best first; ties keep the draft order.
+        # unedited: the drafts a later stage wanted but ran out of time (or
+        # failed) for, served as they were
+        with self._lock:
+            self._counters['runs'] += 1
+        variants = []
+        for index, text in enumerate(texts):
+            post = self.postprocess(text, topic) if self.postprocess else text
+            variants.append({'post': post, 'score': score_post(post), 'checks': check_post(post),
+                             'angle': VARIANT_ANGLES[index - 1] if index else None, 'edited': index in edited,
+                             'unedited': index in unedited})
+        return sorted(variants, key=lambda variant: -variant['score'])
+
+    def run_variants(self, topic, count, stage_log=None, deadline=None):
+        # count candidate posts for one topic, best first. The first stage
+        # runs once per candidate, all at the same time; every later stage is
+        # one call for all the candidates it wants, so the whole thing takes
+        # about as long as run(). Nothing is streamed. deadline is split
+        # between the stages as in run(); when a later stage runs out of
+        # time the candidates keep their drafts (edited: False)
+        messages = self._variant_messages(topic, count)
+        llm = self._without_streaming(self.stages[0].agent.llm)
+        budget = self._start_deadline(deadline)
+
+        def draft(variant):
+            # Pool threads don't inherit the caller's context
+            start = time.perf_counter()
+            with deadline_scope(budget), capture_usage() as usage:
+                output = str(llm.call(variant, from_agent=self.stages[0].agent))
+            return output, time.perf_counter() - start, usage
+
+        with ThreadPoolExecutor(max_workers=count, thread_name_prefix='variant') as pool:
+            try:
+                results = list(pool.map(draft, messages))
+            except Exception as e:
+                # No drafts to fall back on: counts a deadline and re-raises
+                self._fall_back(e, self.stages[0].phase, '')
+        texts = [output for output, _, _ in results]
+        if stage_log is not None:
+            for variant, (output, seconds, usage) in zip(messages, results):
+                stage_log.append(_stage_entry(self.stages[0].phase, seconds, prompt_text(variant), output, usage))
+
+        edited, unedited = set(), set()
+        for stage in self.stages[1:]:
+            wanted, batch = self._editing_batch(stage, topic, texts)
+            if batch is None:
+                continue
+            if budget is not None:
+                budget.begin(stage.phase, self._stage_share(stage))
+            start = time.perf_counter()
+            try:
+                with deadline_scope(budget), capture_usage() as usage:
+                    output = str(self._without_streaming(stage.agent.llm).call(batch, from_agent=stage.agent))
+            except Exception as e:
+                self._fall_back(e, stage.phase, texts[0])
+                unedited = set(wanted)
+                break
+            if stage_log is not None:
+                stage_log.append(_stage_entry(stage.phase, time.perf_counter() - start, prompt_text(batch),
+                                              output, usage))
+            texts, edited = self._apply_batch(texts, wanted, output)
+        return self._finish_variants(topic, texts, edited, unedited)
+
+    async def arun_variants(self, topic, count, stage_log=None, deadline=None):
+        # run_variants() for asyncio
+        messages = self._variant_messages(topic, count)
+        llm = self._without_streaming(self.stages[0].agent.llm)
+        budget = self._start_deadline(deadline)
+
+        async def draft(variant):
+            start = time.perf_counter()
+            with capture_usage() as usage:
+                output = str(await llm.acall(variant, from_agent=self.stages[0].agent))
+            return output, time.perf_counter() - start, usage
+
+        # The tasks copy the context, deadline included. gather() leaves the
+        # others running when one fails, so they're cancelled here
+        with deadline_scope(budget):
+            drafts = [asyncio.ensure_future(draft(variant)) for variant in messages]
+        try:
+            results = await asyncio.gather(*drafts)
+        except Exception as e:
+            for task in drafts:
+                task.cancel()
+            self._fall_back(e, self.stages[0].phase, '')
+        texts = [output for output, _, _ in results]
+        if stage_log is not None:
+            for variant, (output, seconds, usage) in zip(messages, results):
+                stage_log.append(_stage_entry(self.stages[0].phase, seconds, prompt_text(variant), output, usage))
+
+        edited, unedited = set(), set()
+        for stage in self.stages[1:]:
+            wanted, batch = self._editing_batch(stage, topic, texts)
+            if batch is None:
+                continue
+            if budget is not None:
+                budget.begin(stage.phase, self._stage_share(stage))
+            start = time.perf_counter()
+            try:
+                with deadline_scope(budget), capture_usage() as usage:
+                    output = str(await self._without_streaming(stage.agent.llm).acall(batch, from_agent=stage.agent))
+            except Exception as e:
+                self._fall_back(e, stage.phase, texts[0])
+                unedited = set(wanted)
+                break
+            if stage_log is not None:
+                stage_log.append(_stage_entry(stage.phase, time.perf_counter() - start, prompt_text(batch),
+                                              output, usage))
+            texts, edited = self._apply_batch(texts, wanted, output)
+        return self._finish_variants(topic, texts, edited, unedited)
+
+    def stats(self):
+        with self._lock:
+            return {'runs': self._counters['runs'], 'skipped': dict(self._counters['skipped']),
+                    'deadlines': dict(self._counters['deadlines']),
+                    'fallbacks': {phase: dict(reasons) for phase, reasons in self._counters['fallbacks'].items()}}
+
+
+PIPELINE_POOL_SIZE = int(os.getenv("PIPELINE_POOL_SIZE", "2"))
+
+# Seconds a generation may take end to end (0: no deadline). With two stages
+# the writer gets WRITER_BUDGET_SHARE of it and the editor whatever is left.
+# A request's own "deadline" setting may go up to MAX_DEADLINE
+GENERATION_DEADLINE = float(os.getenv("GENERATION_DEADLINE", "60"))
+WRITER_BUDGET_SHARE = float(os.getenv("WRITER_BUDGET_SHARE", "0.6"))
+MAX_DEADLINE = 600
+
+# Generation modes: the writer -> editor crew, or a single fused writer call
+MODES = ('two-agent', 'fused')
+DEFAULT_MODE = 'two-agent'
+
+
+def build_pipelines(prompts, size=1, writer_llm=None, editor_llm=None):
+    # Every generation mode, with agents and tasks from one prompt profile.
+    # The agents use the app's LLMs unless given others
+    from crewai import Agent
+    if writer_llm is None or editor_llm is None:
+        stack = llm_stack()
+        writer_llm, editor_llm = writer_llm or stack.writer_llm, editor_llm or stack.editor_llm
+    # max_retry_limit=0: CrewAI would otherwise rerun a failed task, on top of
+    # the scheduler's own retries, and only until the pooled agent's lifetime
+    # count of failures reaches the limit. ProviderBusy and DeadlineExceeded
+    # are final
+    writer = Agent(role=prompts['writer_role'], goal=prompts['writer_goal'],
+                   backstory=prompts['writer_backstory'], llm=writer_llm, max_retry_limit=0, verbose=False)
+    editor = Agent(role=prompts['editor_role'], goal=prompts['editor_goal'],
+                   backstory=prompts['editor_backstory'], llm=editor_llm, max_retry_limit=0, verbose=False)
+    return {
+        'two-agent': PostPipeline([
+            Stage('writing', writer, prompts['writing_description'], prompts['writing_output']),
+            # format_post does the mechanical editing; the editor agent is only
+            # called when that can't bring the draft up to every rule
+            Stage('editing', editor, prompts['editing_description'], prompts['editing_output'],
+                  run_if=needs_editing),
+        ], size=size, postprocess=format_post, first_stage_share=WRITER_BUDGET_SHARE),
+        'fused': PostPipeline([
+            Stage('writing', writer, prompts['fused_description'], prompts['fused_output']),
+        ], size=size, postprocess=format_post),
+    }
+
+
+class LLMStack:
+    # Everything that needs crewai: the agents' LLMs, their schedulers and
+    # the pipelines. Importing crewai alone takes seconds, so this is built
+    # on first use (see llm_stack() and warm_up()), not when main3 loads
+
+    def __init__(self):
+        started = time.perf_counter()
+        from crewai.events import crewai_event_bus, LLMStreamChunkEvent
+        imported = time.perf_counter()
+        self.schedulers = {}
+        self.writer_llm = _agent_llm('WRITER', self.schedulers)
+        self.editor_llm = _agent_llm('EDITOR', self.schedulers)
+        self.model = self.writer_llm.model
+        self.temperature = self.writer_llm.temperature
+        built = time.perf_counter()
+        self.pipelines = build_pipelines(prompts, size=PIPELINE_POOL_SIZE,
+                                         writer_llm=self.writer_llm, editor_llm=self.editor_llm)
+        self.linkedin_writer, self.editor = (stage.agent for stage in self.pipelines['two-agent'].stages)
+        crewai_event_bus.on(LLMStreamChunkEvent)(_forward_stream_chunk)
+        done = time.perf_counter()
+        self.timings = {
+            'import_seconds': round(imported - started, 4),
+            'llms_seconds': round(built - imported, 4),
+            'pipelines_seconds': round(done - built, 4),
+            'total_seconds': round(done - started, 4),
+        }
 
-if not GROQ_API_KEY:
-    raise ValueError("⚠️ GROQ_API_KEY not found! Please set it in your .env file")
 
-os.environ["GROQ_API_KEY"] = GROQ_API_KEY
+_stack = None
+_stack_lock = threading.Lock()
 
-llm = LLM(
-    model="groq/llama-3.3-70b-versatile",
-    temperature=0.7
-)
 
-linkedin_writer = Agent(
-    role='LinkedIn Content Strategist',
-    goal='Create engaging, professional LinkedIn posts that drive engagement',
-    backstory="""You are an expert LinkedIn content creator with years of 
-    experience crafting viral posts. You understand what makes content 
-    engaging: storytelling, hooks, personal insights, and clear value 
-    propositions. You write in a conversational yet professional tone.""",
-    llm=llm,
-    verbose=False
-)
+def llm_stack():
+    # The LLM stack, built by the first caller; the others wait for it. If
+    # building fails (e.g. no GROQ_API_KEY) the error goes to the caller and
+    # the next call tries again
+    global _stack
+    if _stack is None:
+        with _stack_lock:
+            if _stack is None:
+                _stack = LLMStack()
+                log_json('llm_stack_loaded', **_stack.timings)
+    return _stack
 
-editor = Agent(
-    role='Content Editor',
-    goal='Polish and optimize the content for maximum LinkedIn engagement',
-    backstory="""You are a meticulous editor who ensures every post is 
-    clear, impactful, and follows LinkedIn best practices. You add 
-    relevant hashtags, ensure proper formatting, and make the content 
-    scannable and engaging.""",
-    llm=llm,
-    verbose=False
-)
 
+def warm_up():
+    # Loads the LLM stack now instead of on the first request. Returns its timings
+    return llm_stack().timings
 
-def create_linkedin_post(topic):
-    writing_task = Task(
-        description=f"""Create an engaging LinkedIn post about: {topic}
-
-        Requirements:
-        - Start with a strong hook that grabs attention
-        - Share a personal insight or story if relevant
-        - Provide 3-4 key takeaways or actionable tips
-        - Keep it between 150-200 words
-        - Use short paragraphs for readability
-        - End with a question to encourage engagement
-        - Write in a conversational, authentic tone""",
-        agent=linkedin_writer,
-        expected_output="A compelling LinkedIn post draft with all required elements"
-    )
 
-    editing_task = Task(
-        description="""Review and optimize the LinkedIn post:
-
-        - Ensure the hook is attention-grabbing
-        - Add line breaks for better readability
-        - Add 3-5 relevant hashtags at the end
-        - Ensure it's engaging and professional
-        - Make sure the call-to-action question is clear
-        - Format it ready to copy-paste into LinkedIn""",
-        agent=editor,
-        expected_output="A polished, formatted LinkedIn post ready to publish"
+# These used to be built when main3 loaded. They still read as module
+# attributes (main3.pipelines, ...) but load the LLM stack on first access
+_STACK_ATTRIBUTES = {
+    'writer_llm': 'writer_llm', 'editor_llm': 'editor_llm', 'schedulers': 'schedulers',
+    'LLM_MODEL': 'model', 'LLM_TEMPERATURE': 'temperature', 'pipelines': 'pipelines',
+    'linkedin_writer': 'linkedin_writer', 'editor': 'editor',
+}
+
+
+def __getattr__(name):
+    if name in _STACK_ATTRIBUTES:
+        return getattr(llm_stack(), _STACK_ATTRIBUTES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Finished posts, keyed on topic + model + prompts. Set POST_CACHE_PATH to keep
+# them across restarts; POST_CACHE_SIZE / POST_CACHE_TTL bound the memory tier
+post_cache = build_post_cache(
+    max_entries=int(os.getenv("POST_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("POST_CACHE_TTL", "3600")),
+    path=os.getenv("POST_CACHE_PATH")
+)
+def _build_semantic_cache():
+    # Imported only when enabled, as semantic_cache loads numpy
+    if os.getenv("SEMANTIC_CACHE", "").lower() not in ('1', 'true', 'yes'):
+        return None
+    from semantic_cache import build_semantic_cache
+    return build_semantic_cache(
+        enabled=True,
+        threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.8")),
+        max_entries=int(os.getenv("SEMANTIC_CACHE_SIZE", "10000")),
+        ttl=float(os.getenv("POST_CACHE_TTL", "3600")),
+        index=os.getenv("SEMANTIC_CACHE_INDEX", "brute")
     )
 
-    crew = Crew(
-        agents=[linkedin_writer, editor],
-        tasks=[writing_task, editing_task],
-        verbose=False
+
+# Near-duplicate topics ("remote work productivity" / "productivity when
+# working remotely"), checked after an exact-match miss. Off unless
+# SEMANTIC_CACHE=1; SEMANTIC_CACHE_INDEX=hnsw needs hnswlib
+semantic_cache = _build_semantic_cache()
+# Identical requests (same cache key, cache mode and deadline) that arrive
+# while one is already generating wait for it instead of starting their own;
+# a request never inherits a shorter deadline's timeout or unedited draft.
+# 'bypass' requests always get a generation of their own
+post_flights = SingleFlight()
+
+# Every post served (topic, draft, post, models, timings, tokens), for
+# GET /history and /search. Off unless POST_STORE_PATH names a SQLite file
+post_store = build_post_store(os.getenv("POST_STORE_PATH"))
+
+
+# Prometheus-style metrics, served at GET /metrics. Token counts are the
+# providers' reported usage, estimated only for calls that report none
+metrics = MetricsRegistry()
+http_requests = metrics.counter(
+    'http_requests_total', 'HTTP requests by route and status code', ('route', 'status'))
+http_latency = metrics.histogram(
+    'http_request_duration_seconds', 'Time to produce a response (streams: until it starts)', ('route',))
+generations = metrics.counter(
+    'post_generations_total', 'Posts served, generated or from the cache', ('mode', 'cached'))
+generation_errors = metrics.counter(
+    'post_generation_errors_total', 'Generations that raised an error', ('mode',))
+generation_latency = metrics.histogram(
+    'post_generation_seconds', 'Time to serve one post, cache lookup included', ('mode', 'cached'))
+stage_latency = metrics.histogram(
+    'llm_stage_seconds', 'Time spent in each pipeline stage (LLM call and agent overhead)', ('mode', 'phase'))
+# source: "provider" for reported usage, "estimate" where a call reported none
+prompt_tokens = metrics.counter(
+    'llm_prompt_tokens_total', 'Prompt tokens sent, by stage', ('mode', 'phase', 'source'))
+completion_tokens = metrics.counter(
+    'llm_completion_tokens_total', 'Completion tokens received, by stage', ('mode', 'phase', 'source'))
+
+
+def create_linkedin_post(topic, on_event=None, mode=DEFAULT_MODE, stage_log=None, deadline=None):
+    # deadline: seconds, GENERATION_DEADLINE by default. Raises
+    # DeadlineExceeded when the writer runs out of time; when the editor
+    # does, returns the draft as an UneditedPost
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of: {', '.join(MODES)}")
+    deadline = GENERATION_DEADLINE if deadline is None else deadline
+    return llm_stack().pipelines[mode].run(topic, on_event=on_event, stage_log=stage_log, deadline=deadline or None)
+
+
+def _cache_scope(mode):
+    # What a cached post depends on besides the topic: model, temperature, prompts
+    stack = llm_stack()
+    return stack.model, stack.temperature, stack.pipelines[mode].prompt_hash
+
+
+def _similar_post(topic, mode, cache_mode, found):
+    # Semantic cache lookup for a topic the exact-match cache missed. Appends
+    # (post, matched topic, similarity) to found on a hit
+    if semantic_cache is None or cache_mode is not None:
+        return None
+    hit = semantic_cache.get(topic, _cache_scope(mode))
+    if hit is not None:
+        found.append(hit)
+        return hit[0]
+    return None
+
+
+def _cacheable(post):
+    # An unedited draft is served once, not cached: the next request gets
+    # another chance at the edited post
+    return not isinstance(post, UneditedPost)
+
+
+def _remember_post(topic, mode, cache_mode, post):
+    if semantic_cache is not None and cache_mode != 'bypass' and _cacheable(post):
+        semantic_cache.set(topic, _cache_scope(mode), post)
+
+
+def _observe_generation(topic, mode, cache_mode, seconds, stage_log, cached=None, error=None,
+                        coalesced=False, similar=None, variants=None, post=None, draft_index=0):
+    for stage in stage_log:
+        stage_latency.observe(stage['seconds'], mode=mode, phase=stage['phase'])
+        prompt_tokens.inc(stage['prompt_tokens'], mode=mode, phase=stage['phase'], source=stage['token_source'])
+        completion_tokens.inc(stage['completion_tokens'], mode=mode, phase=stage['phase'],
+                              source=stage['token_source'])
+    if error is None:
+        generations.inc(mode=mode, cached=cached)
+        generation_latency.observe(seconds, mode=mode, cached=cached)
+    else:
+        generation_errors.inc(mode=mode)
+
+    log_json(
+        'generation', topic=topic, mode=mode, cache=cache_mode, cached=cached,
+        coalesced=coalesced, variants=variants, similar_to=similar[1] if similar else None,
+        similarity=round(similar[2], 4) if similar else None, success=error is None, error=error,
+        fallback=post.reason if isinstance(post, UneditedPost) else None, seconds=round(seconds, 4),
+        prompt_tokens=sum(stage['prompt_tokens'] for stage in stage_log),
+        completion_tokens=sum(stage['completion_tokens'] for stage in stage_log),
+        stages=[_stage_summary(stage) for stage in stage_log],
+    )
+    if post_store is not None and error is None:
+        _record_post(topic, mode, post, cached, seconds, stage_log, draft_index)
+
+
+def _record_post(topic, mode, post, cached, seconds, stage_log, draft_index):
+    # Queues the served post for the history; draft_index picks the writer
+    # draft it came from when several were written (variants)
+    pipeline = llm_stack().pipelines[mode]
+    models = {stage.phase: stage.agent.llm.model for stage in pipeline.stages}
+    drafts = [stage['output'] for stage in stage_log if stage['phase'] == pipeline.stages[0].phase]
+    post_store.record(
+        topic, post, mode=mode, cached=cached, seconds=round(seconds, 4),
+        model=', '.join(dict.fromkeys(models[stage['phase']] for stage in stage_log)) or None,
+        prompt_tokens=sum(stage['prompt_tokens'] for stage in stage_log),
+        completion_tokens=sum(stage['completion_tokens'] for stage in stage_log),
+        draft=drafts[draft_index] if draft_index < len(drafts) else None,
+        stages=[_stage_summary(stage) for stage in stage_log],
     )
 
-    result = crew.kickoff()
-    return str(result)
-
-
-HTML_TEMPLATE = r"""
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>LinkedIn Post Generator ✨</title>
-    <style>
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
 
-        body {
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, Cantarell, sans-serif;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            min-height: 100vh;
-            display: flex;
-            justify-content: center;
-            align-items: center;
-            padding: 20px;
-        }
+def cached_linkedin_post(topic, cache_mode=None, on_event=None, mode=DEFAULT_MODE, deadline=None):
+    # Returns (post, cached); cache_mode is None, 'bypass' or 'refresh'.
+    # Every call feeds /metrics and writes one JSON log line. A call that joins
+    # an identical one in flight gets its post, but none of its stream events
+    key = cache_key(topic, *_cache_scope(mode))
+    stage_log = []
+    start = time.perf_counter()
 
-        .container {
-            background: white;
-            border-radius: 24px;
-            box-shadow: 0 20px 60px rgba(0, 0, 0, 0.3);
-            max-width: 900px;
-            width: 100%;
-            overflow: hidden;
-        }
+    similar = []
 
-        .header {
-            background: linear-gradient(135deg, #0077b5 0%, #00a0dc 100%);
-            color: white;
-            padding: 40px;
-            text-align: center;
-        }
+    def generate():
+        post = _similar_post(topic, mode, cache_mode, similar)
+        if post is None:
+            post = create_linkedin_post(topic, on_event=on_event, mode=mode, stage_log=stage_log,
+                                        deadline=deadline)
+            _remember_post(topic, mode, cache_mode, post)
+        return post
 
-        .header h1 {
-            font-size: 2.5rem;
-            margin-bottom: 10px;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            gap: 15px;
-        }
+    def get_or_create():
+        # A near-duplicate hit is served like an exact one: cached=True
+        post, cached = post_cache.get_or_create(key, generate, mode=cache_mode, cacheable=_cacheable)
+        return post, cached or bool(similar)
 
-        .header p {
-            font-size: 1.1rem;
-            opacity: 0.9;
-        }
+    coalesced = False
+    try:
+        if cache_mode == 'bypass':
+            post, cached = get_or_create()
+        else:
+            (post, cached), coalesced = post_flights.do((key, cache_mode, deadline), get_or_create)
+    except Exception as e:
+        _observe_generation(topic, mode, cache_mode, time.perf_counter() - start, stage_log, error=str(e))
+        raise
+    _observe_generation(topic, mode, cache_mode, time.perf_counter() - start, stage_log, cached=cached,
+                        coalesced=coalesced, similar=similar[0] if similar else None, post=post)
+    return post, cached
+
+
+async def acreate_linkedin_post(topic, on_event=None, mode=DEFAULT_MODE, stage_log=None, deadline=None):
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of: {', '.join(MODES)}")
+    deadline = GENERATION_DEADLINE if deadline is None else deadline
+    return await llm_stack().pipelines[mode].arun(topic, on_event=on_event, stage_log=stage_log,
+                                                  deadline=deadline or None)
+
+
+async def acached_linkedin_post(topic, cache_mode=None, on_event=None, mode=DEFAULT_MODE, deadline=None):
+    # cached_linkedin_post for asyncio callers (see asgi.py)
+    key = cache_key(topic, *_cache_scope(mode))
+    stage_log = []
+    start = time.perf_counter()
+
+    similar = []
+
+    async def generate():
+        post = _similar_post(topic, mode, cache_mode, similar)
+        if post is None:
+            post = await acreate_linkedin_post(topic, on_event=on_event, mode=mode, stage_log=stage_log,
+                                               deadline=deadline)
+            _remember_post(topic, mode, cache_mode, post)
+        return post
+
+    async def get_or_create():
+        # A near-duplicate hit is served like an exact one: cached=True
+        post, cached = await post_cache.aget_or_create(key, generate, mode=cache_mode, cacheable=_cacheable)
+        return post, cached or bool(similar)
+
+    coalesced = False
+    try:
+        if cache_mode == 'bypass':
+            post, cached = await get_or_create()
+        else:
+            (post, cached), coalesced = await post_flights.ado((key, cache_mode, deadline), get_or_create)
+    except (Exception, asyncio.CancelledError) as e:
+        # Timeouts and client disconnects cancel the run
+        _observe_generation(topic, mode, cache_mode, time.perf_counter() - start, stage_log,
+                            error=str(e) or type(e).__name__)
+        raise
+    _observe_generation(topic, mode, cache_mode, time.perf_counter() - start, stage_log, cached=cached,
+                        coalesced=coalesced, similar=similar[0] if similar else None, post=post)
+    return post, cached
+
+
+def linkedin_post_variants(topic, count, mode=DEFAULT_MODE, deadline=None):
+    # Returns count candidate posts, best first (see PostPipeline.run_variants).
+    # Every request is a fresh set: candidates aren't cached or coalesced.
+    # deadline works as in create_linkedin_post
+    stage_log = []
+    start = time.perf_counter()
+    deadline = GENERATION_DEADLINE if deadline is None else deadline
+    try:
+        variants = llm_stack().pipelines[mode].run_variants(topic, count, stage_log=stage_log,
+                                                            deadline=deadline or None)
+    except Exception as e:
+        _observe_generation(topic, mode, 'bypass', time.perf_counter() - start, stage_log, error=str(e),
+                            variants=count)
+        raise
+    _observe_generation(topic, mode, 'bypass', time.perf_counter() - start, stage_log, cached=False,
+                        variants=count, post=variants[0]['post'], draft_index=_draft_index(variants[0]))
+    return variants
+
+
+async def alinkedin_post_variants(topic, count, mode=DEFAULT_MODE, deadline=None):
+    # linkedin_post_variants for asyncio callers (see asgi.py)
+    stage_log = []
+    start = time.perf_counter()
+    deadline = GENERATION_DEADLINE if deadline is None else deadline
+    try:
+        variants = await llm_stack().pipelines[mode].arun_variants(topic, count, stage_log=stage_log,
+                                                                   deadline=deadline or None)
+    except (Exception, asyncio.CancelledError) as e:
+        _observe_generation(topic, mode, 'bypass', time.perf_counter() - start, stage_log,
+                            error=str(e) or type(e).__name__, variants=count)
+        raise
+    _observe_generation(topic, mode, 'bypass', time.perf_counter() - start, stage_log, cached=False,
+                        variants=count, post=variants[0]['post'], draft_index=_draft_index(variants[0]))
+    return variants
 
-        .content {
-            padding: 40px;
-        }
 
-        .input-section {
-            margin-bottom: 30px;
-        }
+def _draft_index(variant):
+    # Drafts are written in VARIANT_ANGLES order, the plain one first
+    return VARIANT_ANGLES.index(variant['angle']) + 1 if variant['angle'] else 0
 
-        label {
-            display: block;
-            font-weight: 600;
-            font-size: 1.1rem;
-            margin-bottom: 10px;
-            color: #333;
-        }
 
-        .topic-input {
-            width: 100%;
-            padding: 15px 20px;
-            font-size: 1rem;
-            border: 2px solid #e0e0e0;
-            border-radius: 12px;
-            transition: all 0.3s ease;
-        }
+def variant_count(data):
+    # The optional "variants" setting of /generate: 1 (the default) is a
+    # single post, 2..MAX_VARIANTS ranked candidates
+    count = data.get('variants', 1)
+    if isinstance(count, bool) or not isinstance(count, int) or not 1 <= count <= MAX_VARIANTS:
+        raise ValueError(f"variants must be a whole number from 1 to {MAX_VARIANTS}")
+    return count
 
-        .topic-input:focus {
-            outline: none;
-            border-color: #0077b5;
-            box-shadow: 0 0 0 3px rgba(0, 119, 181, 0.1);
-        }
 
-        .examples {
-            margin-top: 15px;
-        }
+HISTORY_OFF = 'Post history is off; set POST_STORE_PATH to keep it'
 
-        .examples p {
-            font-size: 0.9rem;
-            color: #666;
-            margin-bottom: 10px;
-        }
 
-        .example-chips {
-            display: flex;
-            flex-wrap: wrap;
-            gap: 10px;
-        }
+def page_options(args):
+    # ?limit=&before= for /history and /search. Returns keyword arguments
+    # for PostStore.history / search
+    try:
+        limit = int(args.get('limit', 20))
+        before = int(args['before']) if args.get('before') else None
+    except ValueError:
+        raise ValueError("limit and before must be whole numbers")
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be from 1 to {MAX_PAGE_SIZE}")
+    return {'limit': limit, 'before': before}
+
+
+def history_page(posts, limit):
+    # The next page starts below the last post of a full one
+    return {'success': True, 'posts': posts,
+            'next_before': posts[-1]['id'] if len(posts) == limit else None}
+
+
+def generation_options(data):
+    # Validates the optional settings every generation endpoint accepts.
+    # Returns keyword arguments for cached_linkedin_post
+    cache_mode = data.get('cache')
+    if cache_mode is not None and cache_mode not in CACHE_MODES:
+        raise ValueError("cache must be 'bypass' or 'refresh'")
+    mode = data.get('mode', DEFAULT_MODE)
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of: {', '.join(MODES)}")
+    deadline = data.get('deadline')
+    if deadline is not None and (isinstance(deadline, bool) or not isinstance(deadline, (int, float))
+                                 or not 0 < deadline <= MAX_DEADLINE):
+        raise ValueError(f"deadline must be a number of seconds greater than 0 and at most {MAX_DEADLINE}")
+    return {'cache_mode': cache_mode, 'mode': mode, 'deadline': deadline}
+
+
+def _batch_item(index, topic, options):
+    if not topic:
+        return {'index': index, 'topic': topic, 'success': False, 'error': 'Topic is required'}
+    try:
+        post, cached = cached_linkedin_post(topic, **options)
+        return {'index': index, 'topic': topic, 'success': True, 'post': post,
+                'cached': cached, 'unedited': isinstance(post, UneditedPost), 'checks': check_post(post)}
+    except Exception as e:
+        return {'index': index, 'topic': topic, 'success': False, 'error': str(e)}
+
+
+def generate_batch(topics, max_workers=4, cache_mode=None, mode=DEFAULT_MODE, deadline=None):
+    # Yields one result dict per topic, in completion order. Failures are
+    # reported per item instead of aborting the batch. At most max_workers
+    # topics are in flight, so topics can be any (even unbounded) iterable.
+    options = {'cache_mode': cache_mode, 'mode': mode, 'deadline': deadline}
+    topics = iter(enumerate(topics))
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = set()
+        for index, topic in topics:
+            pending.add(pool.submit(_batch_item, index, topic, options))
+            if len(pending) >= max_workers:
+                break
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+                for index, topic in topics:
+                    pending.add(pool.submit(_batch_item, index, topic, options))
+                    break
+
+
+def _run_job(payload):
+    post, cached = cached_linkedin_post(payload['topic'], **payload['options'])
+    return {'post': post, 'cached': cached, 'unedited': isinstance(post, UneditedPost), 'checks': check_post(post)}
+
+
+# Worker pool behind /jobs. JOB_WORKERS caps concurrent generations and
+# JOB_QUEUE_SIZE caps how many can wait before /jobs starts answering 429.
+# WEBHOOK_ALLOWED_HOSTS (comma-separated) limits webhooks to those hosts;
+# unset, any host with only public addresses is allowed
+job_queue = JobQueue(
+    _run_job,
+    max_workers=int(os.getenv("JOB_WORKERS", "4")),
+    max_queued=int(os.getenv("JOB_QUEUE_SIZE", "32")),
+    webhook_hosts=[host.strip() for host in os.getenv("WEBHOOK_ALLOWED_HOSTS", "").split(',') if host.strip()]
+)
 
-        .chip {
-            background: #f0f0f0;
-            padding: 8px 16px;
-            border-radius: 20px;
-            font-size: 0.85rem;
-            cursor: pointer;
-            transition: all 0.3s ease;
-            border: 2px solid transparent;
-        }
 
-        .chip:hover {
-            background: #0077b5;
-            color: white;
-            transform: translateY(-2px);
-        }
+def llm_stats_snapshot():
+    # Scheduler counters per model and route stats per agent, for /llm/stats.
+    # Empty until the LLM stack loads; asking doesn't load it
+    if _stack is None:
+        return {'schedulers': {}, 'routes': {}}
+    return {
+        'schedulers': {model: scheduler.stats() for model, scheduler in _stack.schedulers.items()},
+        'routes': {'writer': _stack.writer_llm.stats(), 'editor': _stack.editor_llm.stats()},
+    }
+
+
+def pipeline_stats_snapshot():
+    # Runs, skipped stages, deadlines and fallbacks per mode, for /pipeline/stats;
+    # empty until the stack loads
+    if _stack is None:
+        return {}
+    return {mode: pipeline.stats() for mode, pipeline in _stack.pipelines.items()}
+
+
+def _collect_stats():
+    # Counters the cache, pipelines and job queue already keep, for /metrics
+    cache = post_cache.stats()
+    flights = post_flights.stats()
+    jobs = job_queue.stats()
+    pipeline_stats = pipeline_stats_snapshot()
+    collected = [
+        ('post_cache_events_total', 'counter', 'Post cache lookups and writes by outcome',
+         {(('outcome', name),): cache[name] for name in ('hits', 'misses', 'stores', 'bypassed', 'refreshed')}),
+        ('post_cache_entries', 'gauge', 'Posts held in each cache tier',
+         {(('tier', name),): tier['entries'] for name, tier in cache['tiers'].items()}),
+        ('post_flights_total', 'counter', 'Generations started (leader) and requests that joined one in flight (coalesced)',
+         {(('role', 'leader'),): flights['leaders'], (('role', 'coalesced'),): flights['coalesced']}),
+        ('post_flights_in_progress', 'gauge', 'Distinct generations currently in flight',
+         {(): flights['in_flight']}),
+        ('pipeline_runs_total', 'counter', 'Crew runs per generation mode',
+         {(('mode', mode),): stats['runs'] for mode, stats in pipeline_stats.items()}),
+        ('pipeline_stage_skipped_total', 'counter', 'Conditional stages skipped because the draft already passed',
+         {(('mode', mode), ('phase', phase)): count
+          for mode, stats in pipeline_stats.items() for phase, count in stats['skipped'].items()}),
+        ('pipeline_deadline_exceeded_total', 'counter', 'Stages that ran out of their share of the deadline',
+         {(('mode', mode), ('phase', phase)): count
+          for mode, stats in pipeline_stats.items() for phase, count in stats['deadlines'].items()}),
+        ('pipeline_fallbacks_total', 'counter', 'Writer drafts served unedited, by the stage that fell short and why',
+         {(('mode', mode), ('phase', phase), ('reason', reason)): count
+          for mode, stats in pipeline_stats.items() for phase, reasons in stats['fallbacks'].items()
+          for reason, count in reasons.items()}),
+        ('jobs_total', 'counter', 'Background jobs by outcome',
+         {(('outcome', name),): jobs[name] for name in ('submitted', 'rejected', 'done', 'failed', 'cancelled')}),
+        ('jobs_in_progress', 'gauge', 'Background jobs running or waiting',
+         {(('state', 'running'),): jobs['running'], (('state', 'queued'),): jobs['queued']}),
+    ]
+    routing = llm_stats_snapshot()
+    collected += [
+        ('llm_scheduler_calls_total', 'counter', 'Scheduled LLM calls by outcome; throttled counts every 429 seen',
+         {(('model', model), ('outcome', name)): calls[name] for model, calls in routing['schedulers'].items()
+          for name in ('succeeded', 'throttled', 'retries', 'gave_up', 'failed')}),
+        ('llm_scheduler_budget_wait_seconds_total', 'counter', 'Time calls waited for the RPM / TPM budget',
+         {(('model', model),): calls['budget_wait_seconds'] for model, calls in routing['schedulers'].items()}),
+        ('llm_scheduler_concurrency', 'gauge', 'Adaptive concurrency limit and LLM calls in flight or queued',
+         {(('model', model), ('state', state)): calls[key] for model, calls in routing['schedulers'].items()
+          for state, key in (('limit', 'concurrency_limit'), ('in_flight', 'in_flight'), ('queued', 'queued'))}),
+        ('llm_route_calls_total', 'counter', 'Calls per agent and model: wins answered, hedges were duplicates',
+         {(('agent', agent), ('model', model), ('outcome', name)): route[name]
+          for agent, routes in routing['routes'].items() for model, route in routes.items()
+          for name in ('calls', 'wins', 'errors', 'deadline_exceeded', 'hedges', 'cut_off')}),
+        ('llm_route_latency_seconds', 'gauge', 'Recent LLM call latency per agent and model',
+         {(('agent', agent), ('model', model), ('quantile', quantile)): route[key]
+          for agent, routes in routing['routes'].items() for model, route in routes.items()
+          for quantile, key in (('0.5', 'p50_seconds'), ('0.95', 'p95_seconds')) if route[key] is not None}),
+        ('llm_route_cost_usd_total', 'counter', 'Estimated spend per agent and model (LLM_PRICES)',
+         {(('agent', agent), ('model', model)): route['cost_usd']
+          for agent, routes in routing['routes'].items() for model, route in routes.items()}),
+    ]
+    if post_store is not None:
+        stored = post_store.stats()
+        collected += [
+            ('post_store_rows_total', 'counter', 'Posts queued for the history, written to it or dropped (queue full)',
+             {(('outcome', name),): stored[name] for name in ('recorded', 'written', 'dropped')}),
+            ('post_store_queued', 'gauge', 'Posts waiting for the history writer',
+             {(): stored['queued']}),
+        ]
+    if semantic_cache is not None:
+        semantic = semantic_cache.stats()
+        collected += [
+            ('semantic_cache_events_total', 'counter', 'Near-duplicate topic lookups and writes by outcome',
+             {(('outcome', name),): semantic[name]
+              for name in ('hits', 'misses', 'stores', 'evictions', 'expirations')}),
+            ('semantic_cache_entries', 'gauge', 'Topics held in the semantic cache',
+             {(): semantic['entries']}),
+        ]
+    return collected
+
+
+metrics.register_collector(_collect_stats)
+
+
+@app.before_request
+def _start_request_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def _observe_request(response):
+    # Labelled by the route pattern (/jobs/<job_id>), not the raw path
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    http_requests.inc(route=route, status=response.status_code)
+    http_latency.observe(time.perf_counter() - g.request_start, route=route)
+    return response
+
+
+# The web UI: static/index.html, app.css and app.js, compressed and hashed once
+static_assets = StaticAssets(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static'))
 
-        .generate-btn {
-            width: 100%;
-            padding: 18px;
-            font-size: 1.1rem;
-            font-weight: 600;
-            background: linear-gradient(135deg, #0077b5 0%, #00a0dc 100%);
-            color: white;
-            border: none;
-            border-radius: 12px;
-            cursor: pointer;
-            transition: all 0.3s ease;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            gap: 10px;
-        }
 
-        .generate-btn:hover:not(:disabled) {
-            transform: translateY(-2px);
-            box-shadow: 0 10px 25px rgba(0, 119, 181, 0.3);
-        }
+@app.route('/')
+@app.route('/static/<path:filename>')
+def home(filename=None):
+    found = static_assets.respond(
+        request.path,
+        accept_encoding=request.headers.get('Accept-Encoding', ''),
+        if_none_match=request.headers.get('If-None-Match', '')
+    )
+    if found is None:
+        return jsonify({'success': False, 'error': 'Not found'}), 404
+    status, headers, body = found
+    return Response(body, status=status, headers=headers)
 
-        .generate-btn:disabled {
-            opacity: 0.6;
-            cursor: not-allowed;
-        }
 
-        .status {
-            margin-top: 20px;
-            padding: 15px;
-            border-radius: 12px;
-            font-weight: 500;
-            text-align: center;
-            display: none;
-        }
+@app.route('/generate', methods=['POST'])
+def generate():
+    try:
+        data = request.get_json()
+        topic = data.get('topic', '')
 
-        .status.active {
-            display: block;
-        }
+        if not topic:
+            return jsonify({'success': False, 'error': 'Topic is required'})
 
-        .status.writing {
-            background: #fff3cd;
-            color: #856404;
-            border: 2px solid #ffc107;
-        }
+        try:
+            options = generation_options(data)
+            variants = variant_count(data)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)})
 
-        .status.editing {
-            background: #d1ecf1;
-            color: #0c5460;
-            border: 2px solid #17a2b8;
-        }
+        if variants > 1:
+            print(f"\n🔄 Generating {variants} candidate posts for topic: {topic}")
+            ranked = linkedin_post_variants(topic, variants, mode=options['mode'], deadline=options['deadline'])
+            print(f"✅ {variants} candidates generated, best score {ranked[0]['score']:.2f}")
+            return jsonify({'success': True, 'post': ranked[0]['post'], 'cached': False,
+                            'unedited': ranked[0]['unedited'], 'mode': options['mode'],
+                            'checks': ranked[0]['checks'], 'variants': ranked})
 
-        .status.complete {
-            background: #d4edda;
-            color: #155724;
-            border: 2px solid #28a745;
-        }
+        print(f"\n🔄 Generating post for topic: {topic}")
+        post, cached = cached_linkedin_post(topic, **options)
+        print("⚡ Served from cache!" if cached else "✅ Post generated successfully!")
+
+        checks = check_post(post)
+        if not checks['passed']:
+            print(f"⚠️ Post misses: {', '.join(checks['failed'])}")
+
+        return jsonify({'success': True, 'post': post, 'cached': cached, 'unedited': isinstance(post, UneditedPost),
+                        'mode': options['mode'], 'checks': checks})
+    except ProviderBusy as e:
+        print(f"🚦 Provider busy: {str(e)}")
+        return (jsonify({'success': False, 'error': str(e)}), 503,
+                {'Retry-After': str(max(1, round(e.retry_after)))})
+    except DeadlineExceeded as e:
+        print(f"⏱️ {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 504
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)})
 
-        .status.error {
-            background: #f8d7da;
-            color: #721c24;
-            border: 2px solid #dc3545;
-        }
 
-        .result-section {
-            margin-top: 30px;
-            display: none;
-        }
+@app.route('/generate/stream', methods=['POST'])
+def generate_stream():
+    # Same as /generate, but answers with NDJSON events while the agents work:
+    # {"event": "phase"|"token"|"done"|"error", ...}, one JSON object per line
+    data = request.get_json(silent=True) or {}
+    topic = data.get('topic', '')
 
-        .result-section.show {
-            display: block;
-            animation: slideIn 0.5s ease;
-        }
+    if not topic:
+        return jsonify({'success': False, 'error': 'Topic is required'})
 
-        @keyframes slideIn {
-            from {
-                opacity: 0;
-                transform: translateY(20px);
-            }
-            to {
-                opacity: 1;
-                transform: translateY(0);
-            }
-        }
+    try:
+        options = generation_options(data)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)})
 
-        .result-header {
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            margin-bottom: 15px;
-        }
+    events = queue.Queue()
 
-        .result-header h2 {
-            color: #333;
-            font-size: 1.5rem;
-        }
+    def worker():
+        try:
+            print(f"\n🔄 Streaming post for topic: {topic}")
+            post, cached = cached_linkedin_post(topic, on_event=events.put, **options)
+            print("⚡ Served from cache!" if cached else "✅ Post streamed successfully!")
+            events.put({'event': 'done', 'success': True, 'post': post, 'cached': cached,
+                        'unedited': isinstance(post, UneditedPost), 'mode': options['mode'],
+                        'checks': check_post(post)})
+        except Exception as e:
+            print(f"❌ Error: {str(e)}")
+            events.put({'event': 'error', 'success': False, 'error': str(e)})
+        finally:
+            events.put(None)
 
-        .copy-btn {
-            padding: 10px 20px;
-            background: #28a745;
-            color: white;
-            border: none;
-            border-radius: 8px;
-            cursor: pointer;
-            font-weight: 600;
-            display: flex;
-            align-items: center;
-            gap: 8px;
-            transition: all 0.3s ease;
-        }
+    threading.Thread(target=worker, daemon=True).start()
 
-        .copy-btn:hover {
-            background: #218838;
-            transform: scale(1.05);
-        }
+    def body():
+        while True:
+            event = events.get()
+            if event is None:
+                break
+            yield json.dumps(event) + '\n'
 
-        .copy-btn.copied {
-            background: #0077b5;
-        }
+    return Response(body(), mimetype='application/x-ndjson',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
-        .post-preview {
-            background: #f8f9fa;
-            border: 2px solid #e0e0e0;
-            border-radius: 12px;
-            padding: 25px;
-            white-space: pre-wrap;
-            font-size: 1rem;
-            line-height: 1.7;
-            color: #333;
-            max-height: 500px;
-            overflow-y: auto;
-        }
 
-        .stats {
-            display: grid;
-            grid-template-columns: repeat(3, 1fr);
-            gap: 15px;
-            margin-top: 20px;
-        }
+# Upper bounds for /generate/batch requests
+BATCH_MAX_TOPICS = int(os.getenv("BATCH_MAX_TOPICS", "500"))
+BATCH_MAX_PARALLELISM = int(os.getenv("BATCH_MAX_PARALLELISM", "8"))
 
-        .stat-card {
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            padding: 20px;
-            border-radius: 12px;
-            text-align: center;
-        }
 
-        .stat-card .number {
-            font-size: 2rem;
-            font-weight: bold;
-            margin-bottom: 5px;
-        }
+@app.route('/generate/batch', methods=['POST'])
+def generate_batch_route():
+    # Body: {"topics": [...], "parallelism": 8}. Answers with NDJSON: one
+    # {"event": "result", ...} line per topic as it finishes, then "done"
+    data = request.get_json(silent=True) or {}
+    topics = data.get('topics')
 
-        .stat-card .label {
-            font-size: 0.9rem;
-            opacity: 0.9;
-        }
+    if not isinstance(topics, list) or not topics:
+        return jsonify({'success': False, 'error': 'topics must be a non-empty list'}), 400
+    if len(topics) > BATCH_MAX_TOPICS:
+        return jsonify({'success': False, 'error': f'At most {BATCH_MAX_TOPICS} topics per batch'}), 400
 
-        .spinner {
-            border: 3px solid rgba(255, 255, 255, 0.3);
-            border-top: 3px solid white;
-            border-radius: 50%;
-            width: 20px;
-            height: 20px;
-            animation: spin 1s linear infinite;
-        }
+    try:
+        options = generation_options(data)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
 
-        @keyframes spin {
-            0% { transform: rotate(0deg); }
-            100% { transform: rotate(360deg); }
-        }
+    try:
+        parallelism = int(data.get('parallelism', BATCH_MAX_PARALLELISM))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'parallelism must be an integer'}), 400
+    parallelism = max(1, min(parallelism, BATCH_MAX_PARALLELISM))
+
+    print(f"\n📚 Generating batch of {len(topics)} posts ({parallelism} at a time)")
+
+    def body():
+        succeeded = failed = 0
+        for item in generate_batch(topics, parallelism, **options):
+            if item['success']:
+                succeeded += 1
+            else:
+                failed += 1
+            yield json.dumps({'event': 'result', **item}) + '\n'
+        print(f"✅ Batch finished: {succeeded} succeeded, {failed} failed")
+        yield json.dumps({'event': 'done', 'total': len(topics),
+                          'succeeded': succeeded, 'failed': failed}) + '\n'
+
+    return Response(body(), mimetype='application/x-ndjson',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@app.route('/cache/stats')
+def cache_stats():
+    stats = dict(post_cache.stats(), coalescing=post_flights.stats())
+    if semantic_cache is not None:
+        stats['semantic'] = semantic_cache.stats()
+    return jsonify(stats)
+
+
+@app.route('/history')
+def history():
+    # Posts served, newest first: ?limit=20&before=<next_before of the last page>
+    if post_store is None:
+        return jsonify({'success': False, 'error': HISTORY_OFF}), 404
+    try:
+        options = page_options(request.args)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    return jsonify(history_page(post_store.history(**options), options['limit']))
+
+
+@app.route('/history/<int:post_id>')
+def history_post(post_id):
+    # One stored post with its writer draft and stage timings
+    if post_store is None:
+        return jsonify({'success': False, 'error': HISTORY_OFF}), 404
+    found = post_store.get(post_id)
+    if found is None:
+        return jsonify({'success': False, 'error': 'Post not found'}), 404
+    return jsonify({'success': True, 'post': found})
+
+
+@app.route('/search')
+def search():
+    # Full-text search over stored topics and posts: ?q=remote+work, paged like /history
+    if post_store is None:
+        return jsonify({'success': False, 'error': HISTORY_OFF}), 404
+    query = request.args.get('q', '')
+    try:
+        options = page_options(request.args)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    if not query.strip():
+        return jsonify({'success': False, 'error': 'q is required'}), 400
+    return jsonify(history_page(post_store.search(query, **options), options['limit']))
 
-        .footer {
-            background: #f8f9fa;
-            padding: 20px;
-            text-align: center;
-            color: #666;
-            font-size: 0.9rem;
-        }
 
-        @media (max-width: 768px) {
-            .header h1 {
-                font-size: 1.8rem;
-            }
+@app.route('/llm/stats')
+def llm_stats():
+    return jsonify(llm_stats_snapshot())
 
-            .stats {
-                grid-template-columns: 1fr;
-            }
 
-            .content {
-                padding: 20px;
-            }
-        }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>
-                <svg width="40" height="40" viewBox="0 0 24 24" fill="white">
-                    <path d="M20.447 20.452h-3.554v-5.569c0-1.328-.027-3.037-1.852-3.037-1.853 0-2.136 1.445-2.136 2.939v5.667H9.351V9h3.414v1.561h.046c.477-.9 1.637-1.85 3.37-1.85 3.601 0 4.267 2.37 4.267 5.455v6.286zM5.337 7.433c-1.144 0-2.063-.926-2.063-2.065 0-1.138.92-2.063 2.063-2.063 1.14 0 2.064.925 2.064 2.063 0 1.139-.925 2.065-2.064 2.065zm1.782 13.019H3.555V9h3.564v11.452zM22.225 0H1.771C.792 0 0 .774 0 1.729v20.542C0 23.227.792 24 1.771 24h20.451C23.2 24 24 23.227 24 22.271V1.729C24 .774 23.2 0 22.222 0h.003z"/>
-                </svg>
-                LinkedIn Post Generator
-            </h1>
-            <p>✨ Create engaging LinkedIn posts powered by AI in seconds</p>
-        </div>
-
-        <div class="content">
-            <div class="input-section">
-                <label for="topic">What do you want to write about?</label>
-                <input 
-                    type="text" 
-                    id="topic" 
-                    class="topic-input" 
-                    placeholder="e.g., AI in healthcare, Remote work productivity, Leadership lessons..."
-                    autocomplete="off"
-                >
-
-                <div class="examples">
-                    <p>💡 Try these popular topics:</p>
-                    <div class="example-chips">
-                        <span class="chip">AI in healthcare</span>
-                        <span class="chip">Remote work productivity</span>
-                        <span class="chip">Leadership lessons</span>
-                        <span class="chip">Career growth tips</span>
-                        <span class="chip">Digital transformation</span>
-                    </div>
-                </div>
-            </div>
-
-            <button class="generate-btn" id="generateBtn">
-                <span id="btnText">🚀 Generate LinkedIn Post</span>
-                <div class="spinner" id="spinner" style="display: none;"></div>
-            </button>
-
-            <div class="status" id="status"></div>
-
-            <div class="result-section" id="resultSection">
-                <div class="result-header">
-                    <h2>📝 Your LinkedIn Post</h2>
-                    <button class="copy-btn" id="copyBtn">
-                        <svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
-                            <rect x="9" y="9" width="13" height="13" rx="2" ry="2"></rect>
-                            <path d="M5 15H4a2 2 0 0 1-2-2V4a2 2 0 0 1 2-2h9a2 2 0 0 1 2 2v1"></path>
-                        </svg>
-                        <span id="copyText">Copy Post</span>
-                    </button>
-                </div>
-                <div class="post-preview" id="postPreview"></div>
-
-                <div class="stats">
-                    <div class="stat-card">
-                        <div class="number" id="wordCount">0</div>
-                        <div class="label">Words</div>
-                    </div>
-                    <div class="stat-card">
-                        <div class="number" id="hashtagCount">0</div>
-                        <div class="label">Hashtags</div>
-                    </div>
-                    <div class="stat-card">
-                        <div class="number" id="lineCount">0</div>
-                        <div class="label">Lines</div>
-                    </div>
-                </div>
-            </div>
-        </div>
-
-        <div class="footer">
-            Powered by CrewAI & Groq | Made with ❤️ for LinkedIn Creators
-        </div>
-    </div>
-
-    <script>
-        // Topic chip selection
-        document.querySelectorAll('.chip').forEach(chip => {
-            chip.addEventListener('click', function() {
-                document.getElementById('topic').value = this.textContent;
-                document.querySelectorAll('.chip').forEach(c => c.style.background = '#f0f0f0');
-                this.style.background = '#0077b5';
-                this.style.color = 'white';
-            });
-        });
-
-        // Generate post function
-        document.getElementById('generateBtn').addEventListener('click', async function() {
-            const topic = document.getElementById('topic').value.trim();
-
-            if (!topic) {
-                showStatus('error', '⚠️ Please enter a topic to create magic!');
-                return;
-            }
-
-            const btn = document.getElementById('generateBtn');
-            const btnText = document.getElementById('btnText');
-            const spinner = document.getElementById('spinner');
-            const resultSection = document.getElementById('resultSection');
-
-            btn.disabled = true;
-            btnText.textContent = 'Generating...';
-            spinner.style.display = 'block';
-            resultSection.classList.remove('show');
-
-            showStatus('writing', '✍️ AI Writer is crafting your post...');
-
-            try {
-                const response = await fetch('/generate', {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json',
-                    },
-                    body: JSON.stringify({ topic: topic })
-                });
-
-                const data = await response.json();
-
-                if (data.success) {
-                    showStatus('editing', '✨ Editor is polishing and optimizing...');
-
-                    setTimeout(() => {
-                        showStatus('complete', '✅ Your post is ready!');
-
-                        const postPreview = document.getElementById('postPreview');
-                        postPreview.textContent = data.post;
-
-                        const wordCount = data.post.split(/\s+/).filter(w => w.length > 0).length;
-                        const hashtagCount = (data.post.match(/#/g) || []).length;
-                        const lineCount = data.post.split('\n').filter(line => line.trim()).length;
-
-                        document.getElementById('wordCount').textContent = wordCount;
-                        document.getElementById('hashtagCount').textContent = hashtagCount;
-                        document.getElementById('lineCount').textContent = lineCount;
-
-                        resultSection.classList.add('show');
-
-                        setTimeout(() => {
-                            document.getElementById('status').style.display = 'none';
-                        }, 3000);
-                    }, 1500);
-                } else {
-                    showStatus('error', '❌ Error: ' + data.error);
-                }
-            } catch (error) {
-                showStatus('error', '❌ Error generating post. Please check your connection and try again.');
-                console.error('Error:', error);
-            } finally {
-                btn.disabled = false;
-                btnText.textContent = '🚀 Generate LinkedIn Post';
-                spinner.style.display = 'none';
-            }
-        });
-
-        // Copy post function
-        document.getElementById('copyBtn').addEventListener('click', function() {
-            const postText = document.getElementById('postPreview').textContent;
-            const copyBtn = document.getElementById('copyBtn');
-            const copyText = document.getElementById('copyText');
-
-            navigator.clipboard.writeText(postText).then(() => {
-                copyBtn.classList.add('copied');
-                copyText.textContent = 'Copied! ✓';
-
-                setTimeout(() => {
-                    copyBtn.classList.remove('copied');
-                    copyText.textContent = 'Copy Post';
-                }, 2000);
-            }).catch(err => {
-                alert('Failed to copy. Please select and copy manually.');
-            });
-        });
-
-        function showStatus(type, message) {
-            const status = document.getElementById('status');
-            status.className = 'status active ' + type;
-            status.textContent = message;
-        }
+@app.route('/pipeline/stats')
+def pipeline_stats():
+    return jsonify(pipeline_stats_snapshot())
 
-        document.getElementById('topic').addEventListener('keypress', function(e) {
-            if (e.key === 'Enter') {
-                document.getElementById('generateBtn').click();
-            }
-        });
-    </script>
-</body>
-</html>
-"""
 
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
-@app.route('/')
-def home():
-    return render_template_string(HTML_TEMPLATE)
 
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    data = request.get_json(silent=True) or {}
+    topic = data.get('topic', '')
+    webhook = data.get('webhook')
+
+    if not topic:
+        return jsonify({'success': False, 'error': 'Topic is required'}), 400
 
-@app.route('/generate', methods=['POST'])
-def generate():
     try:
-        data = request.get_json()
-        topic = data.get('topic', '')
+        options = generation_options(data)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
 
-        if not topic:
-            return jsonify({'success': False, 'error': 'Topic is required'})
+    try:
+        job = job_queue.submit({'topic': topic, 'options': options}, webhook=webhook)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except QueueFull as e:
+        return jsonify({'success': False, 'error': str(e)}), 429, {'Retry-After': '5'}
 
-        print(f"\n🔄 Generating post for topic: {topic}")
-        post = create_linkedin_post(topic)
-        print(f"✅ Post generated successfully!")
+    print(f"\n📥 Queued job {job.id} for topic: {topic}")
+    return jsonify({'success': True, **job.to_dict()}), 202
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    return jsonify({'success': job.status != 'failed', **job.to_dict()})
+
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    job = job_queue.cancel(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    return jsonify({'success': job.status == 'cancelled', **job.to_dict()})
+
+
+@app.route('/jobs/stats')
+def job_stats():
+    return jsonify(job_queue.stats())
+
+
+def health():
+    # Liveness plus startup timings. ready: the LLM stack is loaded, so a
+    # generation won't pay for it. Never loads it itself
+    return {
+        'status': 'draining' if _draining.is_set() else 'ok',
+        'ready': _stack is not None,
+        'startup': {'import_seconds': IMPORT_SECONDS, 'llm_stack': _stack.timings if _stack else None},
+    }
+
+
+@app.route('/healthz')
+def healthz():
+    # 503 while draining, so a load balancer stops sending requests
+    status = health()
+    return jsonify(status), 503 if status['status'] == 'draining' else 200
 
-        return jsonify({'success': True, 'post': post})
+
+def _warm_up_in_background():
+    try:
+        timings = warm_up()
+        print(f"🔥 LLM stack ready in {timings['total_seconds']:.2f}s")
     except Exception as e:
-        print(f"❌ Error: {str(e)}")
-        return jsonify({'success': False, 'error': str(e)})
+        # The first request will try again and report the error
+        print(f"❌ Warm-up failed: {str(e)}")
+
+
+def start_warm_up(mode=None):
+    # WARM_UP=background loads the LLM stack on a thread as soon as main3 is
+    # imported, so the server already answers while it loads; WARM_UP=eager
+    # loads it during the import. Unset: on the first request that needs it
+    mode = (os.getenv("WARM_UP", "") if mode is None else mode).lower()
+    if mode == 'eager':
+        warm_up()
+    elif mode == 'background':
+        threading.Thread(target=_warm_up_in_background, name='warm-up', daemon=True).start()
+
+
+# Set by shutdown(); /healthz reports it
+_draining = threading.Event()
+
+
+def shutdown(timeout=30):
+    # Graceful stop for a server process: /healthz turns 503, /jobs stops
+    # taking work, queued and running jobs get up to timeout seconds to
+    # finish, and recorded posts are written. Requests already being served
+    # are the server's to wait for (serve.py). True if everything finished
+    started = time.monotonic()
+    deadline = started + timeout
+    _draining.set()
+    drained = job_queue.close(timeout)
+    if post_store is not None:
+        drained = post_store.flush(max(0.0, deadline - time.monotonic())) and drained
+    log_json('shutdown', drained=drained, seconds=round(time.monotonic() - started, 3))
+    return drained
+
+
+def _after_fork():
+    # A pre-forking server (serve.py, gunicorn --preload) imports this module
+    # once and forks its workers from it. Threads and SQLite connections
+    # don't survive fork(), so each worker starts its own job workers and
+    # post store writer, and opens its own cache connection
+    job_queue.start()
+    post_cache.start()
+    if post_store is not None:
+        post_store.start()
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+IMPORT_SECONDS = round(time.perf_counter() - _import_started, 4)
+start_warm_up()
 
 
 if __name__ == '__main__':
@@ -617,8 +1469,9 @@ if __name__ == '__main__':
     print("🚀 LinkedIn Post Generator Web App")
     print("=" * 70)
     print("\n✨ Starting server...")
-    print("🌐 Open your browser and go to: http://localhost:5000")
+    print(f"🌐 Open your browser and go to: http://localhost:{os.getenv('PORT', '5000')}")
     print("\n💡 Press Ctrl+C to stop the server")
+    print("🏭 Development server only; run serve.py in production")
     print("=" * 70)
 
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    app.run(debug=True, host='0.0.0.0', port=int(os.getenv("PORT", "5000")))
\ No newline at end of file
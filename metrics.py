@@ -0,0 +1,188 @@
+"""Prometheus-style metrics and structured log lines.
+
+A small, dependency-free registry of labelled counters and histograms that
+renders the Prometheus text exposition format for GET /metrics. Anything
+that already keeps its own counters (the post cache, the job queue) can be
+exposed through register_collector() instead of being counted twice.
+
+Token counts come from the usage the provider reports for each call,
+collected with capture_usage(). When a call reports none (or its usage
+can't be attributed) the count is an estimate instead, from tiktoken's
+cl100k_base when available, else about four characters per token, and is
+labelled source="estimate".
+"""
+import contextlib
+import contextvars
+import json
+import threading
+import time
+from functools import lru_cache
+
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # Not installed, or its vocabulary can't be downloaded
+        return None
+
+
+def prompt_text(messages):
+    # An LLM call's messages (a string or chat messages) as one string
+    if isinstance(messages, str):
+        return messages
+    return "\n".join(str(message.get("content", "")) for message in messages)
+
+
+def estimate_tokens(text):
+    encoding = _encoding()
+    if encoding is None:
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text))
+
+
+# The capture_usage() lists open in this context, innermost last
+_usage_sinks = contextvars.ContextVar('usage_sinks', default=())
+
+
+@contextlib.contextmanager
+def capture_usage():
+    # Collects the (prompt, completion) tokens providers report for the LLM
+    # calls made inside the block, including ones in nested captures
+    calls = []
+    token = _usage_sinks.set(_usage_sinks.get() + (calls,))
+    try:
+        yield calls
+    finally:
+        _usage_sinks.reset(token)
+
+
+def report_usage(prompt_tokens, completion_tokens):
+    for calls in _usage_sinks.get():
+        calls.append((prompt_tokens, completion_tokens))
+
+
+def token_counts(usage, prompt, completion):
+    # Reported usage when there is some, else estimates from the text:
+    # (prompt_tokens, completion_tokens, source)
+    if usage:
+        return sum(p for p, _ in usage), sum(c for _, c in usage), 'provider'
+    return estimate_tokens(prompt), estimate_tokens(completion), 'estimate'
+
+
+def log_json(event, **fields):
+    # One JSON object per line, easy to grep and to ship to a log pipeline
+    print(json.dumps({'ts': round(time.time(), 3), 'event': event, **fields}), flush=True)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    type = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield self.name, _format_labels(self.labels, key), value
+
+
+class Histogram:
+    type = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        # label values -> [per-bucket counts, sum, count]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self._lock:
+            state = self._values.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def samples(self):
+        with self._lock:
+            values = {key: (list(counts), total, count) for key, (counts, total, count) in self._values.items()}
+        for key, (counts, total, count) in sorted(values.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                yield (f'{self.name}_bucket',
+                       _format_labels(self.labels, key, [('le', _format_value(bound))]), cumulative)
+            yield f'{self.name}_sum', _format_labels(self.labels, key), total
+            yield f'{self.name}_count', _format_labels(self.labels, key), count
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, help, labels=()):
+        return self._add(Counter(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def register_collector(self, collect):
+        # collect() returns [(name, type, help, {((label, value), ...): value})]
+        # and is called on every render, for values owned by someone else
+        self._collectors.append(collect)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines += [f'# HELP {metric.name} {metric.help}', f'# TYPE {metric.name} {metric.type}']
+            lines += [f'{name}{labels} {_format_value(value)}' for name, labels, value in metric.samples()]
+        for collect in self._collectors:
+            for name, type, help, values in collect():
+                lines += [f'# HELP {name} {help}', f'# TYPE {name} {type}']
+                for labels, value in values.items():
+                    labels = _format_labels(*zip(*labels)) if labels else ''
+                    lines.append(f'{name}{labels} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
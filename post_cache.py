@@ -0,0 +1,242 @@
+"""Result cache for generated LinkedIn posts.
+
+A PostCache is a stack of tiers that all share the same get/set interface.
+Lookups go top-down and backfill the faster tiers on a hit, writes go to
+every tier. MemoryTier is a bounded LRU with a TTL, SQLiteTier survives
+restarts. Any object with get(key) / set(key, value, expires_at) / clear()
+can be plugged in as another tier.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+CACHE_MODES = ('bypass', 'refresh')
+
+
+def normalize_topic(topic):
+    # "  AI in Healthcare! " and "ai in healthcare" should share an entry
+    return ' '.join(topic.lower().split()).strip(' .!?')
+
+
+def cache_key(topic, model, temperature, template_hash):
+    payload = json.dumps([normalize_topic(topic), model, temperature, template_hash])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def template_hash(*parts):
+    return hashlib.sha256('\x00'.join(parts).encode('utf-8')).hexdigest()[:16]
+
+
+class MemoryTier:
+    name = 'memory'
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self.expirations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self.expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            return value, expires_at
+
+    def set(self, key, value, expires_at):
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteTier:
+    name = 'sqlite'
+
+    def __init__(self, path):
+        self.path = path
+        self.expirations = 0
+        db = sqlite3.connect(path)
+        db.execute(
+            'CREATE TABLE IF NOT EXISTS posts ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)'
+        )
+        db.execute('DELETE FROM posts WHERE expires_at <= ?', (time.time(),))
+        db.commit()
+        db.close()
+        self._inherited = []
+        self._connection = None
+        self.start()
+
+    def start(self):
+        # SQLite connections can't be used across fork(): a worker process
+        # forked from a preloaded server calls this to open its own on
+        # first use. The parent's connection is kept, never used or closed,
+        # since closing it in the child can release the parent's file locks
+        if self._connection is not None:
+            self._inherited.append(self._connection)
+        self._lock = threading.Lock()
+        self._connection = None
+
+    @property
+    def _db(self):
+        # Callers hold self._lock
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        return self._connection
+
+    def get(self, key):
+        with self._lock:
+            row = self._db.execute(
+                'SELECT value, expires_at FROM posts WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= time.time():
+                self._db.execute('DELETE FROM posts WHERE key = ?', (key,))
+                self._db.commit()
+                self.expirations += 1
+                return None
+            return row[0], row[1]
+
+    def set(self, key, value, expires_at):
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO posts (key, value, expires_at) VALUES (?, ?, ?)',
+                (key, value, expires_at)
+            )
+            self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._db.execute('DELETE FROM posts')
+            self._db.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM posts').fetchone()[0]
+
+
+class PostCache:
+
+    def __init__(self, tiers, ttl=3600):
+        self.tiers = list(tiers)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'stores': 0, 'bypassed': 0, 'refreshed': 0}
+        self._tier_hits = {tier.name: 0 for tier in self.tiers}
+
+    def start(self):
+        # Called in a process forked from the one that built the cache;
+        # tiers holding connections or threads reopen them
+        for tier in self.tiers:
+            if hasattr(tier, 'start'):
+                tier.start()
+
+    def get(self, key):
+        for i, tier in enumerate(self.tiers):
+            found = tier.get(key)
+            if found is None:
+                continue
+            value, expires_at = found
+            for upper in self.tiers[:i]:
+                upper.set(key, value, expires_at)
+            self._count('hits')
+            with self._lock:
+                self._tier_hits[tier.name] += 1
+            return value
+        self._count('misses')
+        return None
+
+    def set(self, key, value):
+        expires_at = time.time() + self.ttl
+        for tier in self.tiers:
+            tier.set(key, value, expires_at)
+        self._count('stores')
+
+    def get_or_create(self, key, create, mode=None, cacheable=None):
+        # mode: None uses the cache, 'bypass' skips it entirely and
+        # 'refresh' always regenerates and overwrites the cached entry.
+        # A created value is stored unless cacheable(value) says otherwise.
+        # Returns (value, cached)
+        if mode == 'bypass':
+            self._count('bypassed')
+            return create(), False
+        if mode == 'refresh':
+            self._count('refreshed')
+        else:
+            value = self.get(key)
+            if value is not None:
+                return value, True
+        value = create()
+        if cacheable is None or cacheable(value):
+            self.set(key, value)
+        return value, False
+
+    async def aget_or_create(self, key, create, mode=None, cacheable=None):
+        # get_or_create for coroutines: create() returns an awaitable
+        if mode == 'bypass':
+            self._count('bypassed')
+            return await create(), False
+        if mode == 'refresh':
+            self._count('refreshed')
+        else:
+            value = self.get(key)
+            if value is not None:
+                return value, True
+        value = await create()
+        if cacheable is None or cacheable(value):
+            self.set(key, value)
+        return value, False
+
+    def clear(self):
+        for tier in self.tiers:
+            tier.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            tier_hits = dict(self._tier_hits)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        stats['tiers'] = {
+            tier.name: {
+                'entries': len(tier),
+                'hits': tier_hits[tier.name],
+                'evictions': getattr(tier, 'evictions', 0),
+                'expirations': getattr(tier, 'expirations', 0),
+            }
+            for tier in self.tiers
+        }
+        return stats
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+
+def build_post_cache(max_entries=256, ttl=3600, path=None):
+    tiers = [MemoryTier(max_entries)]
+    if path:
+        tiers.append(SQLiteTier(path))
+    return PostCache(tiers, ttl=ttl)
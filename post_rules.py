@@ -0,0 +1,192 @@
+"""Local checks and formatting for the LinkedIn post contract.
+
+Every post should have a hook, 3-4 takeaways, 150-200 words, a closing
+question and 3-5 hashtags. check_post() verifies that without an LLM call,
+and score_post() ranks candidate posts by how close they come.
+format_post() does the mechanical part of the editor's job (line breaks,
+hashtags, length, closing question, copy-paste clean-up) in pure Python, so
+the editor agent is only needed when a draft can't be fixed that way.
+"""
+import re
+
+
+HASHTAG_RE = re.compile(r'(?<![\w#])#\w+')
+# Numbered ("1.", "2)", "3️⃣") or bulleted ("-", "•", "✅", "👉", ...) lines
+TAKEAWAY_RE = re.compile(r'^(\d+[.)]|\d️?⃣|[-*•▪▸►→✓✔✅🔹🔸👉📌💡])\s*')
+
+MIN_WORDS, MAX_WORDS = 150, 200
+MIN_TAKEAWAYS, MAX_TAKEAWAYS = 3, 4
+MIN_HASHTAGS, MAX_HASHTAGS = 3, 5
+MAX_HOOK_WORDS = 25
+MAX_SENTENCES_PER_PARAGRAPH = 2
+
+SENTENCE_END_RE = re.compile(r'(?<=[.!?])\s+')
+TRAILING_HASHTAGS_RE = re.compile(r'(?:^|\s)#\w+(?:\s+#\w+)*\s*$')
+MARKDOWN_RE = re.compile(r'\*\*|__|^#{1,6}\s+', re.MULTILINE)
+FALLBACK_HASHTAGS = ['#LinkedIn', '#Insights', '#Growth']
+CLOSING_QUESTION = "What has your experience been? Share your thoughts below."
+STOPWORDS = {'and', 'for', 'from', 'how', 'into', 'that', 'the', 'this', 'what', 'when', 'why', 'with', 'your'}
+
+
+def hashtags(post):
+    return HASHTAG_RE.findall(post)
+
+
+def body_lines(post):
+    # Non-empty lines that aren't just a run of hashtags
+    lines = [line.strip() for line in post.splitlines()]
+    return [line for line in lines if line and HASHTAG_RE.sub('', line).strip()]
+
+
+def word_count(post):
+    return len(HASHTAG_RE.sub('', post).split())
+
+
+def check_post(post):
+    lines = body_lines(post)
+    tags = hashtags(post)
+    unique_tags = {tag.lower() for tag in tags}
+    hook = lines[0] if lines else ''
+    takeaways = sum(1 for line in lines if TAKEAWAY_RE.match(line))
+    words = word_count(post)
+
+    rules = {
+        'hook': bool(hook) and len(hook.split()) <= MAX_HOOK_WORDS,
+        'takeaways': MIN_TAKEAWAYS <= takeaways <= MAX_TAKEAWAYS,
+        'word_count': MIN_WORDS <= words <= MAX_WORDS,
+        'closing_question': any('?' in line for line in lines[-2:]),
+        'hashtags': MIN_HASHTAGS <= len(unique_tags) <= MAX_HASHTAGS and len(tags) == len(unique_tags),
+    }
+    return {
+        'passed': all(rules.values()),
+        'failed': [name for name, ok in rules.items() if not ok],
+        'words': words,
+        'takeaways': takeaways,
+        'hashtags': len(tags),
+    }
+
+
+def _closeness(value, low, high, scale):
+    # 1 inside [low, high], falling linearly to 0 at scale outside it
+    distance = max(low - value, value - high, 0)
+    return max(0.0, 1 - distance / scale)
+
+
+def score_post(post):
+    # 0-1 rank for picking between candidate posts: the rules check_post()
+    # passes or fails, but with partial credit for near misses (a 210 word
+    # post beats a 300 word one)
+    checks = check_post(post)
+    lines = body_lines(post)
+    hook_words = len(lines[0].split()) if lines else MAX_HOOK_WORDS * 2
+    tags = hashtags(post)
+    unique_tags = len({tag.lower() for tag in tags})
+    parts = [
+        _closeness(hook_words, 1, MAX_HOOK_WORDS, MAX_HOOK_WORDS),
+        _closeness(checks['takeaways'], MIN_TAKEAWAYS, MAX_TAKEAWAYS, MIN_TAKEAWAYS),
+        _closeness(checks['words'], MIN_WORDS, MAX_WORDS, MAX_WORDS - MIN_WORDS),
+        1.0 if 'closing_question' not in checks['failed'] else 0.0,
+        _closeness(unique_tags, MIN_HASHTAGS, MAX_HASHTAGS, MIN_HASHTAGS) - 0.25 * (len(tags) - unique_tags),
+    ]
+    return round(sum(max(0.0, part) for part in parts) / len(parts), 4)
+
+
+def topic_hashtags(topic):
+    words = re.findall(r'[A-Za-z0-9]+', topic or '')
+    if not words:
+        return []
+    tags = ['#' + ''.join(word[:1].upper() + word[1:] for word in words)]
+    for word in words:
+        if word.isupper() or (len(word) > 3 and word.lower() not in STOPWORDS):
+            tags.append('#' + word[:1].upper() + word[1:])
+    return tags
+
+
+def _is_takeaway_block(block):
+    return bool(block) and TAKEAWAY_RE.match(block[0]) is not None
+
+
+def _split_prose(lines, hook=False):
+    # At most two sentences per paragraph; the hook gets a line of its own
+    sentences = SENTENCE_END_RE.split(' '.join(lines))
+    blocks = [[sentences.pop(0)]] if hook else []
+    blocks.extend(
+        [' '.join(sentences[i:i + MAX_SENTENCES_PER_PARAGRAPH])]
+        for i in range(0, len(sentences), MAX_SENTENCES_PER_PARAGRAPH)
+    )
+    return blocks
+
+
+def _trim(blocks, words, limit=MAX_WORDS):
+    # Drop sentences from the narrative middle (never the hook, takeaways or
+    # closing question), last paragraph first, until the post fits in limit
+    for index in range(len(blocks) - 2, 0, -1):
+        block = blocks[index]
+        if _is_takeaway_block(block) or '?' in block[-1]:
+            continue
+        sentences = SENTENCE_END_RE.split(' '.join(block))
+        while sentences and words > limit:
+            words -= word_count(sentences.pop())
+        blocks[index] = [' '.join(sentences)] if sentences else []
+        if words <= limit:
+            break
+    return [block for block in blocks if block]
+
+
+def format_post(post, topic=None):
+    text = MARKDOWN_RE.sub('', post.replace('\r\n', '\n')).strip()
+
+    # Pull hashtag runs off the end of lines; they're rebuilt as one block
+    paragraphs, current, trailing = [], [], []
+    for line in text.split('\n'):
+        line = line.strip()
+        run = TRAILING_HASHTAGS_RE.search(line)
+        if run:
+            trailing.extend(hashtags(run.group()))
+            line = line[:run.start()].strip()
+        if line:
+            current.append(line)
+        elif current:
+            paragraphs.append(current)
+            current = []
+    if current:
+        paragraphs.append(current)
+
+    # Short prose paragraphs, consecutive list items kept together
+    blocks = []
+    for paragraph in paragraphs:
+        group = []
+        for line in paragraph:
+            if group and _is_takeaway_block(group) != _is_takeaway_block([line]):
+                blocks.extend([group] if _is_takeaway_block(group) else _split_prose(group, not blocks))
+                group = []
+            group.append(line)
+        blocks.extend([group] if _is_takeaway_block(group) else _split_prose(group, not blocks))
+
+    # The last block is never trimmed, so whether the closing question gets
+    # added is known now; its words count against the limit too
+    closing = [] if any('?' in line for block in blocks[-1:] for line in block) else [[CLOSING_QUESTION]]
+    limit = MAX_WORDS - word_count(CLOSING_QUESTION) * len(closing)
+    words = sum(word_count(' '.join(block)) for block in blocks)
+    if words > limit:
+        blocks = _trim(blocks, words, limit)
+    blocks += closing
+
+    body = '\n\n'.join('\n'.join(block) for block in blocks)
+
+    # 3-5 unique hashtags in total, counting any left inline in the text
+    seen = {tag.lower() for tag in hashtags(body)}
+    tags = []
+    for tag in trailing + topic_hashtags(topic) + FALLBACK_HASHTAGS:
+        if len(seen) >= MAX_HASHTAGS or (len(seen) >= MIN_HASHTAGS and tag not in trailing):
+            break
+        if tag.lower() not in seen:
+            seen.add(tag.lower())
+            tags.append(tag)
+
+    return body + ('\n\n' + ' '.join(tags) if tags else '')
+
+
+def needs_editing(draft):
+    # True when formatting alone can't make the draft meet every rule
+    return not check_post(format_post(draft))['passed']
@@ -0,0 +1,216 @@
+"""Persistent history of generated posts, with full-text search.
+
+Every generation is recorded: topic, writer draft, final post, model,
+timings and token counts. Rows live in SQLite in WAL mode, so readers never
+wait for the writer, and an FTS5 index over topic and post answers /search.
+
+record() only puts the row on a queue. A writer thread inserts what has
+queued up in one transaction per batch (up to batch_size rows, or whatever
+arrived within flush_interval seconds), so requests never wait on the disk.
+If the queue is full the row is dropped and counted, rather than blocking.
+
+Both listings are newest first and paginate on the post id (`before`), so a
+page is an index range scan however many posts are stored, and search
+reads the FTS index in rowid order and stops at the page size instead of
+ranking every match.
+"""
+import atexit
+import json
+import queue
+import re
+import sqlite3
+import threading
+import time
+
+
+COLUMNS = ('id', 'created_at', 'topic', 'mode', 'model', 'cached', 'seconds',
+           'prompt_tokens', 'completion_tokens', 'post', 'draft', 'stages')
+# Listings leave out the draft and stage timings; get() has everything
+SUMMARY_COLUMNS = COLUMNS[:-2]
+MAX_PAGE_SIZE = 100
+SEARCH_TERM_RE = re.compile(r'\w+')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    topic TEXT NOT NULL,
+    mode TEXT,
+    model TEXT,
+    cached INTEGER NOT NULL DEFAULT 0,
+    seconds REAL,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    post TEXT NOT NULL,
+    draft TEXT,
+    stages TEXT
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+    topic, post, content='posts', content_rowid='id', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS posts_fts_insert AFTER INSERT ON posts BEGIN
+    INSERT INTO posts_fts (rowid, topic, post) VALUES (new.id, new.topic, new.post);
+END;
+CREATE TRIGGER IF NOT EXISTS posts_fts_delete AFTER DELETE ON posts BEGIN
+    INSERT INTO posts_fts (posts_fts, rowid, topic, post) VALUES ('delete', old.id, old.topic, old.post);
+END;
+"""
+INSERT = (f"INSERT INTO posts ({', '.join(COLUMNS[1:])}) "
+          f"VALUES ({', '.join('?' for _ in COLUMNS[1:])})")
+
+
+def _row(columns, values):
+    row = dict(zip(columns, values))
+    row['cached'] = bool(row['cached'])
+    return row
+
+
+def match_query(text):
+    # User text -> an FTS5 query: every word must appear (stemmed, so
+    # "mistakes" finds "mistake"). Quoting keeps FTS5 syntax characters in
+    # the input from being parsed as operators. No prefix matching: FTS5
+    # reads every match of a prefix query, which is slow for common words
+    terms = SEARCH_TERM_RE.findall(text or '')
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"' for term in terms)
+
+
+class PostStore:
+
+    def __init__(self, path, batch_size=256, flush_interval=0.2, max_queued=10000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queued = max_queued
+        self._counters = {'recorded': 0, 'written': 0, 'dropped': 0, 'batches': 0, 'failed_batches': 0}
+
+        db = self._connect()
+        db.execute('PRAGMA journal_mode=WAL')
+        db.executescript(SCHEMA)
+        db.close()
+        self.start()
+        atexit.register(self.flush, timeout=5)
+
+    def start(self):
+        # The writer thread doesn't survive fork(): a worker process forked
+        # from a preloaded server calls this again to get its own, with a
+        # new queue (the old one may still list the parent's thread as a
+        # waiter) and new reader connections
+        self._queue = queue.Queue(maxsize=self.max_queued)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        threading.Thread(target=self._write, name='post-store-writer', daemon=True).start()
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=10)
+        # WAL makes commits durable at the next checkpoint; a crash loses
+        # at most the last few batches, never corrupts the file
+        db.execute('PRAGMA synchronous=NORMAL')
+        return db
+
+    def _reader(self):
+        # One connection per thread; WAL lets them all read while the writer writes
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = self._local.db = self._connect()
+            db.execute('PRAGMA query_only=1')
+        return db
+
+    def record(self, topic, post, mode=None, model=None, cached=False, seconds=None,
+               prompt_tokens=None, completion_tokens=None, draft=None, stages=None):
+        row = (time.time(), topic, mode, model, int(bool(cached)), seconds, prompt_tokens,
+               completion_tokens, post, draft, json.dumps(stages) if stages is not None else None)
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self._count('dropped')
+            return False
+        self._count('recorded')
+        return True
+
+    def flush(self, timeout=None):
+        # Blocks until everything recorded so far is written. False if that
+        # takes more than timeout seconds, waiting for room in a full queue
+        # included
+        deadline = None if timeout is None else time.monotonic() + timeout
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(None if deadline is None else max(0.0, deadline - time.monotonic()))
+
+    def _write(self):
+        db = self._connect()
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            rows = [item for item in batch if not isinstance(item, threading.Event)]
+            if rows:
+                try:
+                    with db:
+                        db.executemany(INSERT, rows)
+                except sqlite3.Error as e:
+                    print(f"❌ Post store write failed, {len(rows)} posts lost: {e}")
+                    self._count('failed_batches')
+                else:
+                    with self._lock:
+                        self._counters['written'] += len(rows)
+                        self._counters['batches'] += 1
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+
+    def history(self, limit=20, before=None):
+        # Newest first; pass the last id of a page as before for the next one
+        rows = self._reader().execute(
+            f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM posts WHERE id < ? ORDER BY id DESC LIMIT ?",
+            (2 ** 63 - 1 if before is None else before, min(limit, MAX_PAGE_SIZE))
+        ).fetchall()
+        return [_row(SUMMARY_COLUMNS, row) for row in rows]
+
+    def search(self, text, limit=20, before=None):
+        # Posts whose topic or text contain every word, newest first, each
+        # with a snippet around the match
+        query = match_query(text)
+        if query is None:
+            return []
+        rows = self._reader().execute(
+            f"SELECT {', '.join('posts.' + column for column in SUMMARY_COLUMNS)}, "
+            "snippet(posts_fts, 1, '[', ']', '…', 16) "
+            "FROM posts_fts JOIN posts ON posts.id = posts_fts.rowid "
+            "WHERE posts_fts MATCH ? AND posts_fts.rowid < ? ORDER BY posts_fts.rowid DESC LIMIT ?",
+            (query, 2 ** 63 - 1 if before is None else before, min(limit, MAX_PAGE_SIZE))
+        ).fetchall()
+        return [_row(SUMMARY_COLUMNS + ('snippet',), row) for row in rows]
+
+    def get(self, post_id):
+        row = self._reader().execute(
+            f"SELECT {', '.join(COLUMNS)} FROM posts WHERE id = ?", (post_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        found = _row(COLUMNS, row)
+        found['stages'] = json.loads(found['stages']) if found['stages'] else None
+        return found
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        stats['queued'] = self._queue.qsize()
+        return stats
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+
+def build_post_store(path=None, **options):
+    # None (history off) unless a database path is configured
+    return PostStore(path, **options) if path else None
@@ -0,0 +1,189 @@
+"""Agent personas and task prompts, and what they cost in tokens.
+
+Every prompt is laid out static part first: the persona (system message),
+then the task's requirements, and the topic last. Only the topic changes
+between requests, so providers that cache prompt prefixes can reuse
+everything before it.
+
+Two profiles:
+
+- full: the original wording
+- compact: the same rules in far fewer words. format_post() and the
+  editor's needs_editing() guard still enforce the contract either way
+
+PROMPT_PROFILE picks one. `python prompts.py` prints a token report per
+stage and prompt section for both.
+"""
+import sys
+
+from metrics import estimate_tokens
+
+
+PROFILES = {
+    'full': {
+        'writer_role': 'LinkedIn Content Strategist',
+        'writer_goal': 'Create engaging, professional LinkedIn posts that drive engagement',
+        'writer_backstory': """You are an expert LinkedIn content creator with years of
+    experience crafting viral posts. You understand what makes content
+    engaging: storytelling, hooks, personal insights, and clear value
+    propositions. You write in a conversational yet professional tone.""",
+        'editor_role': 'Content Editor',
+        'editor_goal': 'Polish and optimize the content for maximum LinkedIn engagement',
+        'editor_backstory': """You are a meticulous editor who ensures every post is
+    clear, impactful, and follows LinkedIn best practices. You add
+    relevant hashtags, ensure proper formatting, and make the content
+    scannable and engaging.""",
+
+        'writing_description': """Create an engaging LinkedIn post about the topic below.
+
+        Requirements:
+        - Start with a strong hook that grabs attention
+        - Share a personal insight or story if relevant
+        - Provide 3-4 key takeaways or actionable tips
+        - Keep it between 150-200 words
+        - Use short paragraphs for readability
+        - End with a question to encourage engagement
+        - Write in a conversational, authentic tone
+
+        Topic: {topic}""",
+        'writing_output': "A compelling LinkedIn post draft with all required elements",
+
+        'editing_description': """Review and optimize the LinkedIn post:
+
+        - Ensure the hook is attention-grabbing
+        - Add line breaks for better readability
+        - Add 3-5 relevant hashtags at the end
+        - Ensure it's engaging and professional
+        - Make sure the call-to-action question is clear
+        - Format it ready to copy-paste into LinkedIn""",
+        'editing_output': "A polished, formatted LinkedIn post ready to publish",
+
+        # mode=fused: the writer drafts and edits in one call, half the round trips
+        'fused_description': """Create a polished, ready-to-publish LinkedIn post about the topic below.
+
+        Write it:
+        - Start with a strong hook that grabs attention
+        - Share a personal insight or story if relevant
+        - Provide 3-4 key takeaways or actionable tips
+        - Keep it between 150-200 words
+        - Use short paragraphs for readability
+        - End with a question to encourage engagement
+        - Write in a conversational, authentic tone
+
+        Then edit it before answering:
+        - Make sure the hook is attention-grabbing
+        - Add line breaks for better readability
+        - Add 3-5 relevant hashtags at the end
+        - Make sure the call-to-action question is clear
+        - Format it ready to copy-paste into LinkedIn
+
+        Answer with the final post only.
+
+        Topic: {topic}""",
+        'fused_output': "A polished, formatted LinkedIn post ready to publish",
+    },
+    'compact': {
+        'writer_role': 'LinkedIn Content Strategist',
+        'writer_goal': 'Write LinkedIn posts that drive engagement',
+        'writer_backstory': "You write viral LinkedIn posts: strong hooks, personal insight, clear value, "
+                            "conversational but professional.",
+        'editor_role': 'Content Editor',
+        'editor_goal': 'Polish LinkedIn posts for engagement',
+        'editor_backstory': "You edit LinkedIn posts to be clear, scannable and ready to publish.",
+
+        'writing_description': """Write a LinkedIn post on the topic below:
+- a one-line hook
+- a personal insight
+- 3-4 numbered takeaways
+- 150-200 words, short paragraphs
+- end with a question; conversational tone
+
+Topic: {topic}""",
+        'writing_output': "The post draft",
+
+        'editing_description': """Review and optimize this LinkedIn post: punchy hook, short paragraphs, \
+3-4 numbered takeaways, a clear closing question, 3-5 hashtags at the end, plain text.""",
+        'editing_output': "The final post",
+
+        'fused_description': """Write a ready-to-publish LinkedIn post on the topic below:
+- a one-line hook
+- a personal insight
+- 3-4 numbered takeaways
+- 150-200 words, short paragraphs
+- end with a question, then 3-5 hashtags
+- plain text, final post only
+
+Topic: {topic}""",
+        'fused_output': "The final post",
+    },
+}
+PROFILE_NAMES = tuple(PROFILES)
+
+# Sample inputs for the report: a topic, and a draft for the editor's context
+SAMPLE_TOPIC = "Remote work productivity"
+SAMPLE_DRAFT_WORDS = 180
+
+
+def persona_prompt(role, backstory, goal):
+    # CrewAI's system message for an agent
+    return f"You are {role}. {backstory}\nYour personal goal is: {goal}"
+
+
+def task_prompt(description, expected_output, topic, context=''):
+    # CrewAI's user message for a task: description, expected output, context
+    task = (f"{description.replace('{topic}', topic)}\n\n"
+            f"This is the expected criteria for your final answer: {expected_output}\n"
+            "you MUST return the actual complete content as the final answer, not a summary.")
+    if context:
+        task += f"\n\nThis is the context you're working with:\n{context}"
+    return task
+
+
+def stage_sections(prompts, stage, topic=SAMPLE_TOPIC, context=''):
+    # One stage's prompt split into (section, text, static) in the order sent.
+    # Static sections are identical on every request
+    agent = 'editor' if stage == 'editing' else 'writer'
+    description = prompts[f'{stage}_description']
+    before, _, after = description.partition('{topic}')
+    sections = [
+        ('persona', persona_prompt(prompts[f'{agent}_role'], prompts[f'{agent}_backstory'],
+                                   prompts[f'{agent}_goal']), True),
+        ('task', before, True),
+    ]
+    if '{topic}' in description:
+        sections.append(('topic', topic, False))
+    sections.append(('instructions', after + task_prompt('', prompts[f'{stage}_output'], ''), not after.strip()))
+    if context:
+        sections.append(('context', context, False))
+    return sections
+
+
+def token_report(profile):
+    # {stage: {section: tokens, ..., 'total', 'static_prefix'}}; the editor's
+    # context is a sample draft. static_prefix counts tokens up to the first
+    # section that changes between requests
+    prompts = PROFILES[profile]
+    draft = ' '.join(['word'] * SAMPLE_DRAFT_WORDS)
+    report = {}
+    for stage in ('writing', 'editing', 'fused'):
+        sections = stage_sections(prompts, stage, context=draft if stage == 'editing' else '')
+        tokens = {name: estimate_tokens(text) for name, text, _ in sections}
+        prefix = 0
+        for name, _, static in sections:
+            if not static:
+                break
+            prefix += tokens[name]
+        report[stage] = dict(tokens, total=sum(tokens.values()), static_prefix=prefix)
+    return report
+
+
+def main(profiles=PROFILE_NAMES):
+    columns = ('persona', 'task', 'topic', 'instructions', 'context', 'total', 'static_prefix')
+    print(f"{'profile':<9}{'stage':<9}" + ''.join(f"{column:>14}" for column in columns))
+    for profile in profiles:
+        for stage, tokens in token_report(profile).items():
+            print(f"{profile:<9}{stage:<9}" + ''.join(f"{tokens.get(column, 0):>14}" for column in columns))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:] or PROFILE_NAMES)
@@ -0,0 +1,232 @@
+"""Near-duplicate topic cache: serves a cached post for a differently worded topic.
+
+The exact-match PostCache misses "remote work productivity" vs "productivity
+when working remotely". SemanticCache embeds each topic with a hashed bag of
+words and character trigrams (no model to download, CPU only, about 50us per
+topic) and returns the post of the most similar cached topic when the cosine
+similarity is at least the threshold.
+
+Vectors live in a preallocated float32 matrix of max_entries rows, so memory is
+fixed up front (max_entries * dim * 4 bytes) and the least recently used topic
+is evicted when it's full. Lookups are a brute-force matrix-vector product by
+default; with hnswlib installed, index='hnsw' keeps an approximate nearest
+neighbour graph instead, which stays fast at a few hundred thousand topics.
+"""
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+from post_cache import normalize_topic
+
+
+INDEXES = ('brute', 'hnsw')
+WORD_RE = re.compile(r'[a-z0-9]+')
+STOPWORDS = frozenset(
+    'a an and are as at be by for from how in into is it of on or the to what when why with without'
+    ' you your we our'.split()
+)
+# Longest first; a crude stemmer is enough to line up "working" and "work"
+SUFFIXES = ('ingly', 'ation', 'ness', 'ment', 'ing', 'ly', 'ed', 'es', 's')
+TRIGRAM_WEIGHT = 0.35
+
+
+def _stem(word):
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+class HashedNgramVectorizer:
+    # Word stems plus their character trigrams, hashed into dim buckets with
+    # a random sign and L2-normalized, so a dot product is cosine similarity
+
+    def __init__(self, dim=256):
+        self.dim = dim
+
+    def features(self, topic):
+        for word in WORD_RE.findall(topic.lower()):
+            if word in STOPWORDS:
+                continue
+            word = _stem(word)
+            yield word, 1.0
+            padded = f'<{word}>'
+            for i in range(len(padded) - 2):
+                yield '#' + padded[i:i + 3], TRIGRAM_WEIGHT
+
+    def transform(self, topic):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature, weight in self.features(topic):
+            h = int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'little')
+            vector[h % self.dim] += weight if h >> 63 else -weight
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class BruteForceIndex:
+    # Exact search: one matrix-vector product over every slot
+
+    def __init__(self, capacity, dim):
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.scopes = np.full(capacity, -1, dtype=np.int32)
+
+    def add(self, slot, vector, scope):
+        self.vectors[slot] = vector
+        self.scopes[slot] = scope
+
+    def remove(self, slot):
+        self.vectors[slot] = 0
+        self.scopes[slot] = -1
+
+    def search(self, vector, scope):
+        # Returns (slot, similarity) of the best match in scope, or (None, 0.0)
+        scores = self.vectors @ vector
+        scores[self.scopes != scope] = -1.0
+        slot = int(np.argmax(scores))
+        if self.scopes[slot] != scope:
+            return None, 0.0
+        return slot, float(scores[slot])
+
+    def nbytes(self):
+        return self.vectors.nbytes + self.scopes.nbytes
+
+
+class HnswIndex:
+    # Approximate search on an hnswlib graph; evicted slots are marked
+    # deleted and their labels reused by the next add
+    candidates = 8
+
+    def __init__(self, capacity, dim, m=16, ef_construction=100, ef=64):
+        if hnswlib is None:
+            raise RuntimeError("index='hnsw' needs the hnswlib package (pip install hnswlib)")
+        self.graph = hnswlib.Index(space='ip', dim=dim)
+        self.graph.init_index(max_elements=capacity, M=m, ef_construction=ef_construction,
+                              allow_replace_deleted=True)
+        self.graph.set_ef(ef)
+        self.scopes = np.full(capacity, -1, dtype=np.int32)
+        self.dim = dim
+        self.m = m
+        self.size = 0
+
+    def add(self, slot, vector, scope):
+        # A live label is updated in place
+        if self.scopes[slot] == -1:
+            self.size += 1
+        self.graph.add_items(vector[np.newaxis], np.array([slot]), replace_deleted=True)
+        self.scopes[slot] = scope
+
+    def remove(self, slot):
+        self.graph.mark_deleted(slot)
+        self.scopes[slot] = -1
+        self.size -= 1
+
+    def search(self, vector, scope):
+        if not self.size:
+            return None, 0.0
+        # A few neighbours, since the nearest one may belong to another scope
+        labels, distances = self.graph.knn_query(vector, k=min(self.candidates, self.size))
+        for slot, distance in zip(labels[0], distances[0]):
+            if self.scopes[slot] == scope:
+                return int(slot), 1.0 - float(distance)
+        return None, 0.0
+
+    def nbytes(self):
+        # Vectors plus roughly 2*M neighbour links per element on level 0
+        return self.graph.get_max_elements() * (self.dim * 4 + self.m * 2 * 4) + self.scopes.nbytes
+
+
+class SemanticCache:
+    # Topics only match topics in the same scope (model, temperature, prompts),
+    # the same way cache_key keeps them apart in PostCache
+
+    def __init__(self, threshold=0.8, max_entries=10000, ttl=3600, dim=256, index='brute'):
+        if index not in INDEXES:
+            raise ValueError(f"index must be one of: {', '.join(INDEXES)}")
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.index_name = index
+        self.vectorizer = HashedNgramVectorizer(dim)
+        self.index = (HnswIndex if index == 'hnsw' else BruteForceIndex)(max_entries, dim)
+        # slot -> (scope, normalized topic, post, expires_at), least recently used first
+        self._entries = OrderedDict()
+        self._slots = {}
+        self._free = list(range(max_entries - 1, -1, -1))
+        self._scopes = {}
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0, 'expirations': 0}
+
+    def get(self, topic, scope):
+        # Returns (post, matched topic, similarity), or None below the threshold
+        vector = self.vectorizer.transform(topic)
+        with self._lock:
+            scope_id = self._scopes.get(scope)
+            slot, similarity = (None, 0.0) if scope_id is None else self.index.search(vector, scope_id)
+            if slot is not None and similarity >= self.threshold:
+                _, matched, post, expires_at = self._entries[slot]
+                if expires_at > time.time():
+                    self._entries.move_to_end(slot)
+                    self._counters['hits'] += 1
+                    return post, matched, similarity
+                self._drop(slot)
+                self._counters['expirations'] += 1
+            self._counters['misses'] += 1
+        return None
+
+    def set(self, topic, scope, post):
+        topic = normalize_topic(topic)
+        vector = self.vectorizer.transform(topic)
+        if not vector.any():
+            # Nothing but stopwords; it would match nothing anyway
+            return
+        with self._lock:
+            scope_id = self._scopes.setdefault(scope, len(self._scopes))
+            slot = self._slots.get((scope_id, topic))
+            if slot is None:
+                if not self._free:
+                    self._drop(next(iter(self._entries)))
+                    self._counters['evictions'] += 1
+                slot = self._free.pop()
+                self._slots[(scope_id, topic)] = slot
+            self.index.add(slot, vector, scope_id)
+            self._entries[slot] = (scope_id, topic, post, time.time() + self.ttl)
+            self._entries.move_to_end(slot)
+            self._counters['stores'] += 1
+
+    def clear(self):
+        with self._lock:
+            for slot in list(self._entries):
+                self._drop(slot)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        stats.update(entries=len(self), max_entries=self.max_entries, threshold=self.threshold,
+                     index=self.index_name, index_bytes=self.index.nbytes())
+        return stats
+
+    def _drop(self, slot):
+        scope_id, topic, _, _ = self._entries.pop(slot)
+        del self._slots[(scope_id, topic)]
+        self.index.remove(slot)
+        self._free.append(slot)
+
+
+def build_semantic_cache(enabled=False, threshold=0.8, max_entries=10000, ttl=3600, index='brute'):
+    if not enabled:
+        return None
+    return SemanticCache(threshold=threshold, max_entries=max_entries, ttl=ttl, index=index)
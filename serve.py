@@ -0,0 +1,139 @@
+"""Production server for the Flask app: several worker processes, each with threads.
+
+    python serve.py --workers 4 --threads 16 --port 5000
+
+Runs gunicorn with threaded workers when it's installed (`pip install
+gunicorn`), otherwise waitress (`pip install waitress`): one process with a
+thread pool, which also works on Windows. `python main3.py` is Flask's
+development server, with the debugger and reloader, and is not meant for
+traffic.
+
+With gunicorn the app is imported and the LLM stack loaded in the master
+process before it forks the workers (--preload, the default). crewai, the
+agents and the compiled static assets are then shared copy-on-write, and a
+new or restarted worker answers at once instead of loading them itself.
+Caches, stats and /metrics are per worker.
+
+SIGTERM (or Ctrl+C) shuts down gracefully. The workers stop accepting
+connections, let the generations in flight finish, then drain queued /jobs
+and write recorded posts (main3.shutdown). Whatever is still running after
+--graceful-timeout seconds is cut off. waitress gives requests in flight only
+a few seconds before draining /jobs.
+
+Every flag defaults to an environment variable: PORT, WEB_CONCURRENCY,
+WEB_THREADS, KEEP_ALIVE, GRACEFUL_TIMEOUT, WORKER_TIMEOUT.
+"""
+import argparse
+import os
+import signal
+
+SERVERS = ('gunicorn', 'waitress')
+
+
+def default_server():
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        return 'waitress'
+    return 'gunicorn'
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--server', choices=SERVERS, default=None,
+                        help='default: gunicorn if installed, else waitress')
+    parser.add_argument('--host', default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument('--port', type=int, default=int(os.getenv("PORT", "5000")))
+    # Generations mostly wait on the LLM, so threads carry the concurrency;
+    # processes add CPU for crewai's own overhead and JSON
+    parser.add_argument('--workers', type=int, default=int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1))),
+                        help='worker processes (gunicorn only)')
+    parser.add_argument('--threads', type=int, default=int(os.getenv("WEB_THREADS", "16")),
+                        help='request threads per worker')
+    parser.add_argument('--keep-alive', type=int, default=int(os.getenv("KEEP_ALIVE", "5")),
+                        help='seconds an idle keep-alive connection stays open')
+    parser.add_argument('--graceful-timeout', type=int, default=int(os.getenv("GRACEFUL_TIMEOUT", "60")),
+                        help='seconds to finish in-flight work on shutdown')
+    parser.add_argument('--timeout', type=int, default=int(os.getenv("WORKER_TIMEOUT", "120")),
+                        help='seconds before a worker that stopped responding is restarted (gunicorn only)')
+    parser.add_argument('--no-preload', dest='preload', action='store_false',
+                        help='import the app in each worker instead of once before forking')
+    parser.add_argument('--no-warm-up', dest='warm_up', action='store_false',
+                        help="don't load the LLM stack before serving")
+    return parser.parse_args(argv)
+
+
+def load_app(warm_up=True):
+    import main3
+    if warm_up:
+        timings = main3.warm_up()
+        print(f"🔥 LLM stack ready in {timings['total_seconds']:.2f}s")
+    return main3.app
+
+
+def run_gunicorn(args):
+    from gunicorn.app.base import BaseApplication
+
+    def worker_exit(server, worker):
+        # Runs in the worker once its in-flight requests are done
+        import main3
+        main3.shutdown(timeout=args.graceful_timeout)
+
+    options = {
+        'bind': f"{args.host}:{args.port}",
+        'workers': args.workers,
+        'worker_class': 'gthread',
+        'threads': args.threads,
+        'keepalive': args.keep_alive,
+        'graceful_timeout': args.graceful_timeout,
+        'timeout': args.timeout,
+        'preload_app': args.preload,
+        'worker_exit': worker_exit,
+        'accesslog': None,
+    }
+
+    class Server(BaseApplication):
+
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return load_app(args.warm_up)
+
+    Server().run()
+
+
+def run_waitress(args):
+    from waitress import create_server
+
+    server = create_server(load_app(args.warm_up), host=args.host, port=args.port, threads=args.threads,
+                           channel_timeout=args.keep_alive, ident='linkedin-post-generator')
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        # Returns on Ctrl+C or SIGTERM, after giving the request threads a
+        # few seconds to finish
+        server.run()
+    finally:
+        import main3
+        server.close()
+        main3.shutdown(timeout=args.graceful_timeout)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    server = args.server or default_server()
+    print(f"🚀 Serving on http://{args.host}:{args.port} with {server} "
+          f"({args.workers if server == 'gunicorn' else 1} x {args.threads} threads)")
+    if server == 'gunicorn':
+        run_gunicorn(args)
+    else:
+        run_waitress(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Request coalescing: concurrent calls for the same key share one run.
+
+The first caller for a key (the leader) does the work; anyone asking for the
+same key while it's running waits and gets the leader's result, or its
+exception. Nothing is kept once the run finishes, so this only merges calls
+that overlap in time, which is exactly when a trending topic would otherwise
+start the same generation many times over.
+"""
+import asyncio
+import threading
+
+
+class _Call:
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+
+    def __init__(self):
+        self._calls = {}
+        # key -> [task, waiters] for coroutine callers (see ado)
+        self._async_calls = {}
+        self._lock = threading.Lock()
+        self._counters = {'leaders': 0, 'coalesced': 0}
+
+    def do(self, key, fn):
+        # Returns (value, shared); shared is True if another call did the work
+        with self._lock:
+            call = self._calls.get(key)
+            shared = call is not None
+            if shared:
+                self._counters['coalesced'] += 1
+            else:
+                call = self._calls[key] = _Call()
+                self._counters['leaders'] += 1
+
+        if shared:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value, True
+
+        try:
+            call.value = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.value, False
+
+    async def ado(self, key, create):
+        # do() for coroutines: create() returns an awaitable. The run only
+        # gets cancelled once every caller waiting on it has been cancelled,
+        # so one client disconnecting doesn't fail the others
+        call = self._async_calls.get(key)
+        shared = call is not None
+        if shared:
+            self._count('coalesced')
+        else:
+            call = self._async_calls[key] = [asyncio.ensure_future(create()), 0]
+            call[0].add_done_callback(lambda _: self._forget(key, call))
+            self._count('leaders')
+
+        call[1] += 1
+        try:
+            return await asyncio.shield(call[0]), shared
+        finally:
+            call[1] -= 1
+            if not call[1] and not call[0].done():
+                call[0].cancel()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['in_flight'] = len(self._calls)
+        stats['in_flight'] += len(self._async_calls)
+        return stats
+
+    def _forget(self, key, call):
+        if self._async_calls.get(key) is call:
+            del self._async_calls[key]
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
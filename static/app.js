@@ -0,0 +1,214 @@
+// Topic chip selection
+document.querySelectorAll('.chip').forEach(chip => {
+    chip.addEventListener('click', function() {
+        document.getElementById('topic').value = this.textContent;
+        document.querySelectorAll('.chip').forEach(c => c.style.background = '#f0f0f0');
+        this.style.background = '#0077b5';
+        this.style.color = 'white';
+    });
+});
+
+// Running counts for the stats cards. feed() only looks at the new chunk,
+// so updating them costs the same however long the post already is
+function createPostStats() {
+    return { words: 0, hashtags: 0, lines: 0, inWord: false, lineHasText: false };
+}
+
+function feedPostStats(stats, text) {
+    for (const ch of text) {
+        if (ch === '\n') {
+            stats.inWord = false;
+            stats.lineHasText = false;
+        } else if (/\s/.test(ch)) {
+            stats.inWord = false;
+        } else {
+            if (!stats.inWord) stats.words++;
+            if (!stats.lineHasText) stats.lines++;
+            if (ch === '#') stats.hashtags++;
+            stats.inWord = true;
+            stats.lineHasText = true;
+        }
+    }
+}
+
+// Tokens arrive faster than the screen refreshes: buffer them and touch the
+// DOM once per frame, appending to one text node instead of resetting it
+function createPostRenderer() {
+    const postPreview = document.getElementById('postPreview');
+    let textNode = null;
+    let stats = createPostStats();
+    let pending = '';
+    let frame = 0;
+
+    function flush() {
+        frame = 0;
+        if (pending) {
+            textNode.appendData(pending);
+            feedPostStats(stats, pending);
+            pending = '';
+            postPreview.scrollTop = postPreview.scrollHeight;
+        }
+        document.getElementById('wordCount').textContent = stats.words;
+        document.getElementById('hashtagCount').textContent = stats.hashtags;
+        document.getElementById('lineCount').textContent = stats.lines;
+    }
+
+    function reset(text) {
+        if (frame) cancelAnimationFrame(frame);
+        textNode = document.createTextNode('');
+        postPreview.replaceChildren(textNode);
+        stats = createPostStats();
+        pending = text || '';
+        flush();
+    }
+
+    function append(text) {
+        pending += text;
+        if (!frame) frame = requestAnimationFrame(flush);
+    }
+
+    reset('');
+    return { reset, append };
+}
+
+// POST /generate/stream answers with one JSON event per line; calls
+// onEvent for each as soon as its line is complete
+async function streamEvents(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+        const { done, value } = await reader.read();
+        buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+        let newline;
+        while ((newline = buffer.indexOf('\n')) >= 0) {
+            const line = buffer.slice(0, newline).trim();
+            buffer = buffer.slice(newline + 1);
+            if (line) onEvent(JSON.parse(line));
+        }
+        if (done) break;
+    }
+    if (buffer.trim()) onEvent(JSON.parse(buffer));
+}
+
+const PHASE_STATUS = {
+    writing: ['writing', '✍️ AI Writer is crafting your post...'],
+    editing: ['editing', '✨ Editor is polishing and optimizing...'],
+};
+
+// Generate post function
+document.getElementById('generateBtn').addEventListener('click', async function() {
+    const topic = document.getElementById('topic').value.trim();
+
+    if (!topic) {
+        showStatus('error', '⚠️ Please enter a topic to create magic!');
+        return;
+    }
+
+    const btn = document.getElementById('generateBtn');
+    const btnText = document.getElementById('btnText');
+    const spinner = document.getElementById('spinner');
+    const resultSection = document.getElementById('resultSection');
+
+    btn.disabled = true;
+    btnText.textContent = 'Generating...';
+    spinner.style.display = 'block';
+    resultSection.classList.remove('show');
+
+    showStatus('writing', '✍️ AI Writer is crafting your post...');
+
+    const renderer = createPostRenderer();
+    let finished = false;
+
+    function handleEvent(event) {
+        if (event.event === 'phase') {
+            // Each stage writes the post anew, e.g. the editor rewrites the draft
+            showStatus(...(PHASE_STATUS[event.phase] || ['writing', '⏳ Working on your post...']));
+            renderer.reset('');
+        } else if (event.event === 'token') {
+            resultSection.classList.add('show');
+            renderer.append(event.text);
+        } else if (event.event === 'done') {
+            finished = true;
+            // The final post is formatted after streaming; show exactly that
+            renderer.reset(event.post);
+            resultSection.classList.add('show');
+            if (event.unedited) {
+                showStatus('complete', '⏱️ The editor didn\'t finish, so this is the writer\'s unedited draft.');
+            } else {
+                showStatus('complete', event.cached ? '⚡ Your post is ready (from cache)!' : '✅ Your post is ready!');
+            }
+            statusTimer = setTimeout(() => {
+                document.getElementById('status').style.display = 'none';
+            }, 3000);
+        } else if (event.event === 'error') {
+            finished = true;
+            showStatus('error', '❌ Error: ' + event.error);
+        }
+    }
+
+    try {
+        const response = await fetch('/generate/stream', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ topic: topic })
+        });
+
+        // Invalid requests are answered with plain JSON, not a stream
+        if (!(response.headers.get('Content-Type') || '').includes('ndjson')) {
+            const data = await response.json();
+            showStatus('error', '❌ Error: ' + data.error);
+            return;
+        }
+
+        await streamEvents(response, handleEvent);
+        if (!finished) {
+            showStatus('error', '❌ The connection closed before the post was finished. Please try again.');
+        }
+    } catch (error) {
+        showStatus('error', '❌ Error generating post. Please check your connection and try again.');
+        console.error('Error:', error);
+    } finally {
+        btn.disabled = false;
+        btnText.textContent = '🚀 Generate LinkedIn Post';
+        spinner.style.display = 'none';
+    }
+});
+
+// Copy post function
+document.getElementById('copyBtn').addEventListener('click', function() {
+    const postText = document.getElementById('postPreview').textContent;
+    const copyBtn = document.getElementById('copyBtn');
+    const copyText = document.getElementById('copyText');
+
+    navigator.clipboard.writeText(postText).then(() => {
+        copyBtn.classList.add('copied');
+        copyText.textContent = 'Copied! ✓';
+
+        setTimeout(() => {
+            copyBtn.classList.remove('copied');
+            copyText.textContent = 'Copy Post';
+        }, 2000);
+    }).catch(err => {
+        alert('Failed to copy. Please select and copy manually.');
+    });
+});
+
+// Pending hide of the "ready" message; a new status cancels it
+let statusTimer = 0;
+
+function showStatus(type, message) {
+    clearTimeout(statusTimer);
+    const status = document.getElementById('status');
+    status.style.display = '';
+    status.className = 'status active ' + type;
+    status.textContent = message;
+}
+
+document.getElementById('topic').addEventListener('keypress', function(e) {
+    if (e.key === 'Enter') {
+        document.getElementById('generateBtn').click();
+    }
+});
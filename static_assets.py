@@ -0,0 +1,128 @@
+"""The web UI, precompiled at startup and served with HTTP caching.
+
+Everything in static/ is read once. CSS and JS are also published under
+content-hashed names (/static/app.1a2b3c4d5e.css) that may be cached forever,
+and index.html is rewritten to point at those, so a deploy that changes them
+is picked up on the next page load. The page itself is served with no-cache:
+browsers revalidate it with If-None-Match and usually get an empty 304.
+
+Each file is kept raw, gzip-compressed and, if the brotli package is
+installed, brotli-compressed, so nothing is rendered or compressed per request.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+# Best first; identity is always available
+ENCODINGS = ('br', 'gzip')
+ASSET_REF_RE = re.compile(r'(href|src)="(/static/[^"]+)"')
+Q_RE = re.compile(r'q=([0-9.]+)')
+
+
+def _digest(body):
+    return hashlib.sha256(body).hexdigest()
+
+
+def _accepted(accept_encoding):
+    # "gzip, br;q=0.8, *;q=0" -> {'gzip': 1.0, 'br': 0.8, '*': 0.0}
+    accepted = {}
+    for part in accept_encoding.split(','):
+        token, _, params = part.partition(';')
+        token = token.strip().lower()
+        if not token:
+            continue
+        match = Q_RE.search(params)
+        try:
+            accepted[token] = float(match.group(1)) if match else 1.0
+        except ValueError:
+            accepted[token] = 0.0
+    return accepted
+
+
+class Asset:
+
+    def __init__(self, body, content_type, cache_control):
+        self.content_type = content_type
+        self.cache_control = cache_control
+        tag = _digest(body)[:20]
+        # encoding -> (ETag, body); every representation gets its own ETag
+        self.variants = {'identity': (f'"{tag}"', body)}
+        compressed = {'gzip': gzip.compress(body, 9, mtime=0)}
+        if brotli is not None:
+            compressed['br'] = brotli.compress(body, quality=11)
+        for encoding, data in compressed.items():
+            if len(data) < len(body):
+                self.variants[encoding] = (f'"{tag}-{encoding}"', data)
+
+    def negotiate(self, accept_encoding):
+        accepted = _accepted(accept_encoding or '')
+        best, best_q = 'identity', 0.0
+        for encoding in ENCODINGS:
+            q = accepted.get(encoding, accepted.get('*', 0.0))
+            if encoding in self.variants and q > best_q:
+                best, best_q = encoding, q
+        return best
+
+    def matches(self, if_none_match):
+        # Any representation's tag matches; proxies may have weakened it (W/)
+        if not if_none_match:
+            return False
+        tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+        return '*' in tags or any(etag in tags for etag, _ in self.variants.values())
+
+
+class StaticAssets:
+
+    def __init__(self, directory, index='index.html', prefix='/static/'):
+        self.routes = {}
+        fingerprinted = {}
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            if name == index or not os.path.isfile(path):
+                continue
+            with open(path, 'rb') as f:
+                body = f.read()
+            content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+            if content_type.startswith('text/') or content_type.endswith('javascript'):
+                content_type += '; charset=utf-8'
+            stem, ext = os.path.splitext(name)
+            hashed = f'{prefix}{stem}.{_digest(body)[:10]}{ext}'
+            self.routes[prefix + name] = Asset(body, content_type, REVALIDATE)
+            self.routes[hashed] = Asset(body, content_type, IMMUTABLE)
+            fingerprinted[prefix + name] = hashed
+
+        with open(os.path.join(directory, index), 'rb') as f:
+            html = f.read().decode('utf-8')
+        html = ASSET_REF_RE.sub(
+            lambda m: f'{m.group(1)}="{fingerprinted.get(m.group(2), m.group(2))}"', html
+        )
+        self.routes['/'] = Asset(html.encode('utf-8'), 'text/html; charset=utf-8', REVALIDATE)
+
+    def respond(self, path, accept_encoding='', if_none_match=''):
+        # Returns (status, headers, body), or None for an unknown path
+        asset = self.routes.get(path)
+        if asset is None:
+            return None
+        encoding = asset.negotiate(accept_encoding)
+        etag, body = asset.variants[encoding]
+        headers = {
+            'Content-Type': asset.content_type,
+            'Cache-Control': asset.cache_control,
+            'ETag': etag,
+            'Vary': 'Accept-Encoding',
+        }
+        if asset.matches(if_none_match):
+            return 304, headers, b''
+        if encoding != 'identity':
+            headers['Content-Encoding'] = encoding
+        return 200, headers, body
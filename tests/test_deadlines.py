@@ -0,0 +1,49 @@
+import time
+
+import pytest
+
+from deadlines import Deadline, DeadlineExceeded, current_deadline, deadline_scope
+
+
+def test_a_stage_share_is_a_part_of_the_whole_deadline():
+    deadline = Deadline(10)
+    deadline.begin('writing', 0.6)
+    assert 5.9 < deadline.remaining() <= 6.0
+    deadline.begin('editing')
+    assert 9.9 < deadline.remaining() <= 10.0
+
+
+def test_a_share_never_runs_past_the_whole_deadline():
+    deadline = Deadline(0.1)
+    time.sleep(0.06)
+    deadline.begin('editing', 0.9)
+    assert deadline.remaining() <= 0.04
+
+
+def test_remaining_stops_at_zero_and_exceeded_names_the_stage():
+    deadline = Deadline(0.01)
+    deadline.begin('writing')
+    time.sleep(0.02)
+    assert deadline.remaining() == 0.0
+    error = deadline.exceeded()
+    assert isinstance(error, DeadlineExceeded)
+    assert error.phase == 'writing'
+    assert 'writing stage ran out of time' in str(error)
+
+
+def test_deadline_scope_sets_and_restores_the_current_deadline():
+    deadline = Deadline(5)
+    assert current_deadline() is None
+    with deadline_scope(deadline):
+        assert current_deadline() is deadline
+        with deadline_scope(None):
+            assert current_deadline() is None
+        assert current_deadline() is deadline
+    assert current_deadline() is None
+
+
+def test_deadline_scope_restores_on_error():
+    with pytest.raises(RuntimeError):
+        with deadline_scope(Deadline(5)):
+            raise RuntimeError
+    assert current_deadline() is None
@@ -0,0 +1,111 @@
+import http.server
+import threading
+import time
+
+import pytest
+
+from jobs import JobQueue, QueueFull, check_webhook, post_webhook
+
+
+def blocking_queue(**options):
+    release = threading.Event()
+    jobs = JobQueue(lambda payload: release.wait(5) and payload, **options)
+    return jobs, release
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_jobs_run_and_keep_their_result():
+    jobs = JobQueue(lambda payload: {'post': payload['topic']}, max_workers=1)
+    job = jobs.submit({'topic': 'AI'})
+    assert jobs.close(timeout=2)
+    assert job.status == 'done'
+    assert job.to_dict()['result'] == {'post': 'AI'}
+
+
+def test_a_full_queue_rejects_and_forgets_the_job():
+    jobs, release = blocking_queue(max_workers=1, max_queued=1)
+    jobs.submit({})
+    wait_for(lambda: jobs.stats()['running'] == 1)
+    jobs.submit({})
+    with pytest.raises(QueueFull):
+        jobs.submit({})
+    assert len(jobs._jobs) == 2
+    assert jobs.stats()['rejected'] == 1
+    release.set()
+    assert jobs.close(timeout=2)
+
+
+def test_close_waits_for_a_cancelled_job_that_is_still_running():
+    jobs, release = blocking_queue(max_workers=1)
+    job = jobs.submit({})
+    wait_for(lambda: job.status == 'running')
+    assert jobs.cancel(job.id).status == 'cancelled'
+    assert jobs.close(timeout=0.2) is False
+    release.set()
+    assert jobs.close(timeout=2)
+    assert job.status == 'cancelled'
+
+
+def test_close_waits_for_queued_jobs():
+    jobs, release = blocking_queue(max_workers=1)
+    jobs.submit({})
+    jobs.submit({})
+    assert jobs.close(timeout=0.1) is False
+    release.set()
+    assert jobs.close(timeout=2)
+    assert jobs.stats()['done'] == 2
+
+
+def test_no_jobs_are_taken_after_close():
+    jobs = JobQueue(lambda payload: payload)
+    jobs.close()
+    with pytest.raises(QueueFull):
+        jobs.submit({})
+
+
+@pytest.mark.parametrize('url', [
+    'http://127.0.0.1/hook', 'http://10.0.0.5/', 'http://169.254.169.254/latest',
+    'http://[::1]/', 'http://[::ffff:127.0.0.1]/', 'ftp://example.com/', 42,
+])
+def test_webhooks_to_internal_addresses_are_refused(url):
+    with pytest.raises(ValueError):
+        check_webhook(url)
+
+
+def test_allowed_hosts_replace_the_address_check():
+    assert check_webhook('http://hooks.internal/x', {'hooks.internal'}) is None
+    with pytest.raises(ValueError):
+        check_webhook('http://other.internal/x', {'hooks.internal'})
+
+
+def test_a_public_address_is_returned_to_connect_to():
+    assert check_webhook('http://1.1.1.1/hook') == '1.1.1.1'
+
+
+def test_the_webhook_goes_to_the_checked_address_under_its_own_name():
+    received = []
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_POST(self):
+            received.append((self.headers['Host'], self.path, self.rfile.read(int(self.headers['Content-Length']))))
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.HTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    try:
+        # The name doesn't resolve; only the pinned address is used
+        post_webhook(f'http://hooks.invalid:{port}/done?job=1', '127.0.0.1', b'{}')
+    finally:
+        server.shutdown()
+    assert received == [(f'hooks.invalid:{port}', '/done?job=1', b'{}')]
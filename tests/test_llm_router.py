@@ -0,0 +1,141 @@
+import asyncio
+import threading
+import time
+from typing import Any
+
+import pytest
+from crewai.events.types.llm_events import LLMCallType
+from crewai.llms.base_llm import BaseLLM, llm_call_context
+
+from deadlines import Deadline, DeadlineExceeded, deadline_scope
+from llm_router import build_routed_llm
+from metrics import capture_usage
+
+
+class FakeLLM(BaseLLM):
+    # Answers after delay seconds, or raises error; emits the call events a
+    # provider would, usage included
+    answer: str = 'ok'
+    delay: float = 0.0
+    error: Any = None
+    usage: Any = None
+    calls: Any = None
+
+    def model_post_init(self, __context):
+        super().model_post_init(__context)
+        self.calls = []
+
+    def _finish(self, messages):
+        self.calls.append(threading.current_thread().name)
+        if self.error is not None:
+            raise self.error
+        self._emit_call_completed_event(self.answer, LLMCallType.LLM_CALL, messages=messages, usage=self.usage)
+        return self.answer
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None, **kwargs):
+        with llm_call_context():
+            time.sleep(self.delay)
+            return self._finish(messages)
+
+    async def acall(self, messages, tools=None, callbacks=None, available_functions=None,
+                    from_task=None, from_agent=None, response_model=None, **kwargs):
+        with llm_call_context():
+            await asyncio.sleep(self.delay)
+            return self._finish(messages)
+
+
+def routed(*llms, deadline=20.0):
+    return build_routed_llm(list(llms), deadline=deadline, hedge=False)
+
+
+def test_falls_back_when_the_primary_fails():
+    primary = FakeLLM(model='primary', error=RuntimeError('down'))
+    fallback = FakeLLM(model='fallback', answer='from fallback')
+    llm = routed(primary, fallback)
+    assert llm.call('hello') == 'from fallback'
+    stats = llm.stats()
+    assert stats['primary']['errors'] == 1
+    assert stats['fallback']['wins'] == 1
+
+
+def test_falls_back_when_the_primary_is_slow():
+    primary = FakeLLM(model='primary', delay=1.0, answer='late')
+    fallback = FakeLLM(model='fallback', answer='from fallback')
+    llm = routed(primary, fallback, deadline=0.1)
+    start = time.monotonic()
+    assert llm.call('hello') == 'from fallback'
+    assert time.monotonic() - start < 0.5
+    assert llm.stats()['primary']['deadline_exceeded'] == 1
+
+
+def test_async_fallback():
+    primary = FakeLLM(model='primary', delay=1.0)
+    fallback = FakeLLM(model='fallback', answer='from fallback')
+    llm = routed(primary, fallback, deadline=0.1)
+    assert asyncio.run(llm.acall('hello')) == 'from fallback'
+
+
+def test_the_last_error_is_raised_when_every_route_fails():
+    llm = routed(FakeLLM(model='a', error=RuntimeError('a down')), FakeLLM(model='b', error=RuntimeError('b down')))
+    with pytest.raises(RuntimeError, match='b down'):
+        llm.call('hello')
+
+
+def test_a_single_route_runs_on_the_calling_thread():
+    primary = FakeLLM(model='primary')
+    llm = routed(primary)
+    with deadline_scope(Deadline(5)):
+        llm.call('hello')
+    assert primary.calls == [threading.current_thread().name]
+
+
+def test_the_stage_budget_stops_a_raced_call():
+    llm = routed(FakeLLM(model='primary', delay=1.0), FakeLLM(model='fallback', delay=1.0), deadline=0.05)
+    deadline = Deadline(0.2)
+    deadline.begin('writing')
+    start = time.monotonic()
+    with deadline_scope(deadline), pytest.raises(DeadlineExceeded):
+        llm.call('hello')
+    assert time.monotonic() - start < 0.5
+    assert llm.stats()['primary']['cut_off'] == 1
+
+
+def test_a_call_on_the_calling_thread_checks_the_budget_when_it_returns():
+    llm = routed(FakeLLM(model='primary', delay=0.2))
+    deadline = Deadline(0.05)
+    deadline.begin('writing')
+    with deadline_scope(deadline), pytest.raises(DeadlineExceeded):
+        llm.call('hello')
+
+
+def test_async_calls_are_cancelled_at_the_deadline():
+    llm = routed(FakeLLM(model='primary', delay=1.0))
+    deadline = Deadline(0.1)
+    deadline.begin('editing')
+
+    async def call():
+        with deadline_scope(deadline):
+            return await llm.acall('hello')
+
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(call())
+    assert time.monotonic() - start < 0.5
+
+
+def test_counts_the_usage_the_model_reports():
+    llm = routed(FakeLLM(model='primary', usage={'prompt_tokens': 11, 'completion_tokens': 7}))
+    with capture_usage() as usage:
+        llm.call('hello')
+    assert usage == [(11, 7)]
+    stats = llm.stats()['primary']
+    assert (stats['prompt_tokens'], stats['completion_tokens']) == (11, 7)
+
+
+def test_estimates_tokens_when_the_model_reports_none():
+    llm = routed(FakeLLM(model='primary', answer='a short answer'))
+    with capture_usage() as usage:
+        llm.call('hello there')
+    assert usage == []
+    assert llm.stats()['primary']['completion_tokens'] > 0
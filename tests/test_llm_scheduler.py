@@ -0,0 +1,107 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from llm_errors import ProviderBusy
+from llm_scheduler import LLMScheduler, TokenBucket
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after=None):
+        super().__init__('Rate limit reached (429)')
+        self.retry_after = retry_after
+
+
+def flaky(failures, error=RateLimited):
+    # A call that is throttled failures times, then answers
+    calls = []
+
+    def call():
+        calls.append(time.monotonic())
+        if len(calls) <= failures:
+            raise error()
+        return 'ok'
+
+    return call, calls
+
+
+def test_retries_a_429_and_pauses_other_calls_without_retry_after():
+    scheduler = LLMScheduler(max_retries=2, backoff_base=0.2)
+    call, calls = flaky(1)
+    start = time.monotonic()
+    assert scheduler.run(call, 'prompt') == 'ok'
+    assert len(calls) == 2
+    # No Retry-After: the others are held back for the un-jittered backoff
+    assert scheduler._paused_until - start == pytest.approx(0.2, abs=0.05)
+    stats = scheduler.stats()
+    assert (stats['throttled'], stats['retries'], stats['succeeded']) == (1, 1, 1)
+
+
+def test_honours_retry_after_for_the_pause_and_the_retry():
+    scheduler = LLMScheduler(max_retries=1, backoff_base=0.01)
+    call, calls = flaky(1, lambda: RateLimited(retry_after=0.3))
+    assert scheduler.run(call, 'prompt') == 'ok'
+    assert calls[1] - calls[0] >= 0.3
+
+
+def test_a_paused_scheduler_holds_back_new_calls():
+    scheduler = LLMScheduler()
+    scheduler._paused_until = time.monotonic() + 0.2
+    start = time.monotonic()
+    scheduler.run(lambda: 'ok', 'prompt')
+    assert time.monotonic() - start >= 0.2
+
+
+def test_gives_up_with_provider_busy_after_max_retries():
+    scheduler = LLMScheduler(max_retries=2, backoff_base=0.01)
+    call, calls = flaky(10)
+    with pytest.raises(ProviderBusy) as raised:
+        scheduler.run(call, 'prompt')
+    assert len(calls) == 3
+    assert raised.value.retry_after is not None
+    assert scheduler.stats()['gave_up'] == 1
+
+
+def test_other_errors_are_not_retried():
+    scheduler = LLMScheduler(max_retries=3)
+    call, calls = flaky(1, lambda: ValueError('bad request'))
+    with pytest.raises(ValueError):
+        scheduler.run(call, 'prompt')
+    assert len(calls) == 1
+    assert scheduler.stats()['failed'] == 1
+
+
+def test_a_call_waiting_for_rate_budget_holds_no_slot():
+    scheduler = LLMScheduler(rpm=300, initial_concurrency=1, max_concurrency=1)
+    scheduler.requests.level = -0.5
+    waiting = threading.Thread(target=scheduler.run, args=(lambda: 'ok', 'prompt'))
+    waiting.start()
+    time.sleep(0.1)
+    assert scheduler.limiter.in_use == 0
+    waiting.join()
+    assert scheduler.stats()['budget_wait_seconds'] > 0
+
+
+def test_async_calls_retry_too():
+    scheduler = LLMScheduler(max_retries=1, backoff_base=0.01)
+    attempts = []
+
+    async def call():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RateLimited()
+        return 'ok'
+
+    assert asyncio.run(scheduler.arun(call, 'prompt')) == 'ok'
+    assert len(attempts) == 2
+
+
+def test_token_bucket_queues_callers_in_order():
+    bucket = TokenBucket(per_minute=60, burst=1)
+    assert bucket.reserve(1) == 0.0
+    assert bucket.reserve(1) == pytest.approx(1.0, abs=0.05)
+    assert bucket.reserve(1) == pytest.approx(2.0, abs=0.05)
@@ -0,0 +1,74 @@
+import time
+
+from post_cache import MemoryTier, PostCache, SQLiteTier, build_post_cache, cache_key
+
+
+def test_cache_key_ignores_case_spacing_and_punctuation():
+    assert cache_key('  AI in Healthcare! ', 'm', 0.7, 'h') == cache_key('ai in healthcare', 'm', 0.7, 'h')
+    assert cache_key('ai in healthcare', 'm', 0.7, 'h') != cache_key('ai in healthcare', 'm', 0.2, 'h')
+
+
+def test_memory_tier_evicts_least_recently_used():
+    tier = MemoryTier(max_entries=2)
+    expires = time.time() + 60
+    tier.set('a', 'A', expires)
+    tier.set('b', 'B', expires)
+    tier.get('a')
+    tier.set('c', 'C', expires)
+    assert tier.get('b') is None
+    assert tier.get('a') == ('A', expires)
+    assert tier.evictions == 1
+
+
+def test_memory_tier_expires_entries():
+    tier = MemoryTier()
+    tier.set('a', 'A', time.time() - 1)
+    assert tier.get('a') is None
+    assert tier.expirations == 1
+    assert len(tier) == 0
+
+
+def test_sqlite_tier_survives_a_restart(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    SQLiteTier(path).set('a', 'A', time.time() + 60)
+    assert SQLiteTier(path).get('a')[0] == 'A'
+
+
+def test_sqlite_tier_reopens_its_connection_after_start(tmp_path):
+    tier = SQLiteTier(str(tmp_path / 'cache.db'))
+    tier.set('a', 'A', time.time() + 60)
+    tier.start()
+    assert tier.get('a')[0] == 'A'
+
+
+def test_a_lower_tier_hit_backfills_the_upper_tier(tmp_path):
+    memory, sqlite = MemoryTier(), SQLiteTier(str(tmp_path / 'cache.db'))
+    sqlite.set('a', 'A', time.time() + 60)
+    cache = PostCache([memory, sqlite])
+    assert cache.get('a') == 'A'
+    assert memory.get('a')[0] == 'A'
+    stats = cache.stats()
+    assert stats['tiers']['sqlite']['hits'] == 1
+    assert stats['hits'] == 1
+
+
+def test_get_or_create_modes():
+    cache = build_post_cache()
+    calls = []
+
+    def create():
+        calls.append(1)
+        return f'post {len(calls)}'
+
+    assert cache.get_or_create('k', create) == ('post 1', False)
+    assert cache.get_or_create('k', create) == ('post 1', True)
+    assert cache.get_or_create('k', create, mode='bypass') == ('post 2', False)
+    assert cache.get('k') == 'post 1'
+    assert cache.get_or_create('k', create, mode='refresh') == ('post 3', False)
+    assert cache.get('k') == 'post 3'
+
+
+def test_uncacheable_values_are_not_stored():
+    cache = build_post_cache()
+    assert cache.get_or_create('k', lambda: 'draft', cacheable=lambda value: False) == ('draft', False)
+    assert cache.get('k') is None
@@ -0,0 +1,9 @@
+from post_rules import CLOSING_QUESTION, MAX_WORDS, format_post, word_count
+
+
+def test_a_long_draft_is_trimmed_to_the_limit_with_its_closing_question():
+    draft = '\n\n'.join(' '.join(['word.'] * 40) for _ in range(10))
+    post = format_post(draft, topic='Remote work')
+    assert CLOSING_QUESTION in post
+    assert word_count(post) <= MAX_WORDS
+
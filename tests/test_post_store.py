@@ -0,0 +1,30 @@
+import threading
+import time
+
+from post_store import PostStore
+
+
+def test_recorded_posts_are_listed_newest_first(tmp_path):
+    store = PostStore(str(tmp_path / 'posts.db'))
+    for topic in ('first', 'second', 'third'):
+        store.record(topic, f'A post about {topic}', mode='two-agent')
+    assert store.flush(timeout=5)
+    assert [post['topic'] for post in store.history()] == ['third', 'second', 'first']
+    assert [post['topic'] for post in store.history(before=2)] == ['first']
+    # 0 is a cursor like any other: nothing comes before the first post
+    assert store.history(before=0) == []
+    assert [post['topic'] for post in store.search('second')] == ['second']
+    assert store.search('second', before=0) == []
+
+
+def test_flush_gives_up_at_its_timeout_when_the_queue_is_full(tmp_path, monkeypatch):
+    release = threading.Event()
+    # A writer that is stuck, so the queue stays full
+    monkeypatch.setattr(PostStore, '_write', lambda self: release.wait())
+    store = PostStore(str(tmp_path / 'posts.db'), max_queued=1)
+    assert store.record('topic', 'post')
+    assert not store.record('topic', 'post')
+    start = time.monotonic()
+    assert store.flush(timeout=0.2) is False
+    assert time.monotonic() - start < 1.0
+    release.set()
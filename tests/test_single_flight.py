@@ -0,0 +1,103 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_run():
+    flight = SingleFlight()
+    runs = []
+    started = threading.Event()
+
+    def work():
+        runs.append(1)
+        started.set()
+        time.sleep(0.2)
+        return 'post'
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do('key', work)))
+    leader.start()
+    started.wait()
+    followers = [threading.Thread(target=lambda: results.append(flight.do('key', work))) for _ in range(4)]
+    for thread in followers:
+        thread.start()
+    for thread in [leader] + followers:
+        thread.join()
+
+    assert len(runs) == 1
+    assert sorted(results) == [('post', False)] + [('post', True)] * 4
+    assert flight.stats() == {'leaders': 1, 'coalesced': 4, 'in_flight': 0}
+
+
+def test_followers_get_the_leaders_error():
+    flight = SingleFlight()
+    started = threading.Event()
+
+    def fail():
+        started.set()
+        time.sleep(0.1)
+        raise RuntimeError('provider down')
+
+    errors = []
+
+    def call():
+        try:
+            flight.do('key', fail)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait()
+    follower = threading.Thread(target=call)
+    follower.start()
+    leader.join()
+    follower.join()
+    assert errors == ['provider down', 'provider down']
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight()
+    assert flight.do('a', lambda: 1) == (1, False)
+    assert flight.do('b', lambda: 2) == (2, False)
+    # Nothing is kept once a run has finished
+    assert flight.do('a', lambda: 3) == (3, False)
+
+
+def test_async_callers_share_one_run():
+    flight = SingleFlight()
+    runs = []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0.05)
+        return 'post'
+
+    async def main():
+        return await asyncio.gather(*[flight.ado('key', work) for _ in range(3)])
+
+    assert asyncio.run(main()) == [('post', False), ('post', True), ('post', True)]
+    assert len(runs) == 1
+
+
+def test_one_cancelled_caller_does_not_cancel_the_others():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.1)
+        return 'post'
+
+    async def main():
+        first = asyncio.ensure_future(flight.ado('key', work))
+        second = asyncio.ensure_future(flight.ado('key', work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == ('post', True)